@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""
+Benchmark of pyoctopart.serialize against pickle and JSON.
+
+Serializes a batch of parts with many offers from a handful of suppliers,
+and reports the size and the round trip time of:
+
+    serialize   pyoctopart.serialize.dumps()/loads()
+    pickle      pickle of the parts (using their compact __reduce__)
+    plain       pickle of the parts' __dict__, as pickling parts used to do
+    json        JSON of the Part resource dictionaries the parts come from,
+                decoded and rebuilt with OctopartPart.new_from_dict()
+
+    % python3 benchmarks/bench_serialize.py [number of parts]
+"""
+
+import sys
+import json
+import time
+import pickle
+
+from pyoctopart.octopart import OctopartPart
+from pyoctopart import serialize
+
+suppliers = [{'__class__': 'Brand', 'id': i, 'displayname': 'Supplier {}'.format(i),
+              'homepage_url': 'http://supplier{}.example.com'.format(i)} for i in range(8)]
+attributes = [{'__class__': 'PartAttribute', 'fieldname': 'attribute_{}'.format(i),
+               'displayname': 'Attribute {}'.format(i), 'type': 'number',
+               'metadata': {'datatype': 'decimal', 'unit': {'name': 'Volt', 'symbol': 'V'}}} for i in range(6)]
+
+def part_dict(uid):
+    return {
+        '__class__': 'Part', 'uid': uid, 'mpn': 'PART-{}'.format(uid), 'manufacturer': suppliers[uid % 8],
+        'detail_url': 'http://octopart.com/part/{}'.format(uid), 'avg_price': [0.42, 'USD', 100],
+        'avg_avail': 1000, 'market_status': 'GREEN', 'num_suppliers': 8, 'num_authsuppliers': 6,
+        'short_description': 'A part', 'category_ids': [4174, 4161],
+        'offers': [{'supplier': suppliers[i], 'sku': 'SKU-{}-{}'.format(uid, i), 'avail': 100 * i,
+                    'prices': [[1, 0.5, 'USD'], [100, 0.4, 'USD'], [1000, 0.3, 'USD']],
+                    'is_authorized': i % 2 == 0, 'clickthrough_url': 'http://octopart.com/click/{}'.format(i),
+                    'update_ts': '2012-04-02T18:20:02Z'} for i in range(8)],
+        'specs': [{'attribute': a, 'values': [float(uid % 50)]} for a in attributes],
+    }
+
+def bench(name, dump, load, data, rounds=5):
+    best_dump = best_load = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        blob = dump(data)
+        middle = time.perf_counter()
+        load(blob)
+        end = time.perf_counter()
+        best_dump = min(best_dump, middle - start)
+        best_load = min(best_load, end - middle)
+    print('{:10s} {:>10d} bytes {:>9.1f} ms dump {:>9.1f} ms load'.format(
+        name, len(blob), best_dump * 1000, best_load * 1000))
+
+def main(count=10000):
+    # Round trip through JSON so that no string is shared, as with API responses
+    dicts = json.loads(json.dumps([part_dict(uid) for uid in range(count)]))
+    parts = [OctopartPart.new_from_dict(d) for d in dicts]
+    print('{} parts, {} offers and {} specs each'.format(count, 8, 6))
+    bench('serialize', serialize.dumps, serialize.loads, parts)
+    bench('pickle', lambda p: pickle.dumps(p, pickle.HIGHEST_PROTOCOL), pickle.loads, parts)
+    bench('plain', lambda p: pickle.dumps([x.__dict__ for x in p], pickle.HIGHEST_PROTOCOL), pickle.loads, parts)
+    bench('json', lambda d: json.dumps(d).encode(),
+          lambda b: [OctopartPart.new_from_dict(d) for d in json.loads(b.decode())], dicts)
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
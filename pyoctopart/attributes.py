@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Shared registry of part attributes.
+
+There are only a few hundred distinct part attributes, so every spec of every
+part can share the same OctopartPartAttribute objects.  The registry interns
+them by fieldname, fetches the missing ones in batches with
+`partattributes_get_multi`, and can be saved between runs.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import json
+import threading
+
+
+class OctopartAttributeRegistry(object):
+
+    """Interns part attributes by fieldname.
+
+    The process-wide registry used when decoding part specs is
+    pyoctopart.octopart.attribute_registry.
+    """
+
+    def __init__(self, attribute_class):
+        """
+        param attribute_class: class of the interned attributes, built with its
+            new_from_dict() constructor.
+        """
+        self.attribute_class = attribute_class
+        self._attributes = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, fieldname):
+        return fieldname in self._attributes
+
+    def __len__(self):
+        return len(self._attributes)
+
+    def get(self, fieldname):
+        return self._attributes.get(fieldname)
+
+    def intern(self, attribute):
+        """Returns the shared attribute of an attribute dictionary (or object).
+
+        The first attribute seen for a fieldname is kept, later ones are
+        returned as that first one.
+        """
+        fieldname = attribute['fieldname'] if type(attribute) is dict else attribute.fieldname
+        shared = self._attributes.get(fieldname)
+        if shared is None:
+            with self._lock:
+                shared = self._attributes.get(fieldname)
+                if shared is None:
+                    if type(attribute) is dict:
+                        attribute = self.attribute_class.new_from_dict(attribute)
+                    shared = self._attributes[fieldname] = attribute
+        return shared
+
+    def missing(self, fieldnames):
+        """Returns the fieldnames not in the registry, without duplicates."""
+        return sorted(set(f for f in fieldnames if f not in self._attributes))
+
+    def prefetch(self, api, fieldnames, batch_size=100):
+        """Fetches the attributes of fieldnames that are not in the registry yet.
+
+        param api: the Octopart instance issuing the requests.
+        param fieldnames: iterable of attribute fieldnames.
+        param batch_size: number of attributes fetched per request.
+        returns: the number of attributes added to the registry.
+        """
+        missing = self.missing(fieldnames)
+        added = 0
+        for start in range(0, len(missing), batch_size):
+            result = api.partattributes_get_multi(missing[start:start + batch_size])
+            if result is None:
+                continue
+            for attribute in result[0]:
+                if attribute['fieldname'] not in self._attributes:
+                    self.intern(attribute)
+                    added += 1
+        return added
+
+    def save(self, path):
+        """Saves the registry to path, atomically."""
+        attributes = [{
+            'fieldname': a.fieldname,
+            'displayname': a.displayname,
+            'type': a.type,
+            'metadata': a.metadata,
+        } for a in list(self._attributes.values())]
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(attributes, f)
+        os.replace(tmp, path)
+
+    def load(self, path):
+        """Adds the attributes saved in path, returns how many were added."""
+        if not os.path.exists(path):
+            return 0
+        with open(path) as f:
+            attributes = json.load(f)
+        before = len(self._attributes)
+        for attribute in attributes:
+            self.intern(attribute)
+        return len(self._attributes) - before
+
+    def clear(self):
+        with self._lock:
+            self._attributes = {}
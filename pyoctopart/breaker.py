@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Circuit breaker.
+
+When Octopart is overloaded, every request waits for its answer before
+failing, and the callers pile up behind it.  An OctopartCircuitBreaker
+counts the consecutive failures (5xx and 429 answers, connection errors
+and, when a latency threshold is set, answers slower than it) of every
+method path.
+After `failure_threshold` of them the circuit of that method opens, and
+its calls fail at once with OctopartCircuitOpenError, or are answered from
+the cache, marked stale.  After `reset_timeout` seconds, a single probe
+request is let through: its success closes the circuit, its failure opens
+it again.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import time
+import threading
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class _Circuit(object):
+
+    __slots__ = ['state', 'failures', 'opened', 'probing', 'rejected', 'stale']
+
+    def __init__(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.opened = 0.0
+        self.probing = False
+        self.rejected = 0
+        self.stale = 0
+
+
+class OctopartCircuitBreaker(object):
+
+    """A circuit breaker per method path.
+
+    >>> o = Octopart(apikey, cache=OctopartMemoryCache(), breaker=OctopartCircuitBreaker())
+    >>> json_obj, results = o.parts_match(queries)
+    >>> getattr(json_obj, 'stale', False)     # True when served from the cache
+    """
+
+    def __init__(self, failure_threshold=5, latency_threshold=None, reset_timeout=30.0, serve_stale=True):
+        """
+        param failure_threshold: consecutive failures opening a circuit.
+        param latency_threshold: when given, answers slower than that many
+            seconds count as failures.
+        param reset_timeout: seconds an open circuit waits before a probe.
+        param serve_stale: while a circuit is open, answer the calls found in
+            the cache with the cached response, whatever its age.
+        """
+        self.failure_threshold = failure_threshold
+        self.latency_threshold = latency_threshold
+        self.reset_timeout = reset_timeout
+        self.serve_stale = serve_stale
+        self._circuits = {}
+        self._lock = threading.Lock()
+
+    def _circuit(self, method):
+        circuit = self._circuits.get(method)
+        if circuit is None:
+            circuit = self._circuits[method] = _Circuit()
+        return circuit
+
+    def state(self, method):
+        with self._lock:
+            return self._circuit(method).state
+
+    def allow(self, method):
+        """Returns whether a request of method may be sent.
+
+        An open circuit lets a single probe through once reset_timeout has
+        elapsed; the caller must then report it with success() or failure().
+        """
+        with self._lock:
+            circuit = self._circuit(method)
+            if circuit.state == CLOSED:
+                return True
+            if circuit.state == OPEN and time.monotonic() - circuit.opened >= self.reset_timeout:
+                circuit.state = HALF_OPEN
+            if circuit.state == HALF_OPEN and not circuit.probing:
+                circuit.probing = True
+                return True
+            return False
+
+    def retry_after(self, method):
+        """Returns the seconds left before the next probe of method."""
+        with self._lock:
+            circuit = self._circuit(method)
+            if circuit.state == CLOSED:
+                return 0.0
+            return max(self.reset_timeout - (time.monotonic() - circuit.opened), 0.0)
+
+    def rejected(self, method, stale):
+        """Counts a call that was not sent, and whether it was served stale."""
+        with self._lock:
+            circuit = self._circuit(method)
+            circuit.rejected += 1
+            circuit.stale += 1 if stale else 0
+
+    def success(self, method, latency=0.0):
+        if self.latency_threshold is not None and latency > self.latency_threshold:
+            self.failure(method)
+            return
+        with self._lock:
+            circuit = self._circuit(method)
+            circuit.state = CLOSED
+            circuit.failures = 0
+            circuit.probing = False
+
+    def release(self, method):
+        """Gives back a probe let through by allow() that failed on the
+        client side (deadline, rate limit), without counting it."""
+        with self._lock:
+            self._circuit(method).probing = False
+
+    def failure(self, method):
+        with self._lock:
+            circuit = self._circuit(method)
+            circuit.failures += 1
+            if circuit.state == HALF_OPEN or circuit.failures >= self.failure_threshold:
+                circuit.state = OPEN
+                circuit.opened = time.monotonic()
+            circuit.probing = False
+
+    def stats(self):
+        """Returns the state, consecutive failures, rejected and stale calls of every method."""
+        with self._lock:
+            return {method: {'state': c.state, 'failures': c.failures, 'rejected': c.rejected, 'stale': c.stale}
+                    for method, c in self._circuits.items()}
@@ -0,0 +1,377 @@
+#!/usr/bin/env python
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Streaming bulk BOM matching.
+
+BOM lines are read one at a time from a CSV, TSV or JSON-lines file,
+normalized, grouped into `bom_match` batches that are sent concurrently, and
+the matched results are written out in input order as soon as they are
+available.  At most `max_pending` batches are in flight or waiting to be
+written, so memory use does not depend on the size of the input.  When
+duplicate lines are deduplicated, the results of a window of lines are
+written once the whole window is matched, but still at most `max_pending`
+batches are in flight.
+
+    % python3 -m pyoctopart.bulk --apikey yourapikey bom.csv matches.jsonl
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import csv
+import sys
+import json
+import argparse
+
+from collections import deque
+from concurrent.futures import CancelledError
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+
+from .octopart import Octopart
+from .exceptions import OctopartDeadlineExceededError
+from .deadline import OctopartDeadline
+from .deadline import current_deadline
+from .deadline import submit
+from .jobs import OctopartJournal
+from .jobs import call_with_retry
+from .jobs import chunk_digest
+from .jobs import unavailable_errors
+
+# Fields of a bom/match line, with their types
+line_fields = {
+    'q': str,
+    'mpn': str,
+    'manufacturer': str,
+    'sku': str,
+    'supplier': str,
+    'mpn_or_sku': str,
+    'start': int,
+    'limit': int,
+    'reference': str,
+}
+
+# Fields identifying a part, normalized to upper case
+part_number_fields = ('mpn', 'sku', 'mpn_or_sku')
+
+# Maximum number of lines of a bom/match request
+max_chunk_size = 20
+
+formats = ('csv', 'tsv', 'jsonl')
+
+
+''' Input '''
+
+def guess_format(filename):
+    """Guesses the BOM file format from the file name extension."""
+    ext = os.path.splitext(filename)[1].lower()
+    if ext in ('.tsv', '.tab'):
+        return 'tsv'
+    if ext in ('.jsonl', '.ndjson', '.json'):
+        return 'jsonl'
+    return 'csv'
+
+def read_lines(fileobj, format='csv'):
+    """Yields the BOM lines of a file, one dictionary at a time.
+
+    CSV and TSV files must have a header row naming the line fields.
+    """
+    if format == 'jsonl':
+        for row in fileobj:
+            row = row.strip()
+            if row:
+                yield json.loads(row)
+    else:
+        reader = csv.DictReader(fileobj, delimiter='\t' if format == 'tsv' else ',')
+        for row in reader:
+            yield row
+
+def normalize_line(line):
+    """Returns a copy of a BOM line fit to be sent to bom/match.
+
+    Unknown fields and empty values are dropped, header names are lower cased,
+    whitespace is collapsed, part numbers are upper cased and numeric fields
+    are converted to integers.
+    """
+    normalized = {}
+    for field, value in line.items():
+        if field is None or value is None:
+            continue
+        field = field.strip().lower()
+        kind = line_fields.get(field)
+        if kind is None:
+            continue
+        if kind is str:
+            value = ' '.join(str(value).split())
+            if field in part_number_fields:
+                value = value.upper()
+            if value:
+                normalized[field] = value
+        elif value != '':
+            normalized[field] = int(value)
+    return normalized
+
+def line_key(line):
+    """Returns the identity of a normalized line: lines with the same key are
+    the same query, whatever their reference and the case of their fields."""
+    return tuple(sorted((field, value.casefold() if isinstance(value, str) else value)
+                        for field, value in line.items() if field != 'reference'))
+
+def dedupe_lines(lines):
+    """Collapses duplicate normalized lines into single queries.
+
+    returns A pair containing:
+        -The list of unique queries, without their references.
+        -The list giving, for every line, the index of its query.
+    """
+    queries = []
+    positions = []
+    seen = {}
+    for line in lines:
+        key = line_key(line)
+        position = seen.get(key)
+        if position is None:
+            position = seen[key] = len(queries)
+            queries.append({f: v for f, v in line.items() if f != 'reference'})
+        positions.append(position)
+    return queries, positions
+
+def fan_out(line, result):
+    """Returns the result of a deduplicated query for one of its lines."""
+    if result is None:
+        return None
+    result = dict(result)
+    result['reference'] = line.get('reference', '')
+    return result
+
+def chunked(iterable, size):
+    """Yields lists of up to size consecutive items of iterable."""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+''' Pipeline '''
+
+class OctopartBomPipeline(object):
+
+    """Matches a stream of BOM lines with concurrent bom/match requests.
+
+    >>> pipeline = OctopartBomPipeline(Octopart(apikey='yourapikey'), workers=8)
+    >>> for line, result in pipeline.run(read_lines(open('bom.csv'))):
+    ...     print(line['mpn'], result['status'])
+    """
+
+    def __init__(self, api, chunk_size=max_chunk_size, workers=4, max_pending=None,
+                 journal=None, retries=0, backoff=1.0, dedupe=False, window=1000, **optimize):
+        """
+        param api: the Octopart instance issuing the requests.
+        param chunk_size: number of lines per bom/match request (at most 20).
+        param workers: number of concurrent requests.
+        param max_pending: maximum number of batches in flight or waiting to be
+            written, defaults to twice the number of workers.
+        param journal: an optional OctopartJournal (or its path) recording the
+            completed batches, so that an interrupted run can be resumed.
+        param retries: number of retries of a failing batch.
+        param backoff: delay before the first retry, doubled for every retry.
+        param dedupe: when True, duplicate lines within a window of input lines
+            are sent as a single query, whose result is fanned out to every line.
+        param window: number of input lines deduplicated together.
+        param optimize: optimize_* arguments of Octopart.bom_match().
+        """
+        if chunk_size not in range(1, max_chunk_size + 1):
+            raise ValueError('chunk_size must be between 1 and {}'.format(max_chunk_size))
+        self.api = api
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.max_pending = max_pending or 2 * workers
+        if journal is not None and not isinstance(journal, OctopartJournal):
+            journal = OctopartJournal(journal)
+        self.journal = journal
+        self.retries = retries
+        self.backoff = backoff
+        self.dedupe = dedupe
+        self.window = window if dedupe else chunk_size
+        self.match = api.prepare('bom_match', raw=True, **optimize)
+        # Input lines, queries sent, and lines and requests saved by deduplication
+        self.stats = {
+            'lines': 0,
+            'queries': 0,
+            'requests': 0,
+            'saved_lines': 0,
+            'saved_requests': 0,
+        }
+        # Indexes of the batches without results, and whether time ran out
+        self.missing = []
+        self.expired = False
+
+    def _match_chunk(self, index, lines):
+        """Returns the raw bom/match results of a list of lines, in order."""
+        if self.journal is not None:
+            digest = chunk_digest('bom_match', lines)
+            if self.journal.done(index, digest):
+                return self.journal.results(index)
+        json_obj = call_with_retry(lambda: self.match(lines=lines), self.retries, self.backoff)
+        results = json_obj['results'] if json_obj else [None] * len(lines)
+        if self.journal is not None:
+            self.journal.record(index, digest, results)
+        return results
+
+    def run(self, lines, timeout=None):
+        """Yields (line, result) pairs in input order.
+
+        param lines: iterable of BOM line dictionaries, normalized on the fly.
+        param timeout: seconds the run may take; the deadline of the calling
+            context by default.  Once it has passed, no more input is read and
+            no more requests are sent: the lines of the batches not completed
+            get a None result, and their indexes are added to `missing`.
+            So are those of the batches refused by an open circuit or for
+            lack of API key budget.
+        returns: a generator of pairs of the normalized line and its raw
+            bom/match result (None when the API had no answer for it).
+        """
+        deadline = OctopartDeadline(timeout) if timeout is not None else current_deadline()
+        self.missing = []
+        self.expired = False
+        with ThreadPoolExecutor(self.workers) as executor:
+            pending = deque()
+            outstanding = 0
+            index = 0
+            for block in chunked((normalize_line(l) for l in lines), self.window):
+                if self.dedupe:
+                    queries, positions = dedupe_lines(block)
+                else:
+                    queries, positions = block, None
+                expired = deadline is not None and deadline.expired()
+                futures = []
+                for chunk in chunked(queries, self.chunk_size):
+                    # A window may hold more batches than max_pending: write
+                    # the earlier ones out, then wait for one in flight to finish
+                    while pending and outstanding + len(futures) >= self.max_pending:
+                        outstanding -= len(pending[0][2])
+                        yield from self._collect(pending.popleft())
+                    in_flight = [f for i, size, f in futures if f is not None and not f.done()]
+                    if len(in_flight) >= self.max_pending:
+                        wait(in_flight, return_when=FIRST_COMPLETED)
+                    future = None if expired else submit(executor, self._match_chunk, index, chunk,
+                                                         deadline=deadline)
+                    futures.append((index, len(chunk), future))
+                    index += 1
+                self._count(block, queries, len(futures))
+                pending.append((block, positions, futures))
+                outstanding += len(futures)
+                if expired:
+                    break
+                while outstanding > self.max_pending:
+                    outstanding -= len(pending[0][2])
+                    yield from self._collect(pending.popleft())
+            while pending:
+                yield from self._collect(pending.popleft())
+
+    def _count(self, block, queries, requests):
+        stats = self.stats
+        stats['lines'] += len(block)
+        stats['queries'] += len(queries)
+        stats['requests'] += requests
+        stats['saved_lines'] += len(block) - len(queries)
+        stats['saved_requests'] += -(-len(block) // self.chunk_size) - requests
+
+    def _collect(self, job):
+        block, positions, futures = job
+        results = []
+        for index, size, future in futures:
+            try:
+                if future is None:
+                    raise CancelledError()
+                results.extend(future.result())
+            except (OctopartDeadlineExceededError, CancelledError):
+                self.expired = True
+                self.missing.append(index)
+                results.extend([None] * size)
+            except unavailable_errors:
+                self.missing.append(index)
+                results.extend([None] * size)
+        if positions is None:
+            return zip(block, results)
+        return ((line, fan_out(line, results[p])) for line, p in zip(block, positions))
+
+
+''' Output '''
+
+def write_results(results, fileobj):
+    """Writes (line, result) pairs as JSON lines, returns the number of lines."""
+    count = 0
+    for line, result in results:
+        fileobj.write(json.dumps({'line': line, 'result': result}))
+        fileobj.write('\n')
+        count += 1
+    return count
+
+
+''' Command line '''
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='pyoctopart.bulk',
+                                     description='Match a BOM file against Octopart, streaming results as JSON lines.')
+    parser.add_argument('input', help='BOM file, or - for standard input')
+    parser.add_argument('output', help='results file, or - for standard output')
+    parser.add_argument('--format', choices=formats,
+                        help='input format (guessed from the file name by default)')
+    parser.add_argument('--apikey', default=os.environ.get('OCTOPART_APIKEY'),
+                        help='Octopart API key (defaults to $OCTOPART_APIKEY)')
+    parser.add_argument('--chunk-size', type=int, default=max_chunk_size,
+                        help='lines per bom/match request')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='concurrent requests')
+    parser.add_argument('--max-pending', type=int, default=None,
+                        help='maximum number of batches held in memory')
+    parser.add_argument('--dedupe', action='store_true',
+                        help='send duplicate lines as a single query')
+    parser.add_argument('--journal', default=None,
+                        help='journal file recording completed batches, to resume an interrupted run')
+    parser.add_argument('--retries', type=int, default=3,
+                        help='retries of a failing batch')
+    args = parser.parse_args(argv)
+
+    format = args.format or guess_format(args.input)
+    api = Octopart(apikey=args.apikey)
+    pipeline = OctopartBomPipeline(api, args.chunk_size, args.workers, args.max_pending,
+                                   journal=args.journal, retries=args.retries, dedupe=args.dedupe)
+
+    # Spreadsheet CSV exports start with a UTF-8 byte order mark
+    infile = sys.stdin if args.input == '-' else open(args.input, newline='', encoding='utf-8-sig')
+    outfile = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        count = write_results(pipeline.run(read_lines(infile, format)), outfile)
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+        if outfile is not sys.stdout:
+            outfile.close()
+        if pipeline.journal is not None:
+            pipeline.journal.close()
+    print('{} lines matched'.format(count), file=sys.stderr)
+    if args.dedupe:
+        print('{saved_lines} duplicate lines, {saved_requests} requests saved'.format(**pipeline.stats),
+              file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
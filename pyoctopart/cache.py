@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Response caches for the Octopart client.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import time
+import threading
+
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+# Parameters that do not change the response, and must not end up in keys
+_unkeyed_params = ('apikey', 'callback')
+
+def request_key(req_url, payload):
+    """Builds the canonical cache key of a request.
+
+    The key is the request URL followed by the sorted, encoded query string,
+    without the API key and callback parameters.
+    """
+    params = sorted((k, v) for k, v in payload.items() if k not in _unkeyed_params)
+    return req_url + '?' + urlencode(params, doseq=True)
+
+def new_entry(json_obj, size, etag=None, last_modified=None):
+    """Builds a cache entry.
+
+    param json_obj: the decoded JSON response.
+    param size: size in bytes of the decoded response body.
+    param etag: the response's ETag header, if any.
+    param last_modified: the response's Last-Modified header, if any.
+    """
+    return {
+        'json': json_obj,
+        'size': size,
+        'etag': etag,
+        'last_modified': last_modified,
+        'stored': time.time(),
+    }
+
+class OctopartStaleResponse(dict):
+
+    """A JSON response served from the cache without revalidation, while
+    the API is unavailable.  `stale` is True, and `age` is the age of the
+    response in seconds."""
+
+    stale = True
+
+    def __init__(self, json_obj, age):
+        dict.__init__(self, json_obj)
+        self.age = age
+
+class OctopartStaleList(list):
+
+    """A list JSON response (as answered by the *_get_multi methods) served
+    from the cache without revalidation; see OctopartStaleResponse."""
+
+    stale = True
+
+    def __init__(self, json_obj, age):
+        list.__init__(self, json_obj)
+        self.age = age
+
+def stale_response(entry):
+    """Returns the JSON response of a cache entry, marked stale."""
+    stale = OctopartStaleList if isinstance(entry['json'], list) else OctopartStaleResponse
+    return stale(entry['json'], time.time() - entry['stored'])
+
+
+class OctopartCache(object):
+
+    """Base class of the response caches.
+
+    A cache maps canonical request keys (see request_key()) to entries (see
+    new_entry()).  An entry younger than `ttl` seconds is fresh and is served
+    without any request; an older one is revalidated with a conditional request.
+    Subclasses implement _get(), _set() and _delete(), which may be called
+    from several threads at once.
+    """
+
+    def __init__(self, ttl=0):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Functions called with the key and the entry found (or None), on every lookup
+        self.watchers = []
+
+    def get(self, key):
+        """Returns the entry stored for key, fresh or not, or None."""
+        entry = self._get(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        for watcher in self.watchers:
+            watcher(key, entry)
+        return entry
+
+    def set(self, key, entry):
+        self._set(key, entry)
+
+    def delete(self, key):
+        self._delete(key)
+
+    def touch(self, key, entry):
+        """Marks a revalidated entry as fresh again."""
+        entry['stored'] = time.time()
+        self._set(key, entry)
+
+    def is_fresh(self, entry):
+        return time.time() - entry['stored'] < self.ttl
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def _get(self, key):
+        raise NotImplementedError
+
+    def _set(self, key, entry):
+        raise NotImplementedError
+
+    def _delete(self, key):
+        raise NotImplementedError
+
+
+class OctopartMemoryCache(OctopartCache):
+
+    """An in-process, least recently used response cache."""
+
+    def __init__(self, ttl=0, max_entries=10000):
+        OctopartCache.__init__(self, ttl)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._entries_lock = threading.Lock()
+
+    def _get(self, key):
+        with self._entries_lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _set(self, key, entry):
+        with self._entries_lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _delete(self, key):
+        with self._entries_lock:
+            self._entries.pop(key, None)
+
+    def keys(self):
+        with self._entries_lock:
+            return list(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
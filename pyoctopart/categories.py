@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Locally cached category tree.
+
+The whole category taxonomy is loaded once with batched `categories_get_multi`
+calls, saved to disk, and indexed in memory so that parent, children,
+ancestors, descendants and "is X under Y" questions are answered without any
+network call.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import json
+import time
+
+from .octopart import OctopartCategory
+
+# Category fields kept in the tree
+category_fields = ('id', 'parent_id', 'nodename', 'images', 'children_ids', 'ancestor_ids', 'num_parts')
+
+
+class OctopartCategoryTree(object):
+
+    """An in-memory index of the category taxonomy.
+
+    Categories are numbered in depth-first order: the descendants of a
+    category are the categories numbered between its entry and exit numbers.
+    This makes descendant lists a slice and "is X under Y" a comparison.
+
+    >>> tree = OctopartCategoryTree.cached(o, 'categories.json', [4161])
+    >>> tree.is_under(4174, 4161)
+    True
+    >>> [c.nodename for c in tree.ancestors(4174)]
+    """
+
+    def __init__(self, nodes):
+        """
+        param nodes: iterable of category dictionaries, as returned by the API.
+        """
+        self.nodes = {}
+        for node in nodes:
+            self.nodes[node['id']] = {f: node.get(f) for f in category_fields}
+        self._categories = {}
+        self._index()
+
+    def _index(self):
+        self._order = []
+        self._enter = {}
+        self._exit = {}
+        roots = [id for id, node in self.nodes.items() if node['parent_id'] not in self.nodes]
+        for root in sorted(roots):
+            stack = [(root, False)]
+            while stack:
+                id, done = stack.pop()
+                if done:
+                    self._exit[id] = len(self._order)
+                    continue
+                self._enter[id] = len(self._order)
+                self._order.append(id)
+                stack.append((id, True))
+                for child in reversed(self.children_ids(id)):
+                    stack.append((child, False))
+        self.roots = sorted(roots)
+
+    ''' Loading and saving '''
+
+    @classmethod
+    def from_api(cls, api, root_ids, batch_size=100):
+        """Loads every category under root_ids, one level at a time.
+
+        param api: the Octopart instance issuing the requests.
+        param root_ids: ids of the top categories to load.
+        param batch_size: number of categories fetched per request.
+        """
+        nodes = []
+        seen = set()
+        level = list(root_ids)
+        while level:
+            next_level = []
+            for start in range(0, len(level), batch_size):
+                result = api.categories_get_multi(level[start:start + batch_size])
+                if result is None:
+                    continue
+                for node in result[0]:
+                    if node['id'] in seen:
+                        continue
+                    seen.add(node['id'])
+                    nodes.append(node)
+                    next_level.extend(c for c in node['children_ids'] if c not in seen)
+            level = next_level
+        return cls(nodes)
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path) as f:
+            return cls(json.load(f)['categories'])
+
+    def save(self, path):
+        """Saves the tree to path, atomically."""
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'saved': time.time(), 'categories': list(self.nodes.values())}, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def cached(cls, api, path, root_ids, max_age=None):
+        """Loads the tree from path, or from the API when the file is missing
+        or older than max_age seconds, and saves it to path.
+        """
+        if os.path.exists(path):
+            if max_age is None or time.time() - os.path.getmtime(path) < max_age:
+                return cls.from_file(path)
+        tree = cls.from_api(api, root_ids)
+        tree.save(path)
+        return tree
+
+    ''' Queries '''
+
+    def __contains__(self, id):
+        return id in self.nodes
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def category(self, id):
+        """Returns the OctopartCategory of id, built once and shared."""
+        category = self._categories.get(id)
+        if category is None:
+            node = self.nodes[id]
+            category = OctopartCategory(node['id'], node['parent_id'], node['nodename'],
+                                        node['images'], node['children_ids'], node['ancestor_ids'],
+                                        [], node['num_parts'])
+            self._categories[id] = category
+        return category
+
+    def parent_id(self, id):
+        parent_id = self.nodes[id]['parent_id']
+        return parent_id if parent_id in self.nodes else None
+
+    def parent(self, id):
+        parent_id = self.parent_id(id)
+        return self.category(parent_id) if parent_id is not None else None
+
+    def children_ids(self, id):
+        return [c for c in self.nodes[id]['children_ids'] if c in self.nodes]
+
+    def children(self, id):
+        return [self.category(c) for c in self.children_ids(id)]
+
+    def ancestor_ids(self, id):
+        """Returns the ids of the ancestors of id, immediate parent first."""
+        ancestors = []
+        id = self.parent_id(id)
+        while id is not None:
+            ancestors.append(id)
+            id = self.parent_id(id)
+        return ancestors
+
+    def ancestors(self, id):
+        return [self.category(a) for a in self.ancestor_ids(id)]
+
+    def descendant_ids(self, id):
+        """Returns the ids of all the categories under id, in depth-first order."""
+        return self._order[self._enter[id] + 1:self._exit[id]]
+
+    def descendants(self, id):
+        return [self.category(d) for d in self.descendant_ids(id)]
+
+    def is_under(self, id, ancestor_id):
+        """Tells whether id is a descendant of ancestor_id."""
+        return self._enter[ancestor_id] < self._enter[id] < self._exit[ancestor_id]
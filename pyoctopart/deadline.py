@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Deadlines.
+
+A deadline bounds the total time of a call, whatever the number of requests,
+retries, chunks or pages it takes.  It is set for a block of code with
+deadline(seconds), and carried to the threads working for that block by
+submit().  Every request is sent with the time left as its timeout, retries
+are not attempted when their delay would go past the deadline, and no
+request is sent once it has passed: OctopartDeadlineExceededError is raised
+instead.  Chunked and paged operations then return the results gathered so
+far as OctopartPartialResults, listing the chunks missing.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import time
+import contextlib
+import contextvars
+
+from .exceptions import OctopartDeadlineExceededError
+
+_current = contextvars.ContextVar('pyoctopart_deadline', default=None)
+
+
+class OctopartDeadline(object):
+
+    """A point in time, seconds from now, after which no request is sent."""
+
+    __slots__ = ['expires']
+
+    def __init__(self, seconds):
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(self.expires - time.monotonic(), 0.0)
+
+    def expired(self):
+        return time.monotonic() >= self.expires
+
+    def check(self, method):
+        """Raises OctopartDeadlineExceededError if the deadline has passed."""
+        if self.expired():
+            raise OctopartDeadlineExceededError(method)
+
+
+class OctopartPartialResults(list):
+
+    """The results of a chunked or paged operation, in order, with None for
+    the items of the chunks that could not be fetched in time.
+
+    `missing` lists the indexes of the missing chunks (or the start offsets
+    of the missing pages).
+    """
+
+    def __init__(self, results, missing=()):
+        list.__init__(self, results)
+        self.missing = list(missing)
+
+    @property
+    def complete(self):
+        return not self.missing
+
+
+def current_deadline():
+    """Returns the OctopartDeadline of the calling context, or None."""
+    return _current.get()
+
+@contextlib.contextmanager
+def within(deadline):
+    """Runs a block with an OctopartDeadline, or with none if deadline is None."""
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+def deadline(seconds):
+    """Runs a block with a deadline, seconds from now.
+
+    A deadline nested in another one can only shorten it.
+
+    >>> with deadline(2.0):
+    ...     results = job.run()
+    """
+    new = OctopartDeadline(seconds)
+    outer = _current.get()
+    if outer is not None and outer.expires < new.expires:
+        new = outer
+    return within(new)
+
+def remaining(timeout=None):
+    """Returns the timeout of a request: the time left before the current
+    deadline, or timeout if it is shorter or if there is no deadline."""
+    current = _current.get()
+    if current is None:
+        return timeout
+    left = current.remaining()
+    return left if timeout is None else min(left, timeout)
+
+def submit(executor, fun, *args, deadline=None):
+    """Submits fun(*args) to an executor, to run with the deadline of the
+    calling context, or with the given OctopartDeadline."""
+    context = contextvars.copy_context()
+    if deadline is not None:
+        context.run(_current.set, deadline)
+    return executor.submit(context.run, fun, *args)
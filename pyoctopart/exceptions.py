@@ -132,3 +132,40 @@ class OctopartTooLongListError(OctopartException):
 
 
 
+
+class OctopartCircuitOpenError(OctopartException):
+    def __init__(self, method, retry_after):
+        OctopartException.__init__(self, [], [], [], "")
+        self.method = method
+        self.retry_after = retry_after
+
+    def __str__(self):
+        return "Circuit open for '{}', retry in {:.1f}s.".format(self.method, self.retry_after)
+
+class OctopartRateLimitError(OctopartException):
+    def __init__(self, waited):
+        OctopartException.__init__(self, [], [], [], "")
+        self.waited = waited
+
+    def __str__(self):
+        return "No API key with budget left after {:.1f}s.".format(self.waited)
+
+class OctopartDeadlineExceededError(OctopartException):
+    def __init__(self, method):
+        OctopartException.__init__(self, [], [], [], "")
+        self.method = method
+
+    def __str__(self):
+        return "Deadline exceeded before '{}' could complete.".format(self.method)
+
+class OctopartCacheNodeError(OctopartException):
+    def __init__(self, url, status, reason=None):
+        OctopartException.__init__(self, [], [], [], "")
+        self.url = url
+        self.status = status
+        self.reason = reason
+
+    def __str__(self):
+        if self.reason:
+            return "Cache node '{}': {}.".format(self.url, self.reason)
+        return "Cache node '{}' answered HTTP {}.".format(self.url, self.status)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Hedged requests.
+
+A few slow responses make the tail latency of a whole BOM page.  When a
+request of an idempotent read method has not been answered after a delay,
+an OctopartHedger sends the same request again and keeps the first answer.
+The delay is a percentile of the recent latencies of the method, so only
+about the slowest (100 - percentile)% of the requests are hedged, and the
+number of duplicate requests is capped at a fraction of all requests, so
+that the quota use stays bounded.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import time
+import threading
+import contextvars
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+
+# Method paths of the read methods that are safe to send twice
+hedged_methods = ('parts/match', 'parts/{uid}', 'parts/get', 'parts/get_multi')
+
+
+class OctopartHedger(object):
+
+    """Sends a second copy of slow requests, and keeps the first answer.
+
+    >>> o = Octopart(apikey, hedger=OctopartHedger(percentile=95, max_rate=0.05))
+    """
+
+    def __init__(self, percentile=95, min_delay=0.05, max_rate=0.05, window=1000, min_samples=20,
+                 initial_delay=1.0, workers=32, methods=hedged_methods):
+        """
+        param percentile: a request is hedged once it is slower than this
+            percentile of the recent latencies of its method.
+        param min_delay: the shortest delay before hedging, in seconds.
+        param max_rate: maximum number of hedges per request.
+        param window: number of recent latencies kept per method.
+        param min_samples: below that many latencies, initial_delay is used.
+        param initial_delay: the delay before hedging, in seconds, until the
+            latencies of a method are known.
+        param workers: number of threads running the requests.
+        param methods: the method paths to hedge.
+        """
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_rate = max_rate
+        self.window = window
+        self.min_samples = min_samples
+        self.initial_delay = initial_delay
+        self.methods = frozenset(methods)
+        self.stats = {'requests': 0, 'hedges': 0, 'hedge_wins': 0}
+        self._latencies = {}
+        self._executor = ThreadPoolExecutor(workers)
+        self._lock = threading.Lock()
+
+    def delay(self, method):
+        """Returns the delay before hedging a request of method, in seconds."""
+        with self._lock:
+            latencies = sorted(self._latencies.get(method, ()))
+        if len(latencies) < self.min_samples:
+            return max(self.initial_delay, self.min_delay)
+        index = min(int(len(latencies) * self.percentile / 100), len(latencies) - 1)
+        return max(latencies[index], self.min_delay)
+
+    def _record(self, method, latency):
+        with self._lock:
+            latencies = self._latencies.get(method)
+            if latencies is None:
+                latencies = self._latencies[method] = deque(maxlen=self.window)
+            latencies.append(latency)
+
+    def _may_hedge(self):
+        with self._lock:
+            if self.stats['hedges'] + 1 > self.max_rate * self.stats['requests']:
+                return False
+            self.stats['hedges'] += 1
+            return True
+
+    def _timed(self, method, fun):
+        start = time.monotonic()
+        result = fun()
+        self._record(method, time.monotonic() - start)
+        return result
+
+    def call(self, method, fun):
+        """Calls fun(), and calls it again if it is slow to return.
+
+        fun is called on the hedger's threads, and must be safe to call twice.
+        returns: the result of the first call to return; if both calls fail,
+            the exception of the first call is raised.
+        """
+        if method not in self.methods:
+            return fun()
+        with self._lock:
+            self.stats['requests'] += 1
+        # fun runs in the context of the caller, with its deadline
+        primary = self._executor.submit(contextvars.copy_context().run, self._timed, method, fun)
+        done, pending = wait([primary], timeout=self.delay(method))
+        if done or not self._may_hedge():
+            return primary.result()
+        hedge = self._executor.submit(contextvars.copy_context().run, self._timed, method, fun)
+        pending = [primary, hedge]
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in (primary, hedge):
+                if future in done and future.exception() is None:
+                    if future is hedge:
+                        with self._lock:
+                            self.stats['hedge_wins'] += 1
+                    return future.result()
+        return primary.result()
+
+    def hedge_rate(self):
+        requests = self.stats['requests']
+        return self.stats['hedges'] / requests if requests else 0.0
+
+    def close(self):
+        self._executor.shutdown(wait=False)
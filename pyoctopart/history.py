@@ -0,0 +1,334 @@
+#!/usr/bin/env python
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Price and stock history.
+
+An OctopartHistory keeps, for every offer (part uid, supplier id, sku), the
+series of its price breaks and quantity in stock over time.  Observations
+are appended in time order, and run-length compressed: an observation equal
+to the last one only extends its run, so the history grows with the number
+of changes rather than the number of polls.  Runs are kept in compact
+columns (start time, stock, index into the distinct price lists of the
+offer), searched by bisection for range queries and downsampling.
+
+Saved histories are delta encoded (times and stock as differences from the
+previous run) and zlib compressed.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import json
+import time
+import zlib
+import bisect
+import datetime
+import threading
+
+from array import array
+
+from .octopart import iter_parts
+from .suppliers import offer_supplier_id
+
+magic = b'OPHIST01'
+
+_epoch = datetime.datetime(1970, 1, 1)
+
+_UNKNOWN = -1           # stock of the offers that do not tell it
+
+
+def timestamp(ts):
+    """Returns a time (datetime, ISO 8601 string or number) in integer seconds since the epoch."""
+    if isinstance(ts, datetime.datetime):
+        if ts.tzinfo is not None:
+            ts = ts.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        return int((ts - _epoch).total_seconds())
+    if isinstance(ts, str):
+        return timestamp(datetime.datetime.strptime(ts.rstrip('Z'), '%Y-%m-%dT%H:%M:%S'))
+    if isinstance(ts, tuple):
+        # Serialized datetimes (see serialize.py)
+        return int(ts[0])
+    return int(ts)
+
+def price_breaks(prices):
+    """Returns the price breaks of an offer as a sorted tuple of (currency, quantity, price).
+
+    Handles API v2 price lists ([[quantity, price, currency], ...]) and API v3
+    price dictionaries ({currency: [[quantity, price], ...]}).
+    """
+    if isinstance(prices, dict):
+        breaks = [(currency, b[0], float(b[1])) for currency, bs in prices.items() for b in bs]
+    else:
+        breaks = [(b[2] if len(b) > 2 else 'USD', b[0], float(b[1])) for b in prices or []]
+    return tuple(sorted(breaks))
+
+def unit_price(breaks, quantity=1, currency='USD'):
+    """Returns the unit price for quantity from price breaks, or None."""
+    price = None
+    for break_currency, break_quantity, break_price in breaks:
+        if break_currency == currency and break_quantity <= quantity:
+            price = break_price
+    return price
+
+
+class OctopartPriceSeries(object):
+
+    """The run-length compressed history of one offer.
+
+    Run i starts at times[i], and holds stocks[i] and the price breaks
+    price_lists[prices[i]] until the next run starts; polls[i] observations
+    fell in it.
+    """
+
+    __slots__ = ['times', 'stocks', 'prices', 'polls', 'price_lists', 'last_seen', '_price_index']
+
+    def __init__(self):
+        self.times = array('q')
+        self.stocks = array('q')
+        self.prices = array('l')
+        self.polls = array('l')
+        self.price_lists = []
+        self.last_seen = None
+        self._price_index = {}
+
+    def __len__(self):
+        return len(self.times)
+
+    def _price_ref(self, breaks):
+        ref = self._price_index.get(breaks)
+        if ref is None:
+            ref = self._price_index[breaks] = len(self.price_lists)
+            self.price_lists.append(breaks)
+        return ref
+
+    def append(self, ts, avail, breaks):
+        """Appends an observation.
+
+        Raises ValueError if it is older than the last one.
+        returns: True if it starts a new run, False if it extends the last one.
+        """
+        if self.last_seen is not None and ts < self.last_seen:
+            raise ValueError('observation at {} older than the last one, at {}'.format(ts, self.last_seen))
+        stock = _UNKNOWN if avail is None else avail
+        ref = self._price_ref(breaks)
+        self.last_seen = ts
+        if self.times and self.stocks[-1] == stock and self.prices[-1] == ref:
+            self.polls[-1] += 1
+            return False
+        self.times.append(ts)
+        self.stocks.append(stock)
+        self.prices.append(ref)
+        self.polls.append(1)
+        return True
+
+    def _run(self, i):
+        stock = self.stocks[i]
+        return self.times[i], None if stock == _UNKNOWN else stock, self.price_lists[self.prices[i]]
+
+    def at(self, ts):
+        """Returns the (start time, avail, price breaks) of the run in effect at ts, or None."""
+        i = bisect.bisect_right(self.times, ts) - 1
+        return self._run(i) if i >= 0 else None
+
+    def range(self, start=None, end=None):
+        """Returns the (start time, avail, price breaks) runs in effect between
+        start and end (inclusive, None for no bound), in time order.
+
+        The first run may have started before start.
+        """
+        first = 0 if start is None else max(bisect.bisect_right(self.times, start) - 1, 0)
+        last = len(self.times) if end is None else bisect.bisect_right(self.times, end)
+        return [self._run(i) for i in range(first, last)]
+
+    def downsample(self, start, end, step, field='avail', how='last', quantity=1, currency='USD'):
+        """Returns one (bucket start, value) per step seconds between start and end.
+
+        param field: 'avail' for the stock, 'price' for the unit price at quantity.
+        param how: 'last' for the value at the end of the bucket, 'min', 'max',
+            or 'mean' for the time-weighted mean.
+        The value is None for the buckets before the first observation.
+        """
+        if how not in ('last', 'min', 'max', 'mean'):
+            raise ValueError('unknown downsampling {!r}'.format(how))
+        if field == 'avail':
+            value = lambda i: None if self.stocks[i] == _UNKNOWN else self.stocks[i]
+        elif field == 'price':
+            value = lambda i: unit_price(self.price_lists[self.prices[i]], quantity, currency)
+        else:
+            raise ValueError('unknown field {!r}'.format(field))
+        samples = []
+        for bucket in range(start, end, step):
+            bucket_end = min(bucket + step, end)
+            first = bisect.bisect_right(self.times, bucket) - 1
+            last = bisect.bisect_left(self.times, bucket_end) - 1
+            if how == 'last':
+                samples.append((bucket, value(last) if last >= 0 else None))
+                continue
+            # (value, seconds in effect within the bucket) of the runs
+            runs = []
+            for i in range(max(first, 0), last + 1):
+                v = value(i)
+                if v is not None:
+                    run_end = self.times[i + 1] if i + 1 < len(self.times) else bucket_end
+                    runs.append((v, min(run_end, bucket_end) - max(self.times[i], bucket)))
+            if not runs:
+                samples.append((bucket, None))
+            elif how == 'min':
+                samples.append((bucket, min(v for v, seconds in runs)))
+            elif how == 'max':
+                samples.append((bucket, max(v for v, seconds in runs)))
+            else:
+                seconds = sum(s for v, s in runs)
+                samples.append((bucket, sum(v * s for v, s in runs) / seconds if seconds
+                                else runs[-1][0]))
+        return samples
+
+    def encode(self):
+        """Returns the series as delta encoded lists."""
+        return {
+            'times': [t - p for t, p in zip(self.times, [0] + list(self.times[:-1]))],
+            'stocks': [s - p for s, p in zip(self.stocks, [0] + list(self.stocks[:-1]))],
+            'prices': list(self.prices),
+            'polls': list(self.polls),
+            'price_lists': [list(map(list, breaks)) for breaks in self.price_lists],
+            'last_seen': self.last_seen,
+        }
+
+    @classmethod
+    def decode(cls, encoded):
+        series = cls()
+        total = 0
+        for delta in encoded['times']:
+            total += delta
+            series.times.append(total)
+        total = 0
+        for delta in encoded['stocks']:
+            total += delta
+            series.stocks.append(total)
+        series.prices.extend(encoded['prices'])
+        series.polls.extend(encoded['polls'])
+        for breaks in encoded['price_lists']:
+            series._price_ref(tuple(tuple(b) for b in breaks))
+        series.last_seen = encoded['last_seen']
+        return series
+
+
+class OctopartHistory(object):
+
+    """Price and stock history of offers, keyed by (part uid, supplier id, sku).
+
+    >>> history = OctopartHistory()
+    >>> o.observers.append(history.observe)     # record every part fetched
+    >>> history.series(uid, 459, 'DK123').range(start, end)
+    >>> history.series(uid, 459, 'DK123').downsample(start, end, 86400, field='price')
+    """
+
+    def __init__(self):
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._series)
+
+    def __contains__(self, key):
+        return key in self._series
+
+    def keys(self, uid=None):
+        """Returns the (part uid, supplier id, sku) keys, or those of one part."""
+        with self._lock:
+            return [key for key in self._series if uid is None or key[0] == uid]
+
+    def series(self, uid, supplier_id, sku):
+        """Returns the OctopartPriceSeries of an offer, or None."""
+        return self._series.get((uid, supplier_id, sku))
+
+    def append(self, key, ts, avail, prices):
+        """Appends an observation of the offer key.
+
+        param ts: the time of the observation (datetime, ISO 8601 string or seconds).
+        param avail: the quantity in stock, None if unknown.
+        param prices: the offer's prices, as returned by the API.
+        returns: True if it is a change.
+        """
+        breaks = price_breaks(prices)
+        ts = timestamp(ts)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = OctopartPriceSeries()
+            return series.append(ts, avail, breaks)
+
+    def record(self, part, ts=None):
+        """Appends the offers of an OctopartPart or a Part resource dictionary.
+
+        Offers are timed by their update_ts, or by ts (now by default).  Offers
+        older than their last observation are ignored.
+        returns: the number of changes recorded.
+        """
+        if isinstance(part, dict):
+            uid, offers = part['uid'], part.get('offers') or []
+        else:
+            uid, offers = part.uid, part.offers
+        now = time.time() if ts is None else ts
+        changes = 0
+        for offer in offers:
+            key = (uid, offer_supplier_id(offer), offer.get('sku'))
+            avail = offer.get('avail', offer.get('in_stock_quantity'))
+            try:
+                changes += self.append(key, offer.get('update_ts') or now,
+                                       avail if isinstance(avail, int) and avail >= 0 else None,
+                                       offer.get('prices'))
+            except ValueError:
+                pass
+        return changes
+
+    def observe(self, method, json_obj):
+        """Records the offers of the parts of a response, to be used as an Octopart observer."""
+        for part in iter_parts(json_obj):
+            if 'uid' in part and 'offers' in part:
+                self.record(part)
+
+    def stats(self):
+        """Returns the number of series, runs stored and observations appended."""
+        with self._lock:
+            series = list(self._series.values())
+        return {'series': len(series),
+                'runs': sum(len(s) for s in series),
+                'polls': sum(sum(s.polls) for s in series)}
+
+    def save(self, path):
+        """Writes the history to a file, delta encoded and compressed.
+
+        The file is written next to path and renamed over it once complete.
+        """
+        with self._lock:
+            encoded = [[list(key), series.encode()] for key, series in self._series.items()]
+        data = zlib.compress(json.dumps(encoded, separators=(',', ':')).encode())
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(magic)
+            f.write(data)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """Reads a history written by save()."""
+        with open(path, 'rb') as f:
+            if f.read(len(magic)) != magic:
+                raise ValueError('{} is not a pyoctopart history'.format(path))
+            encoded = json.loads(zlib.decompress(f.read()).decode())
+        history = cls()
+        for key, series in encoded:
+            history._series[tuple(key)] = OctopartPriceSeries.decode(series)
+        return history
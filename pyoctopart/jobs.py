@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Resumable bulk jobs.
+
+A job splits a long list of `bom_match` lines or `parts_match` queries into
+chunks, and records the results of every completed chunk in an append-only
+journal file.  Failed chunks are retried a few times; chunks still failing are
+left out of the journal, so running the job again, even after a crash or a
+restart, only issues the chunks that have not completed yet.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+import requests
+
+from concurrent.futures import CancelledError
+from concurrent.futures import ThreadPoolExecutor
+
+from .exceptions import Octopart503Error
+from .exceptions import OctopartArgumentInvalidError
+from .exceptions import OctopartDeadlineExceededError
+from .exceptions import OctopartCircuitOpenError
+from .exceptions import OctopartRateLimitError
+from .deadline import OctopartDeadline
+from .deadline import OctopartPartialResults
+from .deadline import current_deadline
+from .deadline import submit
+
+# Errors worth retrying a chunk for
+retryable_errors = (Octopart503Error, requests.RequestException)
+
+# Errors of the calls refused without a request (open circuit, no API key
+# budget left): the chunk fails, the others go on
+unavailable_errors = (OctopartCircuitOpenError, OctopartRateLimitError)
+
+# Variable argument and maximum chunk size of the methods jobs can run
+job_methods = {
+    'bom_match': ('lines', 20),
+    'parts_match': ('queries', 20),
+}
+
+
+def chunk_digest(method, chunk):
+    """Fingerprints a chunk, so journal records are only reused for the same input."""
+    data = json.dumps([method, chunk], sort_keys=True).encode()
+    return hashlib.sha1(data).hexdigest()
+
+def call_with_retry(fun, retries=3, backoff=1.0):
+    """Calls fun(), retrying up to `retries` times on retryable errors.
+
+    The delay between two attempts starts at `backoff` seconds and doubles
+    after every attempt.  No attempt is made after the deadline of the
+    calling context: the last error is raised instead.
+    """
+    delay = backoff
+    deadline = current_deadline()
+    for attempt in range(retries + 1):
+        try:
+            return fun()
+        except retryable_errors:
+            if attempt == retries or (deadline is not None and deadline.remaining() <= delay):
+                raise
+            time.sleep(delay)
+            delay *= 2
+
+
+class OctopartJournal(object):
+
+    """An append-only journal of completed chunks.
+
+    Every record is a JSON line holding a chunk index, the chunk digest and the
+    chunk results, flushed to disk before the chunk is considered done.  Only
+    the offsets of the records are kept in memory; results are read back on
+    demand.  A record truncated by a crash is ignored.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._offsets = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            self._load()
+        self._file = open(path, 'ab')
+
+    def _load(self):
+        with open(self.path, 'rb') as f:
+            offset = 0
+            for row in f:
+                try:
+                    record = json.loads(row.decode())
+                except ValueError:
+                    break
+                self._offsets[record['chunk']] = (offset, record['digest'])
+                offset += len(row)
+        with open(self.path, 'ab') as f:
+            f.truncate(offset)
+
+    def __contains__(self, chunk):
+        return chunk in self._offsets
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def done(self, chunk, digest):
+        """Tells whether chunk has been recorded for the same input."""
+        recorded = self._offsets.get(chunk)
+        return recorded is not None and recorded[1] == digest
+
+    def record(self, chunk, digest, results):
+        row = json.dumps({'chunk': chunk, 'digest': digest, 'results': results}).encode() + b'\n'
+        with self._lock:
+            offset = self._file.tell()
+            self._file.write(row)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._offsets[chunk] = (offset, digest)
+
+    def results(self, chunk):
+        """Reads the results recorded for chunk."""
+        offset, digest = self._offsets[chunk]
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.readline().decode())['results']
+
+    def close(self):
+        self._file.close()
+
+
+class OctopartJob(object):
+
+    """A resumable, chunked bom_match or parts_match job.
+
+    >>> job = OctopartJob(o, 'bom_match', lines, 'bom.journal')
+    >>> results = job.run()
+    >>> if job.failed:
+    ...     results = job.run()    # only issues the chunks that failed
+
+    Results are the raw JSON results of every line or query, in input order;
+    the results of chunks that could not be completed are None.
+
+    >>> results = job.run(timeout=2.0)
+    >>> results.missing     # the chunks not completed in 2 seconds
+    """
+
+    def __init__(self, api, method, items, journal, chunk_size=None, workers=4,
+                 retries=3, backoff=1.0, **static):
+        """
+        param api: the Octopart instance issuing the requests.
+        param method: 'bom_match' or 'parts_match'.
+        param items: list of bom_match lines or parts_match queries.
+        param journal: an OctopartJournal, or the path of its file.
+        param chunk_size: number of items per request, defaults to the method's maximum.
+        param workers: number of concurrent requests.
+        param retries: number of retries of a failing chunk.
+        param backoff: delay before the first retry, doubled for every retry.
+        param static: static arguments of the method, see Octopart.prepare().
+        """
+        if method not in job_methods:
+            raise OctopartArgumentInvalidError([method], [], [])
+        self.variable, max_size = job_methods[method]
+        self.method = method
+        self.items = items
+        self.journal = journal if isinstance(journal, OctopartJournal) else OctopartJournal(journal)
+        self.chunk_size = min(chunk_size or max_size, max_size)
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.query = api.prepare(method, raw=True, **static)
+        self.failed = []
+        self.expired = False
+
+    def chunks(self):
+        """Yields (index, digest, chunk) for every chunk of the job."""
+        for index, start in enumerate(range(0, len(self.items), self.chunk_size)):
+            chunk = self.items[start:start + self.chunk_size]
+            yield index, chunk_digest(self.method, chunk), chunk
+
+    def _run_chunk(self, index, digest, chunk):
+        def call():
+            return self.query(**{self.variable: chunk})
+        json_obj = call_with_retry(call, self.retries, self.backoff)
+        results = json_obj['results'] if json_obj else [None] * len(chunk)
+        self.journal.record(index, digest, results)
+
+    def run(self, timeout=None):
+        """Runs the chunks not in the journal yet, and returns all the results.
+
+        param timeout: seconds the job may take; the deadline of the calling
+            context by default.  The chunks not started when it passes are
+            cancelled, and those in flight are not retried.
+        returns: OctopartPartialResults, whose `missing` lists the chunks that
+            failed or ran out of time, also in `failed`; `expired` tells
+            whether time ran out.
+        """
+        self.failed = []
+        self.expired = False
+        deadline = OctopartDeadline(timeout) if timeout is not None else current_deadline()
+        with ThreadPoolExecutor(self.workers) as executor:
+            futures = [(index, submit(executor, self._run_chunk, index, digest, chunk, deadline=deadline))
+                       for index, digest, chunk in self.chunks()
+                       if not self.journal.done(index, digest)]
+            for index, future in futures:
+                try:
+                    future.result()
+                except retryable_errors + unavailable_errors:
+                    self.failed.append(index)
+                except (OctopartDeadlineExceededError, CancelledError):
+                    self.failed.append(index)
+                    if not self.expired:
+                        self.expired = True
+                        for later_index, later in futures:
+                            later.cancel()
+        return self.results()
+
+    def results(self):
+        """Reassembles the recorded results in input order, as
+        OctopartPartialResults listing the chunks not recorded."""
+        results = []
+        missing = []
+        for index, digest, chunk in self.chunks():
+            if self.journal.done(index, digest):
+                results.extend(self.journal.results(index))
+            else:
+                results.extend([None] * len(chunk))
+                missing.append(index)
+        return OctopartPartialResults(results, missing)
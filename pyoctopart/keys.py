@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+API key pool with a host-wide rate budget.
+
+An OctopartKeyPool spreads the requests over several API keys, picking for
+every request the key with the most budget left.  The budget of every key
+is a token bucket kept in an OctopartRateStore: a small JSON file, read and
+updated under an exclusive file lock, so that all the processes of a host
+using the same file together stay within the limits of each key.  Keys are
+stored hashed.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import json
+import time
+import getpass
+import hashlib
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    # Without file locks the budget is only shared between the threads of a process
+    fcntl = None
+
+from .deadline import current_deadline
+from .exceptions import OctopartRateLimitError
+from .exceptions import OctopartDeadlineExceededError
+
+# One state file per user: the temporary directory is shared by all of them
+default_path = os.path.join(tempfile.gettempdir(), 'pyoctopart-rate-{}.json'.format(
+    os.getuid() if hasattr(os, 'getuid') else getpass.getuser()))
+
+
+def key_id(apikey):
+    """Returns the identifier under which the budget of apikey is stored."""
+    return hashlib.sha1(apikey.encode()).hexdigest()[:16]
+
+
+class OctopartRateStore(object):
+
+    """Token buckets of API keys, shared by the processes of a host.
+
+    The file maps key identifiers to [tokens, update time].
+    """
+
+    def __init__(self, path=default_path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _open(self):
+        """Opens the state file, created readable by its owner only.
+
+        Symbolic links and files owned by another user are refused, since the
+        file may live in a directory writable by everyone.
+        """
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_NOFOLLOW', 0), 0o600)
+        if hasattr(os, 'getuid') and os.fstat(fd).st_uid != os.getuid():
+            os.close(fd)
+            raise PermissionError('{} is owned by another user'.format(self.path))
+        return os.fdopen(fd, 'r+')
+
+    def _update(self, fun):
+        """Calls fun with the state, under the lock, and saves the state."""
+        with self._lock:
+            with self._open() as f:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.seek(0)
+                    data = f.read()
+                    try:
+                        state = json.loads(data) if data else {}
+                    except ValueError:
+                        state = {}
+                    result = fun(state)
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps(state))
+                    f.flush()
+                    return result
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(f, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _refill(state, ident, rate, burst, now):
+        tokens, updated = state.get(ident, (burst, now))
+        tokens = min(tokens + max(now - updated, 0.0) * rate, burst)
+        state[ident] = [tokens, now]
+        return tokens
+
+    def take(self, limits):
+        """Takes a token from the key with the most tokens left.
+
+        param limits: key identifier -> (rate in requests per second, burst).
+        returns: (key identifier, 0.0), or (None, seconds until a token is available).
+        """
+        def take(state):
+            now = time.time()
+            best, best_tokens, wait = None, 0.0, None
+            for ident, (rate, burst) in limits.items():
+                tokens = self._refill(state, ident, rate, burst, now)
+                if tokens >= 1.0 and tokens > best_tokens:
+                    best, best_tokens = ident, tokens
+                elif tokens < 1.0:
+                    key_wait = (1.0 - tokens) / rate if rate > 0 else float('inf')
+                    wait = key_wait if wait is None else min(wait, key_wait)
+            if best is None:
+                return None, wait
+            state[best][0] -= 1.0
+            return best, 0.0
+        return self._update(take)
+
+    def remaining(self, limits):
+        """Returns the tokens left of every key identifier."""
+        now = time.time()
+        return self._update(lambda state: {ident: self._refill(state, ident, rate, burst, now)
+                                           for ident, (rate, burst) in limits.items()})
+
+
+class OctopartKeyPool(object):
+
+    """Rotates requests over several API keys within their rate limits.
+
+    >>> pool = OctopartKeyPool(['key1', 'key2'], rate=3.0)
+    >>> o = Octopart(key_pool=pool)
+    """
+
+    def __init__(self, keys, rate=3.0, burst=None, store=None, max_wait=60.0):
+        """
+        param keys: a list of API keys, or a dictionary of API key -> (rate, burst).
+        param rate: requests per second allowed for every key of a list.
+        param burst: requests allowed at once for every key of a list, rate by default.
+        param store: the OctopartRateStore, shared by all the processes of the
+            host using the same keys; a store at the default path by default.
+        param max_wait: seconds acquire() waits at most for a key.
+        """
+        if not isinstance(keys, dict):
+            keys = {key: (rate, burst if burst is not None else max(rate, 1.0)) for key in keys}
+        if not keys:
+            raise ValueError('no API keys')
+        self._keys = {key_id(key): key for key in keys}
+        self._limits = {key_id(key): limits for key, limits in keys.items()}
+        self.store = store if store is not None else OctopartRateStore()
+        self.max_wait = max_wait
+        self.stats = {key: 0 for key in keys}
+        self._lock = threading.Lock()
+
+    def _take(self):
+        ident, wait = self.store.take(self._limits)
+        if ident is None:
+            return None, wait
+        key = self._keys[ident]
+        with self._lock:
+            self.stats[key] += 1
+        return key, 0.0
+
+    def try_acquire(self):
+        """Returns the API key with the most budget left, using one request of
+        its budget, or None if none has any left."""
+        return self._take()[0]
+
+    def acquire(self):
+        """Waits for an API key with some budget left, and returns it.
+
+        Raises OctopartRateLimitError after max_wait seconds, or
+        OctopartDeadlineExceededError when the deadline of the calling context
+        passes first.
+        """
+        give_up = time.monotonic() + self.max_wait
+        deadline = current_deadline()
+        while True:
+            key, wait = self._take()
+            if key is not None:
+                return key
+            if deadline is not None and deadline.remaining() < min(wait, 1.0):
+                raise OctopartDeadlineExceededError('key pool')
+            left = give_up - time.monotonic()
+            if left <= 0:
+                raise OctopartRateLimitError(self.max_wait)
+            time.sleep(min(wait, left, 1.0))
+
+    def remaining(self):
+        """Returns the requests left right now in the budget of every key."""
+        return {self._keys[ident]: tokens for ident, tokens in self.store.remaining(self._limits).items()}
@@ -22,10 +22,14 @@ import copy
 import json
 import requests
 import datetime
+import time
+import weakref
+import threading
 import pkg_resources
 
 from pprint import pprint
 
+from .exceptions import OctopartException
 from .exceptions import OctopartArgumentMissingError
 from .exceptions import OctopartArgumentInvalidError
 from .exceptions import OctopartTypeArgumentError
@@ -38,6 +42,19 @@ from .exceptions import OctopartNonJsonArgumentError
 from .exceptions import OctopartInvalidSortError
 from .exceptions import OctopartTooLongListError
 from .exceptions import OctopartInvalidApiKeyError
+from .exceptions import OctopartCircuitOpenError
+from .exceptions import OctopartDeadlineExceededError
+
+from .attributes import OctopartAttributeRegistry
+from .cache import request_key
+from .cache import new_entry
+from .cache import stale_response
+from .search import OctopartSearchQuery
+from .deadline import OctopartDeadline
+from .deadline import OctopartPartialResults
+from .deadline import current_deadline
+from .deadline import remaining
+from .deadline import within
 
 __version__ = pkg_resources.require('pyoctopart')[0].version
 __author__ = 'Joe Baker <jbaker at alum.wpi.edu>'
@@ -68,6 +85,27 @@ select_incls=curry(select, 'include_')
 select_shows=curry(select, 'show_')
 select_hides=curry(select, 'hide_')
 
+def iter_parts(json_obj):
+    """Yields every Part resource dictionary found in a JSON response."""
+    stack = [json_obj]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, dict):
+            if obj.get('__class__') == 'Part':
+                yield obj
+            else:
+                stack.extend(obj.values())
+        elif isinstance(obj, list):
+            stack.extend(reversed(obj))
+
+def encode_arg(val):
+    """Encodes an argument value the way the API expects it in a query string."""
+    if type(val) is bool:
+        return int(val)
+    elif type(val) is list:
+        return json.dumps(val)
+    return val
+
 
 ''' Octopart Data maps '''
 
@@ -119,7 +157,10 @@ class OctopartBrand(object):
         return not self.__eq__(b)
 
     def __hash__(self):
-        return (hash(self.__class__), hash(self.id))
+        return hash((self.__class__, self.id))
+
+    def __reduce__(self):
+        return (OctopartBrand, brand_state(self))
 
     def __str__(self):
         return ''.join(('Brand ', str(self.id), ': ', self.displayname, ' (', self.homepage_url, ')'))
@@ -181,7 +222,7 @@ class OctopartCategory(object):
                     return False
                 if self.nodename != c.nodename:
                     return False
-                if sorted(self.images != c.images):
+                if self.images != c.images:
                     return False
                 if sorted(self.children_ids) != sorted(c.children_ids):
                     return False
@@ -201,7 +242,11 @@ class OctopartCategory(object):
         return not self.__eq__(c)
 
     def __hash__(self):
-        return (hash(self.__class__), hash(self.id))
+        return hash((self.__class__, self.id))
+
+    def __reduce__(self):
+        return (OctopartCategory, (self.id, self.parent_id, self.nodename, self.images, self.children_ids,
+                                   self.ancestor_ids, self.ancestors, self.num_parts))
 
     def __str__(self):
         return ''.join(('Category ', str(self.id), ': ', self.nodename))
@@ -237,7 +282,8 @@ class OctopartPart(object):
         return args
 
     @classmethod
-    def shows(show_uid: bool = False,
+    def shows(cls,
+              show_uid: bool = False,
               show_mpn: bool = False,
               show_manufacturer: bool = False,
               show_brand: bool = False,
@@ -275,7 +321,8 @@ class OctopartPart(object):
         return args
 
     @classmethod
-    def hides(hide_uid: bool = False,
+    def hides(cls,
+              hide_uid: bool = False,
               hide_mpn: bool = False,
               hide_manufacturer: bool = False,
               hide_brand: bool = False,
@@ -327,7 +374,10 @@ class OctopartPart(object):
     def __init__(self, uid, mpn, manufacturer, detail_url, **kwargs):
         # If class data is in dictionary format, convert everything to class instances
         # Otherwise, assume it is already in class format and do nothing
-        args = copy.deepcopy(kwargs)
+        # Specs are copied shallowly: their attributes are shared, see attribute_registry
+        args = copy.deepcopy({k: v for k, v in kwargs.items() if k != 'specs'})
+        if 'specs' in kwargs:
+            args['specs'] = [dict(spec, values=list(spec.get('values', []))) for spec in kwargs['specs']]
         if type(manufacturer) is dict:
             manufacturer = OctopartBrand.new_from_dict(copy.deepcopy(manufacturer))
         for offer in args.get('offers', []):
@@ -342,7 +392,7 @@ class OctopartPart(object):
 
         for spec in args.get('specs', []):
             if type(spec['attribute']) is dict:
-                spec['attribute'] = OctopartPartAttribute.new_from_dict(spec['attribute'])
+                spec['attribute'] = attribute_registry.intern(spec['attribute'])
 
         self._uid = uid
         self._mpn = mpn
@@ -509,7 +559,18 @@ class OctopartPart(object):
         return not self.__eq__(p)
 
     def __hash__(self):
-        return (hash(self.__class__), hash(self.uid), hash(self.mpn))
+        return hash((self.__class__, self.uid, self.mpn))
+
+    def __reduce__(self):
+        # Suppliers are pickled once per part, whatever their number of offers
+        brand_states = []
+        refs = {}
+        def brand_ref(brand):
+            if brand.id not in refs:
+                refs[brand.id] = len(brand_states)
+                brand_states.append(brand_state(brand))
+            return refs[brand.id]
+        return (_part_from_pickle, (brand_states, part_state(self, brand_ref, attribute_state)))
 
     def __str__(self):
         return ''.join(('Part ', str(self.uid), ': ', str(self.manufacturer), ' ', self.mpn))
@@ -570,7 +631,10 @@ class OctopartPartAttribute(object):
         return not self.__eq__(pa)
 
     def __hash__(self):
-        return (hash(self.__class__), hash(self.fieldname))
+        return hash((self.__class__, self.fieldname))
+
+    def __reduce__(self):
+        return (attribute_from_state, (attribute_state(self),))
 
     def __str__(self):
         if self.type == 'number':
@@ -580,34 +644,304 @@ class OctopartPartAttribute(object):
         else:    # Note: 'else' is not a valid state in the API resource definition
             return self.displayname
 
+# Process-wide registry of the attributes shared by the specs of all parts
+attribute_registry = OctopartAttributeRegistry(OctopartPartAttribute)
+
+
+''' Model states '''
+
+# The state of a model is a tuple of builtin values (no datetime, no model
+# instance), used for pickling and by pyoctopart.serialize.  Within a part
+# state, brands and attributes are replaced by a reference wrapped in a
+# 1-tuple, so that they can be shared; datetimes become 1-tuples of seconds
+# since the epoch.  JSON-born values never contain tuples.
+
+_epoch = datetime.datetime(1970, 1, 1)
+
+def brand_state(brand):
+    return (brand.id, brand.displayname, brand.homepage_url)
+
+def attribute_state(attribute):
+    return (attribute.fieldname, attribute.displayname, attribute.type, attribute.metadata)
+
+def attribute_from_state(state):
+    """Returns the shared attribute of an attribute state."""
+    return attribute_registry.intern({
+        'fieldname': state[0],
+        'displayname': state[1],
+        'type': state[2],
+        'metadata': state[3],
+    })
+
+def part_state(part, brand_ref, attribute_ref):
+    """Returns the state of an OctopartPart.
+
+    param brand_ref: function returning the reference of an OctopartBrand.
+    param attribute_ref: function returning the reference of an OctopartPartAttribute.
+    """
+    manufacturer = part.manufacturer
+    if isinstance(manufacturer, OctopartBrand):
+        manufacturer = (brand_ref(manufacturer),)
+    offers = []
+    for offer in part.offers:
+        offer = dict(offer)
+        if isinstance(offer.get('supplier'), OctopartBrand):
+            offer['supplier'] = (brand_ref(offer['supplier']),)
+        if isinstance(offer.get('update_ts'), datetime.datetime):
+            offer['update_ts'] = (int((offer['update_ts'] - _epoch).total_seconds()),)
+        offers.append(offer)
+    specs = []
+    for spec in part.specs:
+        spec = dict(spec)
+        if isinstance(spec.get('attribute'), OctopartPartAttribute):
+            spec['attribute'] = (attribute_ref(spec['attribute']),)
+        specs.append(spec)
+    return (part.uid, part.mpn, manufacturer, part.detail_url, part.avg_price, part.avg_avail,
+            part.market_status, part.num_suppliers, part.num_authsuppliers, part.short_description,
+            part.category_ids, part.images, part.datasheets, part.descriptions, part.hyperlinks,
+            offers, specs)
+
+def part_from_state(state, brand, attribute):
+    """Builds an OctopartPart from its state, without copying anything.
+
+    param brand: function returning the OctopartBrand of a reference.
+    param attribute: function returning the OctopartPartAttribute of a reference.
+    """
+    part = OctopartPart.__new__(OctopartPart)
+    (part._uid, part._mpn, manufacturer, part.detail_url, part.avg_price, part.avg_avail,
+     part.market_status, part.num_suppliers, part.num_authsuppliers, part.short_description,
+     part.category_ids, part.images, part.datasheets, part.descriptions, part.hyperlinks,
+     offers, specs) = state
+    part.manufacturer = brand(manufacturer[0]) if type(manufacturer) is tuple else manufacturer
+    for offer in offers:
+        if type(offer.get('supplier')) is tuple:
+            offer['supplier'] = brand(offer['supplier'][0])
+        if type(offer.get('update_ts')) is tuple:
+            offer['update_ts'] = _epoch + datetime.timedelta(seconds=offer['update_ts'][0])
+    for spec in specs:
+        if type(spec.get('attribute')) is tuple:
+            spec['attribute'] = attribute(spec['attribute'][0])
+    part.offers = offers
+    part.specs = specs
+    return part
+
+def _part_from_pickle(brand_states, state):
+    brands = [OctopartBrand(*s) for s in brand_states]
+    return part_from_state(state, brands.__getitem__, attribute_from_state)
+
 
 ''' Octopart API proxy '''
 
+class OctopartPreparedQuery(object):
+
+    """An API call whose static part has been validated and encoded once.
+
+    The method URL, API key, callback, projection flags (include[]/show[]/hide[])
+    and every static argument are turned into request parameters when the query
+    is prepared.  Calling the query only validates and encodes the variable
+    arguments (such as `queries`, `q` or `uid`) before issuing the request.
+
+    Use Octopart.prepare() to build one.
+    """
+
+    __slots__ = ['api', 'method', 'req_url', 'payload', 'variables', 'path_variables', 'unpack']
+
+    def __init__(self, api, method, ver, args, params, variables, unpack):
+        """
+        param api: the Octopart instance issuing the requests.
+        param method: String containing the method path, such as 'parts/search'.
+            Variables that are part of the path are given as format fields, such
+            as 'parts/{uid}'.
+        param ver: API version number.
+        param args: Dictionary of static arguments to pass to the API method.
+        param params: Dictionary of static parameters passed as is (include[]...).
+        param variables: Dictionary of variable argument names to check functions.
+            A variable is optional when a static argument of the same name exists.
+        param unpack: Function building the method's result from the JSON object.
+        """
+        self.api = api
+        self.method = method
+        self.req_url = Octopart.api_url % ver + method
+        self.payload = dict(params)
+        if api.apikey:
+            self.payload['apikey'] = api.apikey
+        if api.callback:
+            self.payload['callback'] = api.callback
+        for arg, val in args.items():
+            self.payload[arg] = encode_arg(val)
+        self.variables = variables
+        self.path_variables = [v for v in variables if '{%s}' % v in method]
+        self.unpack = unpack
+
+    def __call__(self, **args):
+        for arg in self.variables:
+            if arg not in args and arg not in self.payload:
+                raise OctopartArgumentMissingError([arg], [], [])
+        payload = self.payload.copy()
+        for arg, val in args.items():
+            check = self.variables.get(arg)
+            if check is None:
+                raise OctopartArgumentInvalidError([arg], [], [])
+            check(val)
+            if arg not in self.path_variables:
+                payload[arg] = encode_arg(val)
+        req_url = self.req_url
+        if self.path_variables:
+            req_url = req_url.format(**args)
+        return self.unpack(self.api._fetch(self.method, req_url, payload, args))
+
+
+def _no_check(val):
+    pass
+
+def _check_query_string(q):
+    if not len(q) >= 2:
+        raise OctopartRangeArgumentError(['q'], [int], [2,float('inf')])
+
+def _check_start(start):
+    if start not in range(0,1001):
+        raise OctopartRangeArgumentError(['start'], [int], [0,1000])
+
+def _check_uid(uid):
+    if type(uid) is not int:
+        raise OctopartTypeArgumentError(['uid'], [int], [])
+
+def _check_queries(queries):
+    for q in queries:
+        if type(q) != dict:
+            raise OctopartTypeArgumentError(['queries'], ['str'], [])
+
+def _check_lines(lines):
+    for line in lines:
+        if type(line) != dict:
+            raise OctopartTypeArgumentError(['lines'], [dict], [])
+        if line.get('limit', 0) not in range(0,21):
+            raise OctopartRangeArgumentError(['limit'], [int], [0,20])
+
+def _unpack_raw(json_obj):
+    return json_obj
+
+def _unpack_results(json_obj):
+    if json_obj:
+        return json_obj, json_obj['results']
+    else:
+        return None
+
+def bom_result(result, items):
+    """Returns a BOM match result with its items replaced by OctopartParts.
+
+    param result: a result of the JSON response.
+    param items: the OctopartParts of its items.
+    """
+    new_result = {'items' : items, 'reference' : result.get('reference', ''), 'status' : result['status']}
+    if result.get('hits') is not None:
+        new_result['hits'] = result.get('hits')
+    return new_result
+
+def build_bom_results(results):
+    """Builds the OctopartParts of BOM match results, in this process."""
+    return [bom_result(result, [OctopartPart.new_from_dict(item) for item in result['items']])
+            for result in results]
+
+
+
+class _SessionHolder(object):
+
+    """Holds the requests.Session of a thread: it is only referenced by the
+    thread's local storage, and its session is closed when the thread ends."""
+
+    __slots__ = ['session', '__weakref__']
+
+    def __init__(self, session):
+        self.session = session
+        weakref.finalize(self, session.close)
+
+
 class Octopart(object):
 
     """A simple client frontend to tho Octopart public REST API.
 
     For detailed API documentation, refer to https://octopart.com/api/docs/v2/rest-api.
+
+    An instance can be shared by several threads: every call builds its own
+    query parameters, and every thread gets its own HTTP session (and
+    connection pool).
     """
 
     api_url = 'http://octopart.com/api/v%d/'
-    __slots__ = ['apikey', 'callback', 'pretty_print', 'verbose']
+    accept_encoding = 'gzip, deflate'
+    __slots__ = ['apikey', 'callback', 'pretty_print', 'verbose', 'cache', 'transfer_stats', 'observers',
+                 'model_pool', 'hedger', 'breaker', 'scheduler', 'key_pool', 'timeout',
+                 '_local', '_sessions', '_lock']
 
-    def __init__(self, apikey=None, callback=None, pretty_print=False, verbose=False):
+    def __init__(self, apikey=None, callback=None, pretty_print=False, verbose=False, cache=None,
+                 model_pool=None, hedger=None, breaker=None, scheduler=None, key_pool=None, timeout=None):
+        """
+        param timeout: seconds to wait for a response, None for no limit; the
+            time left before the current deadline (see pyoctopart.deadline)
+            when shorter.
+        param cache: an OctopartCache used to serve and revalidate responses.
+        param model_pool: an OctopartModelPool used to build the parts of large
+            BOM match responses on several processes.
+        param hedger: an OctopartHedger, sending a second copy of the slow
+            requests of idempotent read methods.
+        param breaker: an OctopartCircuitBreaker, failing fast (or serving
+            stale cache entries) while a method keeps failing.
+        param scheduler: an OctopartScheduler, ordering the requests of the
+            priority classes within a rate budget.
+        param key_pool: an OctopartKeyPool, giving the API key of every request
+            (in place of apikey) within a budget shared by the host.
+        """
         self.apikey = apikey
         self.callback = callback
         self.pretty_print = pretty_print
         self.verbose = verbose
-
-
-    def _get_data(self, method, args, payload=dict(), ver=2):
-        """Constructs the URL to pass to _get().
+        self.cache = cache
+        # Per method path: requests, 304 answers, decoded and on-the-wire body
+        # sizes, and bytes saved by compression and revalidation
+        self.transfer_stats = {}
+        # Functions called with the method path and the JSON object of every response
+        self.observers = []
+        self.model_pool = model_pool
+        self.hedger = hedger
+        self.breaker = breaker
+        self.scheduler = scheduler
+        self.key_pool = key_pool
+        self.timeout = timeout
+        # One requests.Session per thread, all of them kept to be closed
+        self._local = threading.local()
+        # The holders of the sessions of the live threads
+        self._sessions = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def _session(self):
+        holder = getattr(self._local, 'holder', None)
+        if holder is None:
+            holder = self._local.holder = _SessionHolder(requests.Session())
+            with self._lock:
+                self._sessions.add(holder)
+        return holder.session
+
+    def close(self):
+        """Closes the HTTP sessions of all threads."""
+        with self._lock:
+            holders = list(self._sessions)
+            self._sessions.clear()
+        for holder in holders:
+            holder.session.close()
+        self._local = threading.local()
+
+
+    def _get_data(self, method, args, payload=None, ver=2):
+        """Constructs the URL and the query string and passes them to _fetch().
 
         param method: String containing the method path, such as 'parts/search'.
         param args: Dictionary of arguments to pass to the API method.
-        returns: Complete request URL string.
+        param payload: Dictionary of already encoded parameters, left unchanged.
+        returns: The decoded JSON object, or None.
         """
         req_url = Octopart.api_url % ver + method
+        payload = dict(payload) if payload else {}
 
         if self.apikey:
             payload['apikey'] = self.apikey
@@ -615,20 +949,107 @@ class Octopart(object):
             payload['callback'] = self.callback
 
         for arg, val in args.items():
-            if type(val) is bool:
-                v = int(val)
-            elif type(val) is list:
-                v = json.dumps(val)
-            else:
-                v = val
-            payload[arg] = v
+            payload[arg] = encode_arg(val)
+
+        return self._fetch(method, req_url, payload, args)
+
+    def _fetch(self, method, req_url, payload, args):
+        """Gets the JSON response of a request, and passes it to the observers.
 
-        r = requests.get(req_url, params=payload)
-        if r.status_code == 404:
+        param method: String containing the method path, such as 'parts/search'.
+        param req_url: Complete request URL string.
+        param payload: Dictionary of encoded query string parameters.
+        param args: Dictionary of the arguments as given, used for error reports.
+        returns: The decoded JSON object, or None.
+        """
+        json_obj = self._get(method, req_url, payload, args)
+        if json_obj is not None:
+            for observer in self.observers:
+                observer(method, json_obj)
+        return json_obj
+
+    def _get(self, method, req_url, payload, args):
+        """Issues the request and decodes the JSON response.
+
+        Responses are requested compressed.  When a cache is configured, fresh
+        entries are served without any request, and stale ones are revalidated
+        with a conditional request: a 304 answer is served from the cache
+        without parsing anything.  When a circuit breaker is configured and
+        the circuit of the method is open, the request is not sent: a cached
+        response is served, marked stale, or OctopartCircuitOpenError is raised.  With a
+        scheduler, the request then waits for its turn.
+
+        param method: String containing the method path, used for statistics.
+        param req_url: Complete request URL string.
+        param payload: Dictionary of encoded query string parameters.
+        param args: Dictionary of the arguments as given, used for error reports.
+        returns: The decoded JSON object, or None.
+        """
+        headers = {'Accept-Encoding': Octopart.accept_encoding}
+        entry = None
+        if self.cache is not None:
+            key = request_key(req_url, payload)
+            entry = self.cache.get(key)
+            if entry is not None:
+                if self.cache.is_fresh(entry):
+                    return entry['json']
+                if entry['etag']:
+                    headers['If-None-Match'] = entry['etag']
+                if entry['last_modified']:
+                    headers['If-Modified-Since'] = entry['last_modified']
+
+        if self.breaker is not None and not self.breaker.allow(method):
+            stale = entry is not None and self.breaker.serve_stale
+            self.breaker.rejected(method, stale)
+            if stale:
+                return stale_response(entry)
+            raise OctopartCircuitOpenError(method, self.breaker.retry_after(method))
+
+        ticket = None
+        try:
+            if self.scheduler is not None:
+                ticket = self.scheduler.acquire(method)
+            start = time.monotonic()
+            r = self._request(method, req_url, payload, headers)
+        except OctopartException:
+            # Deadlines and rate limits of the caller are no failure of the API
+            if self.breaker is not None:
+                self.breaker.release(method)
+            raise
+        except Exception:
+            if self.breaker is not None:
+                self.breaker.failure(method)
+            raise
+        finally:
+            if ticket is not None:
+                self.scheduler.release(ticket)
+        if self.breaker is not None:
+            # Server errors and rate limiting mean the API is degraded
+            if r.status_code >= 500 or r.status_code == 429:
+                self.breaker.failure(method)
+            else:
+                self.breaker.success(method, time.monotonic() - start)
+
+        if r.status_code == 304 and entry is not None:
+            self._count(method, requests=1, not_modified=1, saved_bytes=entry['size'])
+            self.cache.touch(key, entry)
+            return entry['json']
+        elif r.status_code == 404:
+            self._count(method, requests=1)
             return None
         elif r.status_code == 503:
+            self._count(method, requests=1)
             raise Octopart503Error(args, [], [])
 
+        size = len(r.content)
+        wire_size = size
+        if r.headers.get('Content-Encoding') and 'Content-Length' in r.headers:
+            wire_size = int(r.headers['Content-Length'])
+        self._count(method, requests=1, body_bytes=size, wire_bytes=wire_size,
+                    saved_bytes=max(size - wire_size, 0))
+
+        headers = r.headers
+        status_code = r.status_code
         r = r.json()
 
         if self.verbose:
@@ -637,11 +1058,157 @@ class Octopart(object):
             else:
                 print(r)
 
-        if 'message' in r.keys() and r['message'] == 'Invalid API key':
+        # The *_get_multi methods answer lists
+        if isinstance(r, dict) and r.get('message') == 'Invalid API key':
             raise OctopartInvalidApiKeyError(self.apikey)
 
+        # Error answers (400, 429, 5xx) must not be served from the cache later
+        if self.cache is not None and 200 <= status_code < 300:
+            self.cache.set(key, new_entry(r, size, headers.get('ETag'), headers.get('Last-Modified')))
+
         return r
 
+    def _request(self, method, req_url, payload, headers):
+        """Sends the HTTP request, hedged when a hedger is configured."""
+        if self.hedger is not None:
+            return self.hedger.call(method, lambda: self._send(method, req_url, payload, headers))
+        return self._send(method, req_url, payload, headers)
+
+    def _send(self, method, req_url, payload, headers):
+        # Called on the thread sending the request, for its session
+        deadline = current_deadline()
+        if deadline is not None:
+            deadline.check(method)
+        if self.key_pool is not None:
+            payload = dict(payload, apikey=self.key_pool.acquire())
+        timeout = remaining(self.timeout)
+        if deadline is not None and timeout <= 0.0:
+            raise OctopartDeadlineExceededError(method)
+        try:
+            return self._session().get(req_url, params=payload, headers=headers, timeout=timeout)
+        except requests.Timeout:
+            if deadline is not None and deadline.expired():
+                raise OctopartDeadlineExceededError(method) from None
+            raise
+
+    def _count(self, method, **counts):
+        """Adds counts to the transfer statistics of a method."""
+        with self._lock:
+            stats = self.transfer_stats.get(method)
+            if stats is None:
+                stats = self.transfer_stats[method] = {
+                    'requests': 0,
+                    'not_modified': 0,
+                    'body_bytes': 0,
+                    'wire_bytes': 0,
+                    'saved_bytes': 0,
+                }
+            for name, count in counts.items():
+                stats[name] += count
+
+
+    ''' Prepared queries '''
+
+    def prepare(self, name, raw=False, **static):
+        """Validate and pre-encode the static part of an API method call.
+
+        param name: name of the API method, one of 'parts_search', 'parts_match',
+            'parts_get', 'parts_suggest_v2' or 'bom_match'.
+        param static: the method's static arguments (everything but the variable
+            ones: `q` for searches and suggestions, `queries` for parts_match,
+            `uid` for parts_get and `lines` for bom_match).
+        param raw: when True, calls return the raw JSON object (or None) instead
+            of the method's usual result.
+        returns: An OctopartPreparedQuery, to be called with the variable arguments.
+
+        >>> match = o.prepare('parts_match', include_specs=True)
+        >>> for queries in batches:
+        ...     json_obj, results = match(queries=queries)
+        """
+        prepare = getattr(self, '_prepare_' + name, None)
+        if prepare is None:
+            raise OctopartArgumentInvalidError([name], [], [])
+        query = prepare(**static)
+        if raw:
+            query.unpack = _unpack_raw
+        return query
+
+    def _prepare_parts_search(self,
+                              start: int = 0,
+                              limit: int = 10,
+                              sortby: str = "score desc",
+                              query: OctopartSearchQuery = None):
+        if limit not in range(0,101):
+            raise OctopartRangeArgumentError(['limit'], [int], [0,100])
+        _check_start(start)
+        if type(sortby) is not str:
+            raise OctopartTypeArgumentError(['sortby'], [str], [])
+        if query is not None and not isinstance(query, OctopartSearchQuery):
+            raise OctopartTypeArgumentError(['query'], [OctopartSearchQuery], [])
+        args = {'limit': limit, 'start': start}
+        if sortby != "score desc":
+            args['sortby'] = sortby
+        params = query.params() if query is not None else {}
+        return OctopartPreparedQuery(self, 'parts/search', 3,
+                                     args, params,
+                                     {'q': _check_query_string, 'start': _check_start},
+                                     _unpack_results)
+
+    def _prepare_parts_match(self,
+                             exact_only: bool = False,
+                             **show_hide):
+        params = {}
+        params.update(OctopartPart.includes(**select_incls(show_hide)))
+        params.update(OctopartPart.shows(**select_shows(show_hide)))
+        params.update(OctopartPart.hides(**select_hides(show_hide)))
+        return OctopartPreparedQuery(self, 'parts/match', 3,
+                                     {'exact_only': exact_only}, params,
+                                     {'queries': _check_queries},
+                                     _unpack_results)
+
+    def _prepare_parts_get(self):
+        return OctopartPreparedQuery(self, 'parts/{uid}', 3, {}, {},
+                                     {'uid': _check_uid},
+                                     _unpack_results)
+
+    def _prepare_parts_suggest_v2(self,
+                                  limit: int = 25,
+                                  start: int = 0):
+        if limit not in range(0,26):
+            raise OctopartRangeArgumentError(['limit'], [int], [0,25])
+        return OctopartPreparedQuery(self, 'parts/suggest', 2,
+                                     {'limit': limit, 'start': start}, {},
+                                     {'q': _check_query_string, 'start': _no_check},
+                                     _unpack_results)
+
+    def _prepare_bom_match(self,
+                           optimize_return_stubs : bool = False,
+                           optimize_hide_datasheets : bool = False,
+                           optimize_hide_descriptions : bool = False,
+                           optimize_hide_images : bool = False,
+                           optimize_hide_hide_offers : bool = False,
+                           optimize_hide_hide_unauthorized_offers : bool = False,
+                           optimize_hide_specs : bool = False):
+        args = {
+            'optimize.return.stubs' :                  optimize_return_stubs,
+            'optimize.hide.datasheets' :               optimize_hide_datasheets,
+            'optimize.hide.descriptions' :             optimize_hide_descriptions,
+            'optimize.hide.images' :                   optimize_hide_images,
+            'optimize.hide.hide_offers' :              optimize_hide_hide_offers,
+            'optimize.hide.hide_unauthorized_offers' : optimize_hide_hide_unauthorized_offers,
+            'optimize.hide.specs' :                    optimize_hide_specs,
+        }
+        return OctopartPreparedQuery(self, 'bom/match', 2, args, {},
+                                     {'lines': _check_lines},
+                                     self._unpack_bom_results)
+
+    def _unpack_bom_results(self, json_obj):
+        if not json_obj:
+            return None
+        if self.model_pool is not None:
+            return json_obj, self.model_pool.build_bom_results(json_obj['results'])
+        return json_obj, build_bom_results(json_obj['results'])
+
 
     ''' API v3 Methods '''
 
@@ -650,72 +1217,71 @@ class Octopart(object):
                      start: int = 0,
                      limit: int = 10,
                      sortby: str = "score desc",
-                     ):
-        # filter[fields][<fieldname>][]: string = "",
-        # filter[queries][]: string = "",
-        # facet[fields][<fieldname>][include]: boolean = false,
-        # facet[fields][<fieldname>][exclude_filter]: boolean = false,
-        # facet[fields][<fieldname>][start]: integer = 0,
-        # facet[fields][<fieldname>][limit]: integer = 10,
-        # facet[queries][]: string = "",
-        # stats[<fieldname>][include]: boolean = false,
-        # stats[<fieldname>][exclude_filter]: boolean = false,
-        # spec_drilldown[include]: boolean = false,
-        # spec_drilldown[exclude_filter]: boolean = false,
-        # spec_drilldown[limit]: integer = 10
-        method = 'parts/search'
-
-        if not len(q) >= 2:
-            raise OctopartRangeArgumentError(['q'], [int], [2,float('inf')])
-        if limit not in range(0,101):
-            raise OctopartRangeArgumentError(['limit'], [int], [0,100])
-        if start not in range(0,1001):
-            raise OctopartRangeArgumentError(['limit'], [int], [0,1000])
+                     query: OctopartSearchQuery = None):
+        """Search parts.
 
-        json_obj = self._get_data(method, { 'q': q, 'limit': limit, 'start': start}, ver=3)
-
-        if json_obj:
-            return json_obj, json_obj['results']
-        else:
-            return None
+        param query: an OctopartSearchQuery giving the filters, facets, stats
+            and spec drilldown of the search.  Parse its results with the
+            functions of pyoctopart.search.
+        returns A pair containing:
+            -The raw JSON result dictionary.
+            -The list of the results of the page.
+        If no JSON object is found without an Exception being raised, returns None.
+        """
+        return self._prepare_parts_search(start=start, limit=limit, sortby=sortby, query=query)(q=q)
 
     def parts_match(self,
                     queries: list,
                     exact_only: bool = False,
                     **show_hide):
 
-        method = 'parts/match'
-
-        args = { 'queries': queries, 'exact_only': exact_only}
-        params = {}
-
-        params.update(OctopartPart.includes(**select_incls(show_hide)))
-        params.update(OctopartPart.shows(**select_shows(show_hide)))
-        params.update(OctopartPart.hides(**select_hides(show_hide)))
-
-        for q in queries:
-            if type(q) != dict:
-                raise OctopartTypeArgumentError(['queries'], ['str'], [])
-
-        json_obj = self._get_data(method, args, params, ver=3)
-
         # XXX consider using the following?
         # items = [OctopartPart.new_from_dict(item) for item in json_obj['results']['items']]
 
-        if json_obj:
-            return json_obj, json_obj['results']
-        else:
-            return None
+        return self._prepare_parts_match(exact_only=exact_only, **show_hide)(queries=queries)
 
     def parts_get(self, uid: int):
-        method = 'parts/{:d}'.format(uid)
-
-        json_obj = self._get_data(method, {}, ver=3)
-
-        if json_obj:
-            return json_obj, json_obj['results']
-        else:
-            return None
+        return self._prepare_parts_get()(uid=uid)
+
+    def parts_search_pages(self,
+                           q: str = "",
+                           max_results: int = 1000,
+                           page_size: int = 100,
+                           timeout: float = None,
+                           query: OctopartSearchQuery = None):
+        """Fetch the results of a search a page at a time.
+
+        param max_results: maximum number of results, at most 1100 (the API
+            serves no page starting after the 1000th result).
+        param page_size: number of results per request, at most 100.
+        param timeout: seconds all the pages may take; the deadline of the
+            calling context by default.
+        param query: an OctopartSearchQuery filtering the results.
+        returns An OctopartPartialResults of the results of every page, in
+            order.  Its `missing` lists the start offsets of the pages not
+            fetched before the deadline.
+        """
+        deadline = OctopartDeadline(timeout) if timeout is not None else current_deadline()
+        search = self._prepare_parts_search(limit=page_size, query=query)
+        results = []
+        missing = []
+        for start in range(0, min(max_results, 1001), page_size):
+            if deadline is not None and deadline.expired():
+                missing.append(start)
+                continue
+            try:
+                with within(deadline):
+                    page = search(q=q, start=start)
+            except OctopartDeadlineExceededError:
+                missing.append(start)
+                continue
+            if page is None:
+                break
+            json_obj, page_results = page
+            results.extend(page_results[:max_results - start])
+            if len(page_results) < page_size:
+                break
+        return OctopartPartialResults(results, missing)
 
 
     ''' API v2 Methods '''
@@ -734,19 +1300,7 @@ class Octopart(object):
         If no JSON object is found without an Exception being raised, returns None.
         """
 
-        method = 'parts/suggest'
-
-        if not len(q) >= 2:
-            raise OctopartRangeArgumentError(['q'], [int], [2,float('inf')])
-        if limit not in range(0,26):
-            raise OctopartRangeArgumentError(['limit'], [int], [0,25])
-
-        json_obj = self._get_data(method, { 'q': q, 'limit': limit, 'start': start}, ver=2)
-
-        if json_obj:
-            return json_obj, json_obj['results']
-        else:
-            return None
+        return self._prepare_parts_suggest_v2(limit=limit, start=start)(q=q)
 
     def parts_match_v2(self, manufacturer_name: str, mpn: str):
         """Match (manufacturer name, mpn) to part uid.
@@ -767,6 +1321,50 @@ class Octopart(object):
         else:
             return None
 
+    def categories_get(self, id: int):
+        """Fetch a Category object by its id.
+
+        returns A pair containing:
+            -The raw JSON result dictionary.
+            -An OctopartCategory object.
+        If no JSON object is found without an Exception being raised, returns None.
+        """
+
+        method = 'categories/get'
+        args = {
+            'id': id
+        }
+        json_obj = self._get_data(method, args, ver=2)
+
+        if json_obj:
+            return json_obj, OctopartCategory.new_from_dict(json_obj)
+        else:
+            return None
+
+    def categories_get_multi(self, ids: list):
+        """Fetch multiple Category objects by their ids.
+
+        returns A pair containing:
+            -The raw JSON result dictionary.
+            -A list of OctopartCategory objects.
+        If no JSON object is found without an Exception being raised, returns None.
+        """
+
+        method = 'categories/get_multi'
+        for id in ids:
+            if type(id) is not int:
+                raise OctopartTypeArgumentError(['ids'], [int], [])
+
+        args = {
+            'ids': ids
+        }
+        json_obj = self._get_data(method, args, ver=2)
+
+        if json_obj:
+            return json_obj, [OctopartCategory.new_from_dict(category) for category in json_obj]
+        else:
+            return None
+
     def partattributes_get(self, fieldname: str):
         """Fetch a PartAttribute object by its fieldname.
 
@@ -831,46 +1429,12 @@ class Octopart(object):
         If no JSON object is found without an Exception being raised, returns None.
         """
 
-        method = 'bom/match'
-
-        def check_line(q: str,
-                       mpn : str = None,
-                       manufacturer : str = None,
-                       sku : str = None,
-                       supplier : str = None,
-                       mpn_or_sku : str = None,
-                       start : int = 0,
-                       limit : int = 0,
-                       reference : str = None):
-            if limit < 0 and limit > 20:
-                raise OctopartArgumentMissingError([], [], [])
-
-        for line in lines:
-            check_line(line)
-
-        args = {
-            'lines': lines,
-            'optimize.return.stubs' :                  optimize_return_stubs,
-            'optimize.hide.datasheets' :               optimize_hide_datasheets,
-            'optimize.hide.descriptions' :             optimize_hide_descriptions,
-            'optimize.hide.images' :                   optimize_hide_images,
-            'optimize.hide.hide_offers' :              optimize_hide_hide_offers,
-            'optimize.hide.hide_unauthorized_offers' : optimize_hide_hide_unauthorized_offers,
-            'optimize.hide.specs' :                    optimize_hide_specs,
-        }
-
-        json_obj = self._get_data(method, args, ver=2)
-
-        results = []
-        if json_obj:
-            for result in json_obj['results']:
-                items = [OctopartPart.new_from_dict(item) for item in result['items']]
-                new_result = {'items' : items, 'reference' : result.get('reference', ''), 'status' : result['status']}
-                if result.get('hits') is not None:
-                    new_result['hits'] = result.get('hits')
-                results.append(new_result)
-
-            return json_obj, results
-        else:
-            return None
+        return self._prepare_bom_match(
+            optimize_return_stubs=optimize_return_stubs,
+            optimize_hide_datasheets=optimize_hide_datasheets,
+            optimize_hide_descriptions=optimize_hide_descriptions,
+            optimize_hide_images=optimize_hide_images,
+            optimize_hide_hide_offers=optimize_hide_hide_offers,
+            optimize_hide_hide_unauthorized_offers=optimize_hide_hide_unauthorized_offers,
+            optimize_hide_specs=optimize_hide_specs)(lines=lines)
 
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Parallel model construction.
+
+Building the OctopartParts of a large BOM match response (deep copies and
+timestamp parsing for every offer) is CPU bound.  An OctopartModelPool
+splits the results into contiguous slices of about the same number of
+items, builds each slice on a worker process, and gets the parts back in
+the compact format of pyoctopart.serialize, in order.  Small responses are
+built in the calling process, where starting the work costs less than
+shipping it.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import threading
+
+from concurrent.futures import ProcessPoolExecutor
+
+from . import serialize
+from .octopart import OctopartPart
+from .octopart import bom_result
+from .octopart import build_bom_results
+
+
+def _build_parts(item_lists):
+    """Worker: builds the parts of a slice of results, and serializes them."""
+    return serialize.dumps([OctopartPart.new_from_dict(item) for items in item_lists for item in items])
+
+def slices(item_lists, count):
+    """Splits lists of items into at most count contiguous slices of about
+    the same total number of items."""
+    total = sum(len(items) for items in item_lists)
+    size = max(-(-total // count), 1)
+    result, current, current_size = [], [], 0
+    for items in item_lists:
+        current.append(items)
+        current_size += len(items)
+        if current_size >= size:
+            result.append(current)
+            current, current_size = [], 0
+    if current:
+        result.append(current)
+    return result
+
+
+class OctopartModelPool(object):
+
+    """Builds the parts of large responses on a pool of worker processes.
+
+    >>> with OctopartModelPool(workers=4) as pool:
+    ...     o = Octopart(apikey, model_pool=pool)
+    ...     json_obj, results = o.bom_match(lines)
+    """
+
+    def __init__(self, workers=None, threshold=500, executor=None):
+        """
+        param workers: number of worker processes, the number of CPUs by default.
+        param threshold: responses with fewer items are built serially.
+        param executor: a concurrent.futures executor to use instead of a pool
+            of our own; it is not shut down by close().
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.threshold = threshold
+        self._executor = executor
+        self._own_executor = executor is None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(self.workers)
+            return self._executor
+
+    def build_parts(self, item_lists):
+        """Builds OctopartParts from lists of Part resource dictionaries.
+
+        returns: a list of lists of OctopartParts, in the order of item_lists.
+        """
+        total = sum(len(items) for items in item_lists)
+        if total < self.threshold or self.workers < 2:
+            return [[OctopartPart.new_from_dict(item) for item in items] for items in item_lists]
+        parts = []
+        for data in self._pool().map(_build_parts, slices(item_lists, self.workers)):
+            parts.extend(serialize.loads(data))
+        built, start = [], 0
+        for items in item_lists:
+            built.append(parts[start:start + len(items)])
+            start += len(items)
+        return built
+
+    def build_bom_results(self, results):
+        """Like octopart.build_bom_results(), on the pool for large results."""
+        if sum(len(result['items']) for result in results) < self.threshold:
+            return build_bom_results(results)
+        item_lists = self.build_parts([result['items'] for result in results])
+        return [bom_result(result, items) for result, items in zip(results, item_lists)]
+
+    def close(self):
+        with self._lock:
+            if self._own_executor and self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
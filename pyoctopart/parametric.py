@@ -0,0 +1,254 @@
+#!/usr/bin/env python
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Local parametric search over cached part specs.
+
+Numeric spec values are parsed once, using the unit of their attribute, and
+stored per attribute in sorted arrays, so that range queries are a pair of
+bisections and a slice.  Text values are indexed by exact value.  Parts can
+be added (or refreshed) at any time.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import re
+import heapq
+import threading
+
+from array import array
+from bisect import bisect_left
+from bisect import bisect_right
+
+from .octopart import iter_parts
+
+si_prefixes = {
+    'y': 1e-24, 'z': 1e-21, 'a': 1e-18, 'f': 1e-15, 'p': 1e-12, 'n': 1e-9,
+    'u': 1e-6, 'µ': 1e-6, 'μ': 1e-6, 'm': 1e-3,
+    '': 1.0,
+    'k': 1e3, 'K': 1e3, 'M': 1e6, 'G': 1e9, 'T': 1e12,
+}
+
+_number = re.compile(r'^\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*(\S*)\s*$')
+
+def parse_value(value, unit_symbol=None):
+    """Converts a spec value to a float in the attribute's base unit.
+
+    Numbers are returned as is; strings such as '10uF', '4.7 k' or '25V' are
+    parsed, with an optional SI prefix and unit symbol.
+    returns: the float value, or None if value is not a number.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+    match = _number.match(value)
+    if match is None:
+        return None
+    number, suffix = match.groups()
+    if unit_symbol and suffix.endswith(unit_symbol):
+        suffix = suffix[:-len(unit_symbol)]
+    factor = si_prefixes.get(suffix)
+    if factor is None:
+        return None
+    return float(number) * factor
+
+def iter_specs(part):
+    """Yields (fieldname, attribute type, unit symbol, values) for the specs of
+    an OctopartPart or of a Part resource dictionary (API v2 or v3 format)."""
+    specs = part.get('specs') if isinstance(part, dict) else part.specs
+    if isinstance(specs, dict):
+        # API v3: {fieldname: {'value': [...], 'metadata': {...}}}
+        for fieldname, spec in specs.items():
+            unit = (spec.get('metadata') or {}).get('unit') or {}
+            values = spec.get('value', [])
+            kind = 'number' if any(parse_value(v, unit.get('symbol')) is not None for v in values) else 'text'
+            yield fieldname, kind, unit.get('symbol'), values
+        return
+    for spec in specs or []:
+        attribute = spec['attribute']
+        if isinstance(attribute, dict):
+            fieldname, kind, metadata = attribute['fieldname'], attribute['type'], attribute.get('metadata', {})
+        else:
+            fieldname, kind, metadata = attribute.fieldname, attribute.type, attribute.metadata
+        unit = (metadata or {}).get('unit') or {}
+        yield fieldname, kind, unit.get('symbol'), spec.get('values', [])
+
+
+class _Column(object):
+
+    """Sorted values of a numeric attribute, with the slots of their parts."""
+
+    __slots__ = ['unit_symbol', 'values', 'slots', 'pending']
+
+    def __init__(self, unit_symbol):
+        self.unit_symbol = unit_symbol
+        self.values = array('d')
+        self.slots = array('l')
+        self.pending = []
+
+    def merge(self):
+        if self.pending:
+            self.pending.sort()
+            merged = heapq.merge(zip(self.values, self.slots), self.pending)
+            values, slots = array('d'), array('l')
+            for value, slot in merged:
+                values.append(value)
+                slots.append(slot)
+            self.values, self.slots, self.pending = values, slots, []
+
+    def count(self, low, high):
+        lo = 0 if low is None else bisect_left(self.values, low)
+        hi = len(self.values) if high is None else bisect_right(self.values, high)
+        return lo, hi
+
+
+class OctopartParametricIndex(object):
+
+    """A parametric index of part specs.
+
+    Conditions are given per attribute fieldname, either as a (low, high)
+    pair of bounds (inclusive, None for no bound) for numeric attributes, or
+    as a value for equality.  Bounds and values may be numbers in the base
+    unit or strings such as '10uF'.
+
+    >>> index = OctopartParametricIndex()
+    >>> o.observers.append(index.observe)
+    >>> index.query(capacitance=('10uF', '22uF'), voltage_rating_dc=(25, None))
+    {39619421, ...}
+    """
+
+    def __init__(self):
+        self._columns = {}      # fieldname -> _Column
+        self._texts = {}        # fieldname -> value -> set of slots
+        self._uids = []         # slot -> part uid, None once the part is refreshed
+        self._slots = {}        # part uid -> current slot
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, uid):
+        return uid in self._slots
+
+    def add(self, part):
+        """Indexes (or re-indexes) an OctopartPart or a Part resource dictionary."""
+        uid = part['uid'] if isinstance(part, dict) else part.uid
+        with self._lock:
+            old = self._slots.get(uid)
+            if old is not None:
+                self._uids[old] = None
+            slot = len(self._uids)
+            self._uids.append(uid)
+            self._slots[uid] = slot
+            for fieldname, kind, unit_symbol, values in iter_specs(part):
+                if kind == 'number':
+                    column = self._columns.get(fieldname)
+                    if column is None:
+                        column = self._columns[fieldname] = _Column(unit_symbol)
+                    for value in values:
+                        value = parse_value(value, unit_symbol)
+                        if value is not None:
+                            column.pending.append((value, slot))
+                else:
+                    texts = self._texts.setdefault(fieldname, {})
+                    for value in values:
+                        texts.setdefault(value, set()).add(slot)
+            if len(self._uids) > 2 * len(self._slots) + 1024:
+                self._compact()
+
+    def update(self, parts):
+        for part in parts:
+            self.add(part)
+
+    def observe(self, method, json_obj):
+        """Indexes the parts of a response, to be used as an Octopart observer."""
+        for part in iter_parts(json_obj):
+            if 'uid' in part:
+                self.add(part)
+
+    def _compact(self):
+        """Drops the entries of refreshed parts, and renumbers the slots."""
+        renumber = {}
+        uids = []
+        for slot, uid in enumerate(self._uids):
+            if uid is not None:
+                renumber[slot] = len(uids)
+                uids.append(uid)
+        for column in self._columns.values():
+            column.merge()
+            values, slots = array('d'), array('l')
+            for value, slot in zip(column.values, column.slots):
+                if slot in renumber:
+                    values.append(value)
+                    slots.append(renumber[slot])
+            column.values, column.slots = values, slots
+        for texts in self._texts.values():
+            for value in list(texts):
+                slots = set(renumber[s] for s in texts[value] if s in renumber)
+                if slots:
+                    texts[value] = slots
+                else:
+                    del texts[value]
+        self._uids = uids
+        self._slots = {uid: slot for slot, uid in enumerate(uids)}
+
+    def _bounds(self, column, condition):
+        bounds = []
+        for bound in condition:
+            if bound is not None:
+                value = parse_value(bound, column.unit_symbol)
+                if value is None:
+                    raise ValueError('{!r} is not a number'.format(bound))
+                bound = value
+            bounds.append(bound)
+        return bounds
+
+    def _candidates(self, fieldname, condition):
+        """Returns (estimated size, function returning the slots) of a condition."""
+        column = self._columns.get(fieldname)
+        if column is not None:
+            column.merge()
+            if isinstance(condition, tuple):
+                low, high = self._bounds(column, condition)
+            else:
+                low = high = parse_value(condition, column.unit_symbol)
+                if low is None:
+                    return 0, set
+            lo, hi = column.count(low, high)
+            return hi - lo, lambda: set(column.slots[lo:hi])
+        slots = self._texts.get(fieldname, {}).get(condition, set())
+        return len(slots), lambda: set(slots)
+
+    def query(self, **conditions):
+        """Returns the uids of the parts matching all the conditions."""
+        with self._lock:
+            candidates = sorted((self._candidates(f, c) for f, c in conditions.items()),
+                                key=lambda candidate: candidate[0])
+            if not candidates:
+                return set()
+            slots = candidates[0][1]()
+            for size, get in candidates[1:]:
+                if not slots:
+                    break
+                slots &= get()
+            uids = self._uids
+            return set(uids[s] for s in slots if uids[s] is not None)
+
+    def range(self, fieldname, low=None, high=None):
+        return self.query(**{fieldname: (low, high)})
+
+    def equals(self, fieldname, value):
+        return self.query(**{fieldname: value})
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Cache-warming prefetch planner.
+
+The calls following a BOM match are known in advance: the parts_get of the
+matched parts, the partattributes_get_multi of their spec fields and the
+categories_get of their categories.  An OctopartPrefetcher plans them from
+the bom_match response, within a budget of requests, and issues them
+concurrently ahead of time, so that they land in the client's cache (and in
+the attribute registry).  It then watches the cache lookups, and reports how
+many of the prefetched responses were used: served fresh, without any
+request.  With a cache `ttl` of 0 no response is ever fresh, and
+prefetching saves nothing.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import warnings
+import threading
+import contextlib
+
+from concurrent.futures import ThreadPoolExecutor
+
+from .octopart import OctopartPart
+from .octopart import attribute_registry
+from .octopart import iter_parts
+
+
+def _parts(bom_results):
+    """Yields (uid, spec fieldnames, category ids) of the parts of a bom_match
+    JSON response, or of the results returned by bom_match()."""
+    if isinstance(bom_results, dict):
+        for part in iter_parts(bom_results):
+            fieldnames = [spec['attribute']['fieldname'] for spec in part.get('specs') or []
+                          if isinstance(spec.get('attribute'), dict)]
+            yield part.get('uid'), fieldnames, part.get('category_ids') or []
+        return
+    for result in bom_results:
+        for part in result['items']:
+            if isinstance(part, OctopartPart):
+                yield part.uid, [spec['attribute'].fieldname for spec in part.specs], part.category_ids
+
+
+class OctopartPrefetcher(object):
+
+    """Warms the cache of a client with the follow-up calls of BOM matches.
+
+    >>> prefetcher = OctopartPrefetcher(o, max_requests=200)
+    >>> json_obj, results = o.bom_match(lines)
+    >>> prefetcher.prefetch(json_obj)
+    >>> ...                             # the usual parts_get calls
+    >>> prefetcher.report()['hit_rate']
+    """
+
+    def __init__(self, api, max_requests=100, workers=4, registry=attribute_registry, batch_size=100):
+        """
+        param api: the Octopart instance, which must have a cache.
+        param max_requests: the most requests a prefetch() may issue.
+        param workers: number of concurrent requests.
+        param registry: the attribute registry the attributes are prefetched to.
+        param batch_size: number of attributes per partattributes_get_multi request.
+        """
+        if api.cache is None:
+            raise ValueError('prefetching needs an Octopart instance with a cache')
+        if not api.cache.ttl:
+            warnings.warn('the cache has no ttl: prefetched responses are revalidated before use')
+        self.api = api
+        self.max_requests = max_requests
+        self.workers = workers
+        self.registry = registry
+        self.batch_size = batch_size
+        self.stats = {'requests': 0, 'prefetched': 0, 'used': 0, 'skipped': 0}
+        self._prefetched = set()
+        self._used = set()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        api.cache.watchers.append(self._watch)
+
+    def _watch(self, key, entry):
+        # Stale entries are revalidated with a request: only fresh ones are used
+        fresh = entry is not None and self.api.cache.is_fresh(entry)
+        with self._lock:
+            if getattr(self._local, 'prefetching', False):
+                if key not in self._prefetched:
+                    self._prefetched.add(key)
+                    self.stats['prefetched'] += 1
+            elif fresh and key in self._prefetched and key not in self._used:
+                self._used.add(key)
+                self.stats['used'] += 1
+
+    def plan(self, bom_results):
+        """Plans the follow-up calls of a bom_match response.
+
+        Parts come first, then the batches of missing attributes, then the
+        categories, until the budget is spent.
+        returns: {'parts': uids, 'attributes': fieldnames, 'categories': ids}.
+        """
+        uids, fieldnames, category_ids = [], [], []
+        seen = set()
+        for uid, part_fieldnames, part_category_ids in _parts(bom_results):
+            if uid is not None and ('uid', uid) not in seen:
+                seen.add(('uid', uid))
+                uids.append(uid)
+            for fieldname in part_fieldnames:
+                if ('fieldname', fieldname) not in seen:
+                    seen.add(('fieldname', fieldname))
+                    fieldnames.append(fieldname)
+            for category_id in part_category_ids:
+                if ('category', category_id) not in seen:
+                    seen.add(('category', category_id))
+                    category_ids.append(category_id)
+        fieldnames = self.registry.missing(fieldnames)
+        budget = self.max_requests
+        plan = {'parts': uids[:budget]}
+        budget -= len(plan['parts'])
+        plan['attributes'] = fieldnames[:budget * self.batch_size]
+        budget -= -(-len(plan['attributes']) // self.batch_size)
+        plan['categories'] = category_ids[:budget]
+        with self._lock:
+            self.stats['skipped'] += (len(uids) + len(fieldnames) + len(category_ids)
+                                      - sum(len(planned) for planned in plan.values()))
+        return plan
+
+    def _call(self, fun, *args, watched=True):
+        self._local.prefetching = watched
+        try:
+            scheduler = self.api.scheduler
+            with scheduler.priority('batch') if scheduler is not None else contextlib.nullcontext():
+                return fun(*args)
+        except Exception:
+            # A failed prefetch only leaves the call to be made on demand
+            return None
+        finally:
+            self._local.prefetching = False
+
+    def run(self, plan):
+        """Issues the calls of a plan, and returns the number of requests."""
+        batches = [plan['attributes'][i:i + self.batch_size]
+                   for i in range(0, len(plan['attributes']), self.batch_size)]
+        with ThreadPoolExecutor(self.workers) as executor:
+            futures = [executor.submit(self._call, self.api.parts_get, uid) for uid in plan['parts']]
+            # Attributes are later looked up in the registry, not in the cache
+            futures += [executor.submit(self._call, self.registry.prefetch, self.api, batch, self.batch_size,
+                                        watched=False)
+                        for batch in batches]
+            futures += [executor.submit(self._call, self.api.categories_get, category_id)
+                        for category_id in plan['categories']]
+            for future in futures:
+                future.result()
+        with self._lock:
+            self.stats['requests'] += len(futures)
+        return len(futures)
+
+    def prefetch(self, bom_results):
+        """Plans and issues the follow-up calls of a bom_match response.
+
+        param bom_results: the JSON response of bom_match, or its results.
+        returns: the number of requests issued.
+        """
+        return self.run(self.plan(bom_results))
+
+    def report(self):
+        """Returns the prefetch statistics: requests issued, responses
+        prefetched, prefetched responses used since, calls left out by the
+        budget, the share of prefetched responses used, and the hit rate of
+        the cache."""
+        with self._lock:
+            report = dict(self.stats)
+        report['hit_rate'] = report['used'] / report['prefetched'] if report['prefetched'] else 0.0
+        report['cache_hit_rate'] = self.api.cache.hit_rate()
+        return report
+
+    def close(self):
+        """Stops watching the cache."""
+        self.api.cache.watchers.remove(self._watch)
@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Priority request scheduler.
+
+Interactive lookups and batch jobs using the same API key share one rate
+budget.  An OctopartScheduler queues the requests of every priority class,
+and lets them through in weighted fair order: each class gets a share of
+the budget proportional to its weight while it has requests waiting, and
+the others use what it leaves.  Every class also has a concurrency limit,
+and the time spent queued is reported per class.
+
+Requests are classified by method path, or by the priority() context they
+are sent from, which is carried to worker threads by deadline.submit().
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import time
+import itertools
+import threading
+import contextlib
+import contextvars
+
+from collections import deque
+
+from .deadline import current_deadline
+from .exceptions import OctopartDeadlineExceededError
+
+# Scheduler -> priority class name, of the calling context
+_priorities = contextvars.ContextVar('pyoctopart_priorities', default={})
+
+# Priority class name -> (weight, maximum number of requests in flight)
+default_classes = {
+    'interactive': (8, 8),
+    'batch': (1, 4),
+}
+
+# Method path -> priority class, the others being 'batch'
+default_method_classes = {
+    'parts/suggest': 'interactive',
+    'parts/{uid}': 'interactive',
+    'parts/get': 'interactive',
+    'parts/search': 'interactive',
+}
+
+
+class _Class(object):
+
+    __slots__ = ['weight', 'limit', 'running', 'finish', 'queued', 'requests', 'queue_times']
+
+    def __init__(self, weight, limit, window):
+        self.weight = weight
+        self.limit = limit
+        self.running = 0
+        self.finish = 0.0       # virtual finish time of the last request queued
+        self.queued = 0
+        self.requests = 0
+        self.queue_times = deque(maxlen=window)
+
+
+class OctopartScheduler(object):
+
+    """Weighted fair queuing of requests within a rate budget.
+
+    >>> scheduler = OctopartScheduler(rate=3.0)
+    >>> o = Octopart(apikey, scheduler=scheduler)
+    >>> with scheduler.priority('interactive'):
+    ...     o.bom_match(lines)
+    >>> scheduler.stats()['batch']['queue_time_p95']
+    """
+
+    def __init__(self, rate=None, burst=1, classes=None, method_classes=None, default_class='batch',
+                 window=1000):
+        """
+        param rate: the budget, in requests per second, None for no limit.
+        param burst: number of requests that can be sent at once after an idle period.
+        param classes: priority class name -> (weight, concurrency limit).
+        param method_classes: method path -> priority class name.
+        param default_class: the class of the other method paths.
+        param window: number of recent queue times kept per class.
+        """
+        self.rate = rate
+        self.burst = burst
+        self.method_classes = dict(default_method_classes if method_classes is None else method_classes)
+        self.default_class = default_class
+        self._classes = {name: _Class(weight, limit, window)
+                         for name, (weight, limit) in (classes or default_classes).items()}
+        self._tokens = float(burst)
+        self._refilled = time.monotonic()
+        self._vtime = 0.0
+        self._waiting = []      # (virtual finish time, sequence number, class name)
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+
+    @contextlib.contextmanager
+    def priority(self, name):
+        """Runs the requests of the block in the priority class name,
+        including those sent by the threads it submits work to."""
+        if name not in self._classes:
+            raise ValueError('unknown priority class {!r}'.format(name))
+        token = _priorities.set({**_priorities.get(), self: name})
+        try:
+            yield
+        finally:
+            _priorities.reset(token)
+
+    def classify(self, method):
+        """Returns the priority class of a request of method from the calling context."""
+        name = _priorities.get().get(self)
+        if name is None:
+            name = self.method_classes.get(method, self.default_class)
+        return name
+
+    def _refill(self, now):
+        if self.rate is not None:
+            self._tokens = min(self._tokens + (now - self._refilled) * self.rate, float(self.burst))
+        self._refilled = now
+
+    def _next(self):
+        """Returns the first waiting ticket of a class below its concurrency limit."""
+        eligible = [t for t in self._waiting if self._classes[t[2]].running < self._classes[t[2]].limit]
+        return min(eligible) if eligible else None
+
+    def acquire(self, method):
+        """Waits for the turn of a request of method.
+
+        Raises OctopartDeadlineExceededError if the deadline of the calling
+        context passes first.
+        returns: a ticket, to be given back to release() once the request is done.
+        """
+        name = self.classify(method)
+        deadline = current_deadline()
+        queued = time.monotonic()
+        with self._cond:
+            cls = self._classes[name]
+            cls.finish = max(self._vtime, cls.finish) + 1.0 / cls.weight
+            ticket = (cls.finish, next(self._sequence), name)
+            self._waiting.append(ticket)
+            cls.queued += 1
+            while True:
+                timeout = None
+                if self._next() is ticket:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if self.rate is None or self._tokens >= 1.0:
+                        break
+                    timeout = (1.0 - self._tokens) / self.rate
+                if deadline is not None:
+                    if deadline.expired():
+                        self._waiting.remove(ticket)
+                        cls.queued -= 1
+                        self._cond.notify_all()
+                        raise OctopartDeadlineExceededError(method)
+                    timeout = deadline.remaining() if timeout is None else min(timeout, deadline.remaining())
+                self._cond.wait(timeout)
+            self._waiting.remove(ticket)
+            if self.rate is not None:
+                self._tokens -= 1.0
+            self._vtime = ticket[0]
+            cls.queued -= 1
+            cls.running += 1
+            cls.requests += 1
+            cls.queue_times.append(time.monotonic() - queued)
+            self._cond.notify_all()
+        return ticket
+
+    def release(self, ticket):
+        with self._cond:
+            self._classes[ticket[2]].running -= 1
+            self._cond.notify_all()
+
+    @contextlib.contextmanager
+    def slot(self, method):
+        """Holds a turn for a request of method for the duration of the block."""
+        ticket = self.acquire(method)
+        try:
+            yield
+        finally:
+            self.release(ticket)
+
+    def stats(self):
+        """Returns, per class: requests sent, queued and running, and the mean,
+        median, 95th percentile and maximum of the recent queue times, in seconds."""
+        with self._cond:
+            stats = {}
+            for name, cls in self._classes.items():
+                times = sorted(cls.queue_times)
+                stats[name] = {
+                    'requests': cls.requests,
+                    'queued': cls.queued,
+                    'running': cls.running,
+                    'queue_time_mean': sum(times) / len(times) if times else 0.0,
+                    'queue_time_p50': times[len(times) // 2] if times else 0.0,
+                    'queue_time_p95': times[min(len(times) * 95 // 100, len(times) - 1)] if times else 0.0,
+                    'queue_time_max': times[-1] if times else 0.0,
+                }
+            return stats
@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Search filters, facets and statistics.
+
+An OctopartSearchQuery builds the filter[...], facet[...], stats[...] and
+spec_drilldown[...] parameters of parts/search, so that filtering and
+counting are done by the API rather than by paging through every result.
+The facet and statistics results of the response are parsed into compact
+structures by parse_facets(), parse_facet_queries(), parse_stats() and
+parse_spec_drilldown().
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from .exceptions import OctopartTypeArgumentError
+from .exceptions import OctopartRangeArgumentError
+
+
+def _check_fieldname(fieldname):
+    if type(fieldname) is not str or not fieldname:
+        raise OctopartTypeArgumentError(['fieldname'], [str], [])
+
+def _check_limit(name, limit, high):
+    if type(limit) is not int:
+        raise OctopartTypeArgumentError([name], [int], [])
+    if limit not in range(0, high + 1):
+        raise OctopartRangeArgumentError([name], [int], [0, high])
+
+def _bool(value):
+    return 'true' if value else 'false'
+
+def _bound(value):
+    if value is None:
+        return '*'
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise OctopartTypeArgumentError(['bound'], [int, float, str], [])
+    return str(value)
+
+
+class OctopartSearchQuery(object):
+
+    """The filters, facets and statistics of a parts/search request.
+
+    Every method returns the query, so that calls can be chained:
+
+    >>> query = (OctopartSearchQuery()
+    ...          .filter('brand.name', 'Murata', 'TDK')
+    ...          .filter_range('specs.capacitance.value', 1e-6, 10e-6)
+    ...          .facet('brand.name', limit=20)
+    ...          .stats('specs.voltage_rating_dc.value'))
+    >>> json_obj, results = o.parts_search('capacitor', limit=0, query=query)
+    >>> parse_facets(json_obj)['brand.name']
+    [('Murata', 1520), ('TDK', 873)]
+    """
+
+    def __init__(self):
+        self.filters = {}           # fieldname -> list of values
+        self.filter_queries = []
+        self.facets = {}            # fieldname -> (start, limit, exclude_filter)
+        self.facet_queries = []
+        self.stats_fields = {}      # fieldname -> exclude_filter
+        self.drilldown = None       # (limit, exclude_filter)
+
+    def filter(self, fieldname, *values):
+        """Only keeps the parts whose field has one of the values."""
+        _check_fieldname(fieldname)
+        for value in values:
+            if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+                raise OctopartTypeArgumentError(['values'], [str, int, float], [])
+        self.filters.setdefault(fieldname, []).extend(str(v) for v in values)
+        return self
+
+    def filter_range(self, fieldname, low=None, high=None):
+        """Only keeps the parts whose field is between low and high
+        (inclusive, None for no bound)."""
+        _check_fieldname(fieldname)
+        self.filters.setdefault(fieldname, []).append('[{} TO {}]'.format(_bound(low), _bound(high)))
+        return self
+
+    def filter_query(self, query):
+        """Only keeps the parts matching a query, such as 'brand.name:TDK'."""
+        if type(query) is not str:
+            raise OctopartTypeArgumentError(['query'], [str], [])
+        self.filter_queries.append(query)
+        return self
+
+    def facet(self, fieldname, limit=10, start=0, exclude_filter=False):
+        """Counts the parts per value of a field.
+
+        param limit: number of values counted, the most frequent first.
+        param exclude_filter: count as if the field's own filter was not applied.
+        """
+        _check_fieldname(fieldname)
+        _check_limit('limit', limit, 100)
+        _check_limit('start', start, 1000)
+        self.facets[fieldname] = (start, limit, exclude_filter)
+        return self
+
+    def facet_query(self, query):
+        """Counts the parts matching a query."""
+        if type(query) is not str:
+            raise OctopartTypeArgumentError(['query'], [str], [])
+        self.facet_queries.append(query)
+        return self
+
+    def stats(self, fieldname, exclude_filter=False):
+        """Computes the minimum, maximum, mean and deviation of a numeric field."""
+        _check_fieldname(fieldname)
+        self.stats_fields[fieldname] = exclude_filter
+        return self
+
+    def spec_drilldown(self, limit=10, exclude_filter=False):
+        """Asks for the specs best narrowing down the results, with their facets or stats."""
+        _check_limit('limit', limit, 100)
+        self.drilldown = (limit, exclude_filter)
+        return self
+
+    def params(self):
+        """Returns the query string parameters of the query."""
+        params = {}
+        for fieldname, values in self.filters.items():
+            params['filter[fields][{}][]'.format(fieldname)] = list(values)
+        if self.filter_queries:
+            params['filter[queries][]'] = list(self.filter_queries)
+        for fieldname, (start, limit, exclude_filter) in self.facets.items():
+            prefix = 'facet[fields][{}]'.format(fieldname)
+            params[prefix + '[include]'] = 'true'
+            params[prefix + '[start]'] = start
+            params[prefix + '[limit]'] = limit
+            if exclude_filter:
+                params[prefix + '[exclude_filter]'] = 'true'
+        if self.facet_queries:
+            params['facet[queries][]'] = list(self.facet_queries)
+        for fieldname, exclude_filter in self.stats_fields.items():
+            params['stats[{}][include]'.format(fieldname)] = 'true'
+            if exclude_filter:
+                params['stats[{}][exclude_filter]'.format(fieldname)] = 'true'
+        if self.drilldown is not None:
+            limit, exclude_filter = self.drilldown
+            params['spec_drilldown[include]'] = 'true'
+            params['spec_drilldown[limit]'] = limit
+            if exclude_filter:
+                params['spec_drilldown[exclude_filter]'] = 'true'
+        return params
+
+
+class OctopartStats(object):
+
+    """The statistics of a numeric field over the results of a search."""
+
+    __slots__ = ['min', 'max', 'mean', 'stddev', 'count', 'missing']
+
+    def __init__(self, min=None, max=None, mean=None, stddev=None, count=0, missing=0):
+        self.min = min
+        self.max = max
+        self.mean = mean
+        self.stddev = stddev
+        self.count = count
+        self.missing = missing
+
+    @classmethod
+    def new_from_dict(cls, stats_dict):
+        return cls(stats_dict.get('min'), stats_dict.get('max'), stats_dict.get('mean'),
+                   stats_dict.get('stddev'), stats_dict.get('count', 0), stats_dict.get('missing', 0))
+
+    def __eq__(self, s):
+        return all(getattr(self, a) == getattr(s, a) for a in self.__slots__)
+
+    def __repr__(self):
+        return '<OctopartStats: {} .. {} (mean {}, count {})>'.format(self.min, self.max, self.mean, self.count)
+
+
+def parse_facets(json_obj):
+    """Returns {fieldname: [(value, count), ...]} from the facet results of a
+    search response, most frequent values first."""
+    fields = ((json_obj or {}).get('facet_results') or {}).get('fields') or {}
+    return {fieldname: [(f['value'], f['count']) for f in result.get('facets', [])]
+            for fieldname, result in fields.items()}
+
+def parse_facet_queries(json_obj):
+    """Returns {query: count} from the facet results of a search response."""
+    queries = ((json_obj or {}).get('facet_results') or {}).get('queries') or {}
+    if isinstance(queries, list):
+        return {q['query']: q['count'] for q in queries}
+    return dict(queries)
+
+def parse_stats(json_obj):
+    """Returns {fieldname: OctopartStats} from the stats results of a search response."""
+    stats = (json_obj or {}).get('stats_results') or {}
+    return {fieldname: OctopartStats.new_from_dict(result) for fieldname, result in stats.items()}
+
+def parse_spec_drilldown(json_obj):
+    """Returns the fieldnames ranked by the spec drilldown of a search
+    response, best first."""
+    ranked = []
+    results = list((((json_obj or {}).get('facet_results') or {}).get('fields') or {}).items())
+    results += list(((json_obj or {}).get('stats_results') or {}).items())
+    for fieldname, result in results:
+        rank = result.get('spec_drilldown_rank')
+        if rank is not None:
+            ranked.append((rank, fieldname))
+    return [fieldname for rank, fieldname in sorted(ranked)]
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Compact serialization of models.
+
+dumps() turns a list of OctopartPart, OctopartBrand, OctopartCategory and
+OctopartPartAttribute objects into bytes, and loads() turns them back into
+objects.  Brands and attributes are stored once, whatever the number of
+offers and specs referring to them, and come back as shared objects; the
+keys of offer and spec dictionaries are stored once per distinct set.  The
+encoding is marshal, which is fast but, like pickle, must only be used with
+trusted data.
+
+The models can also be pickled: their __reduce__ uses the same compact
+states, one object at a time.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import gc
+import marshal
+import functools
+
+from .octopart import OctopartBrand
+from .octopart import OctopartCategory
+from .octopart import OctopartPart
+from .octopart import OctopartPartAttribute
+from .octopart import brand_state
+from .octopart import attribute_state
+from .octopart import attribute_from_state
+from .octopart import part_state
+from .octopart import part_from_state
+
+version = 1
+
+
+class _Table(object):
+
+    """Numbers the distinct brands or attributes of a dump."""
+
+    def __init__(self, key, state):
+        self.key = key
+        self.state = state
+        self.refs = {}
+        self.states = []
+
+    def ref(self, obj):
+        key = self.key(obj)
+        ref = self.refs.get(key)
+        if ref is None:
+            ref = self.refs[key] = len(self.states)
+            self.states.append(self.state(obj))
+        return ref
+
+
+def _shaped(dicts, shapes):
+    """Replaces dictionaries by (shape reference, values): the keys of offers
+    and specs are the same from one to the next, and are stored once."""
+    return [(shapes.ref(tuple(d)), list(d.values())) for d in dicts]
+
+def _unshaped(shaped, shapes):
+    return [dict(zip(shapes[shape], values)) for shape, values in shaped]
+
+def _category_state(category):
+    return (category.id, category.parent_id, category.nodename, category.images, category.children_ids,
+            category.ancestor_ids, [_category_state(a) for a in category.ancestors], category.num_parts)
+
+def _category_from_state(state):
+    state = list(state)
+    state[6] = [_category_from_state(a) for a in state[6]]
+    return OctopartCategory(*state)
+
+def _without_gc(fun):
+    """Runs fun with the garbage collector paused: (de)serializing allocates
+    many containers, none of them garbage, and collections would only scan
+    them over and over."""
+    @functools.wraps(fun)
+    def wrapper(*args):
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return fun(*args)
+        finally:
+            if enabled:
+                gc.enable()
+    return wrapper
+
+@_without_gc
+def dumps(objs):
+    """Serializes a list of models to bytes."""
+    brands = _Table(lambda b: b.id, brand_state)
+    attributes = _Table(lambda a: a.fieldname, attribute_state)
+    shapes = _Table(lambda keys: keys, lambda keys: keys)
+    records = []
+    for obj in objs:
+        if isinstance(obj, OctopartPart):
+            state = part_state(obj, brands.ref, attributes.ref)
+            state = state[:-2] + (_shaped(state[-2], shapes), _shaped(state[-1], shapes))
+            records.append(('P', state))
+        elif isinstance(obj, OctopartBrand):
+            records.append(('B', brands.ref(obj)))
+        elif isinstance(obj, OctopartPartAttribute):
+            records.append(('A', attributes.ref(obj)))
+        elif isinstance(obj, OctopartCategory):
+            records.append(('C', _category_state(obj)))
+        else:
+            raise TypeError('cannot serialize {!r}'.format(obj))
+    return marshal.dumps((version, brands.states, attributes.states, shapes.states, records))
+
+@_without_gc
+def loads(data):
+    """Deserializes a list of models from bytes made by dumps()."""
+    data = marshal.loads(data)
+    if data[0] != version:
+        raise ValueError('unsupported serialization version {}'.format(data[0]))
+    data_version, brand_states, attribute_states, shapes, records = data
+    brands = [OctopartBrand(*s) for s in brand_states]
+    attributes = [attribute_from_state(s) for s in attribute_states]
+    objs = []
+    for kind, state in records:
+        if kind == 'P':
+            state = state[:-2] + (_unshaped(state[-2], shapes), _unshaped(state[-1], shapes))
+            objs.append(part_from_state(state, brands.__getitem__, attributes.__getitem__))
+        elif kind == 'B':
+            objs.append(brands[state])
+        elif kind == 'A':
+            objs.append(attributes[state])
+        else:
+            objs.append(_category_from_state(state))
+    return objs
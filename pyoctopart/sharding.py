@@ -0,0 +1,601 @@
+#!/usr/bin/env python
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Sharded response cache.
+
+An OctopartShardedCache spreads the cached responses over a set of cache
+nodes, so that the capacity of a fleet adds up instead of every host caching
+the same parts.  The canonical request key (see cache.request_key()) is
+placed on a consistent hash ring, with virtual nodes, and stored on the
+`replicas` first distinct nodes following it.  Lookups try the replicas in
+ring order, and copy a response found on a later one back to those missing
+it.  A node that fails is skipped: the cache then only misses.
+
+When nodes join or leave, rebalance() copies every entry to the replicas
+that now own it, and deletes it from the nodes that no longer do.  With
+consistent hashing, only about 1/N of the keys move.
+
+A cache node is a small HTTP server holding a least recently used cache in
+memory; it is started with `python -m pyoctopart.sharding --port 7070`.
+Entries are served to the clients as API responses, so a node reachable
+from other hosts must be given a shared secret: requests and answers
+without it are refused on both sides.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import sys
+import hmac
+import json
+import time
+import socket
+import bisect
+import struct
+import hashlib
+import argparse
+import threading
+import http.client
+
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from urllib.parse import parse_qs
+from urllib.parse import quote
+from urllib.parse import urlsplit
+
+from .cache import OctopartCache
+from .cache import OctopartMemoryCache
+from .exceptions import OctopartCacheNodeError
+
+# Errors of an unreachable or failing node
+_node_errors = (OSError, http.client.HTTPException, OctopartCacheNodeError, ValueError)
+
+# Header carrying the shared secret of the nodes, in requests and answers
+secret_header = 'X-Pyoctopart-Cache-Secret'
+
+# Errors of a connection the node closed while idle, worth one retry
+_closed_errors = (ConnectionResetError, ConnectionAbortedError, BrokenPipeError, http.client.RemoteDisconnected)
+
+# Largest entry a node accepts, in bytes of JSON
+default_max_entry_size = 8 * 1024 * 1024
+
+
+def _check_secret(secret, value):
+    return secret is None or (value is not None and hmac.compare_digest(value.encode(), secret.encode()))
+
+def _check_entry(entry):
+    """Raises ValueError if entry is not a cache entry (see cache.new_entry())."""
+    if not isinstance(entry, dict) or 'json' not in entry or \
+            not isinstance(entry.get('stored'), (int, float)) or not isinstance(entry.get('size'), int):
+        raise ValueError('not a cache entry')
+    return entry
+
+
+def ring_hash(value):
+    """Returns the 64-bit position of a string on the ring."""
+    return struct.unpack('>Q', hashlib.blake2b(value.encode(), digest_size=8).digest())[0]
+
+
+class OctopartHashRing(object):
+
+    """A consistent hash ring of node names, with `vnodes` points per node."""
+
+    def __init__(self, nodes=(), vnodes=100):
+        self.vnodes = vnodes
+        self._points = []       # sorted positions
+        self._owners = []       # node of each position
+        self._nodes = []
+        for node in nodes:
+            self.add(node)
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __contains__(self, node):
+        return node in self._nodes
+
+    def nodes(self):
+        return list(self._nodes)
+
+    def add(self, node):
+        if node in self._nodes:
+            return
+        self._nodes.append(node)
+        for i in range(self.vnodes):
+            point = ring_hash('{}#{}'.format(node, i))
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, node)
+
+    def remove(self, node):
+        if node not in self._nodes:
+            return
+        self._nodes.remove(node)
+        kept = [(p, o) for p, o in zip(self._points, self._owners) if o != node]
+        self._points = [p for p, o in kept]
+        self._owners = [o for p, o in kept]
+
+    def lookup(self, key, count=1):
+        """Returns the count first distinct nodes following key on the ring."""
+        count = min(count, len(self._nodes))
+        nodes = []
+        if not count:
+            return nodes
+        start = bisect.bisect(self._points, ring_hash(key))
+        for i in range(len(self._points)):
+            node = self._owners[(start + i) % len(self._points)]
+            if node not in nodes:
+                nodes.append(node)
+                if len(nodes) == count:
+                    break
+        return nodes
+
+
+class OctopartCacheNode(object):
+
+    """Client of a cache node server, keeping one connection per thread."""
+
+    def __init__(self, url, timeout=1.0, secret=None):
+        """
+        param url: the node's base URL, such as 'http://10.0.0.5:7070'.
+        param timeout: socket timeout of the requests, in seconds.
+        param secret: the shared secret of the nodes, if any.
+        """
+        parsed = urlsplit(url)
+        self.url = url
+        self.secret = secret
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<OctopartCacheNode: {}>'.format(self.url)
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = http.client.HTTPConnection(self.host, self.port,
+                                                                              timeout=self.timeout)
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def _request(self, method, path, body=None):
+        for attempt in (0, 1):
+            reused = getattr(self._local, 'connection', None) is not None
+            connection = self._connection()
+            try:
+                headers = {'Content-Type': 'application/json'} if body else {}
+                if self.secret is not None:
+                    headers[secret_header] = self.secret
+                connection.request(method, path, body, headers)
+                response = connection.getresponse()
+                data = response.read()
+                break
+            except (OSError, http.client.HTTPException) as e:
+                connection.close()
+                self._local.connection = None
+                # The node may have closed an idle connection: retry once on a new one
+                if not reused or attempt or not isinstance(e, _closed_errors):
+                    raise
+        if not _check_secret(self.secret, response.getheader(secret_header)):
+            raise OctopartCacheNodeError(self.url, response.status, 'answer without the shared secret')
+        if response.status == 404:
+            return None
+        if response.status not in (200, 204):
+            raise OctopartCacheNodeError(self.url, response.status)
+        return json.loads(data.decode()) if data else None
+
+    def get(self, key):
+        """Returns the entry stored for key, or None."""
+        entry = self._request('GET', '/entries?key=' + quote(key, safe=''))
+        return None if entry is None else _check_entry(entry)
+
+    def set(self, key, entry):
+        self._request('PUT', '/entries?key=' + quote(key, safe=''), json.dumps(entry).encode())
+
+    def delete(self, key):
+        self._request('DELETE', '/entries?key=' + quote(key, safe=''))
+
+    def keys(self):
+        """Returns the keys stored on the node."""
+        return self._request('GET', '/keys')
+
+    def stats(self):
+        return self._request('GET', '/stats')
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def _reply(self, status, obj=None):
+        body = json.dumps(obj).encode() if obj is not None else b''
+        self.send_response(status)
+        if self.server.secret is not None:
+            self.send_header(secret_header, self.server.secret)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _key(self):
+        parsed = urlsplit(self.path)
+        if parsed.path != '/entries':
+            return None
+        return parse_qs(parsed.query).get('key', [None])[0]
+
+    def _authorized(self):
+        if _check_secret(self.server.secret, self.headers.get(secret_header)):
+            return True
+        # The body of the request is left unread
+        self.close_connection = True
+        self._reply(401)
+        return False
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        cache = self.server.cache
+        path = urlsplit(self.path).path
+        if path == '/keys':
+            return self._reply(200, cache.keys())
+        if path == '/stats':
+            return self._reply(200, {'entries': len(cache), 'hits': cache.hits, 'misses': cache.misses})
+        key = self._key()
+        if key is None:
+            return self._reply(400)
+        entry = cache.get(key)
+        self._reply(404 if entry is None else 200, entry)
+
+    def do_PUT(self):
+        if not self._authorized():
+            return
+        key = self._key()
+        try:
+            length = int(self.headers.get('Content-Length'))
+        except (TypeError, ValueError):
+            self.close_connection = True
+            return self._reply(411)
+        if length < 0 or length > self.server.max_entry_size:
+            self.close_connection = True
+            return self._reply(413)
+        body = self.rfile.read(length)
+        if key is None:
+            return self._reply(400)
+        try:
+            entry = _check_entry(json.loads(body.decode()))
+        except ValueError:
+            return self._reply(400)
+        self.server.cache.set(key, entry)
+        self._reply(204)
+
+    def do_DELETE(self):
+        if not self._authorized():
+            return
+        key = self._key()
+        if key is None:
+            return self._reply(400)
+        self.server.cache.delete(key)
+        self._reply(204)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+
+    """Keeps track of the open connections, to close them on shutdown."""
+
+    daemon_threads = True
+
+    def __init__(self, address, handler):
+        ThreadingHTTPServer.__init__(self, address, handler)
+        self.connections = set()
+        self.connections_lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        with self.connections_lock:
+            self.connections.add(request)
+        ThreadingHTTPServer.process_request(self, request, client_address)
+
+    def shutdown_request(self, request):
+        with self.connections_lock:
+            self.connections.discard(request)
+        ThreadingHTTPServer.shutdown_request(self, request)
+
+    def close_connections(self):
+        with self.connections_lock:
+            connections, self.connections = self.connections, set()
+        for connection in connections:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class OctopartCacheServer(object):
+
+    """A cache node: an HTTP server holding entries in a least recently used cache.
+
+    >>> server = OctopartCacheServer(port=7070, max_entries=100000, secret='s3cr3t').start()
+    >>> server.url
+    'http://127.0.0.1:7070'
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, max_entries=100000, secret=None,
+                 max_entry_size=default_max_entry_size):
+        """
+        param port: the port to listen on, 0 for any free port.
+        param max_entries: number of entries held before evicting the least recently used.
+        param secret: the shared secret requests must carry; required unless
+            the node only listens on the loopback interface.
+        param max_entry_size: largest entry accepted, in bytes of JSON.
+        """
+        self.cache = OctopartMemoryCache(max_entries=max_entries)
+        self._server = _Server((host, port), _Handler)
+        self._server.cache = self.cache
+        self._server.secret = secret
+        self._server.max_entry_size = max_entry_size
+        self.url = 'http://{}:{}'.format(*self._server.server_address[:2])
+        self._thread = None
+
+    def start(self):
+        """Serves requests on a background thread, and returns the server."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def close(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+        self._server.server_close()
+        self._server.close_connections()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class OctopartShardedCache(OctopartCache):
+
+    """A response cache sharded over cache nodes by consistent hashing.
+
+    >>> cache = OctopartShardedCache(['http://cache1:7070', 'http://cache2:7070'], ttl=3600, secret='s3cr3t')
+    >>> o = Octopart(apikey, cache=cache)
+    >>> cache.add_node('http://cache3:7070')   # moves its share of the entries to it
+
+    A node failing failure_threshold times in a row is skipped for backoff
+    seconds, rather than costing a timeout to every call meanwhile.
+    """
+
+    def __init__(self, nodes, ttl=0, replicas=2, vnodes=100, timeout=1.0, secret=None,
+                 failure_threshold=3, backoff=30.0):
+        """
+        param nodes: the base URLs of the cache nodes.
+        param replicas: number of nodes holding each entry.
+        param vnodes: number of points of each node on the ring.
+        param timeout: socket timeout of the node requests, in seconds.
+        param secret: the shared secret of the nodes.
+        param failure_threshold: consecutive failures of a node before it is skipped.
+        param backoff: seconds a failing node is skipped.
+        """
+        OctopartCache.__init__(self, ttl)
+        self.replicas = replicas
+        self.timeout = timeout
+        self.secret = secret
+        self.failure_threshold = failure_threshold
+        self.backoff = backoff
+        self.errors = 0
+        self.skipped = 0
+        self._failures = {}     # url -> (consecutive failures, skipped until)
+        self._nodes = {}        # url -> OctopartCacheNode
+        self._ring = OctopartHashRing(vnodes=vnodes)
+        self._ring_lock = threading.Lock()
+        for url in nodes:
+            self._nodes[url] = OctopartCacheNode(url, timeout, secret)
+            self._ring.add(url)
+
+    def nodes(self):
+        with self._ring_lock:
+            return self._ring.nodes()
+
+    def owners(self, key):
+        """Returns the OctopartCacheNode holding the replicas of key, in ring order."""
+        with self._ring_lock:
+            return [self._nodes[url] for url in self._ring.lookup(key, self.replicas)]
+
+    def available(self, node):
+        """Returns False while node is skipped after repeated failures."""
+        with self._lock:
+            failures, until = self._failures.get(node.url, (0, None))
+        return until is None or time.monotonic() >= until
+
+    def _try(self, node, method, *args):
+        """Calls a node method, returns (True, result), or (False, None) if the
+        node failed or is skipped."""
+        if not self.available(node):
+            with self._lock:
+                self.skipped += 1
+            return False, None
+        try:
+            result = getattr(node, method)(*args)
+        except _node_errors:
+            with self._lock:
+                self.errors += 1
+                failures = self._failures.get(node.url, (0, None))[0] + 1
+                until = time.monotonic() + self.backoff if failures >= self.failure_threshold else None
+                self._failures[node.url] = (failures, until)
+            return False, None
+        if node.url in self._failures:
+            with self._lock:
+                self._failures.pop(node.url, None)
+        return True, result
+
+    def _get(self, key):
+        missing = []
+        for node in self.owners(key):
+            ok, entry = self._try(node, 'get', key)
+            if entry is not None:
+                # Read repair of the replicas that lost the entry
+                for m in missing:
+                    self._try(m, 'set', key, entry)
+                return entry
+            if ok:
+                missing.append(node)
+        return None
+
+    def _set(self, key, entry):
+        for node in self.owners(key):
+            self._try(node, 'set', key, entry)
+
+    def _delete(self, key):
+        for node in self.owners(key):
+            self._try(node, 'delete', key)
+
+    def add_node(self, url, rebalance=True):
+        """Adds a node to the ring, and moves its share of the entries to it.
+
+        returns: the rebalance() statistics, or None.
+        """
+        with self._ring_lock:
+            if url in self._nodes:
+                return None
+            self._nodes[url] = OctopartCacheNode(url, self.timeout, self.secret)
+            self._ring.add(url)
+        return self.rebalance() if rebalance else None
+
+    def remove_node(self, url, rebalance=True):
+        """Removes a node from the ring, and moves its entries to their new
+        owners if it still answers.
+
+        returns: the rebalance() statistics, or None.
+        """
+        with self._ring_lock:
+            node = self._nodes.pop(url, None)
+            self._ring.remove(url)
+        with self._lock:
+            self._failures.pop(url, None)
+        if node is None:
+            return None
+        try:
+            return self.rebalance([node]) if rebalance else None
+        finally:
+            node.close()
+
+    def rebalance(self, leaving=()):
+        """Copies every entry to the nodes that own it, and deletes it from the
+        others once all its owners hold it.
+
+        Entries only held by failed nodes are lost, and will be missed.
+        param leaving: nodes off the ring whose entries are to be moved.
+        returns: {'keys', 'copied', 'deleted'}.
+        """
+        with self._ring_lock:
+            sources = list(self._nodes.values())
+        sources += list(leaving)
+        locations = {}          # key -> nodes holding it
+        for node in sources:
+            ok, keys = self._try(node, 'keys')
+            for key in keys or ():
+                locations.setdefault(key, []).append(node)
+        copied = deleted = 0
+        for key, held in locations.items():
+            owners = self.owners(key)
+            missing = [node for node in owners if node not in held]
+            if missing:
+                entry = None
+                for node in held:
+                    ok, entry = self._try(node, 'get', key)
+                    if entry is not None:
+                        break
+                if entry is None:
+                    continue
+                for node in missing:
+                    ok, _ = self._try(node, 'set', key, entry)
+                    if not ok:
+                        break
+                    copied += 1
+                else:
+                    missing = []
+                if missing:
+                    continue
+            for node in held:
+                if node not in owners:
+                    ok, _ = self._try(node, 'delete', key)
+                    deleted += ok
+        return {'keys': len(locations), 'copied': copied, 'deleted': deleted}
+
+    def stats(self):
+        """Returns the number of entries of each node, None for the failed ones."""
+        with self._ring_lock:
+            nodes = dict(self._nodes)
+        stats = {}
+        for url, node in nodes.items():
+            ok, node_stats = self._try(node, 'stats')
+            stats[url] = node_stats['entries'] if ok and node_stats else None
+        return stats
+
+    def close(self):
+        with self._ring_lock:
+            nodes = list(self._nodes.values())
+        for node in nodes:
+            node.close()
+
+
+''' Command line '''
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='pyoctopart.sharding',
+                                     description='Run a cache node of a sharded Octopart response cache.')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on')
+    parser.add_argument('--port', type=int, default=7070, help='port to listen on')
+    parser.add_argument('--max-entries', type=int, default=100000,
+                        help='entries held before evicting the least recently used')
+    parser.add_argument('--max-entry-size', type=int, default=default_max_entry_size,
+                        help='largest entry accepted, in bytes')
+    parser.add_argument('--secret', default=os.environ.get('PYOCTOPART_CACHE_SECRET'),
+                        help='shared secret of the nodes (defaults to $PYOCTOPART_CACHE_SECRET)')
+    args = parser.parse_args(argv)
+    if args.secret is None and args.host not in ('127.0.0.1', '::1', 'localhost'):
+        parser.error('a node listening on {} needs a --secret'.format(args.host))
+
+    server = OctopartCacheServer(args.host, args.port, args.max_entries, args.secret, args.max_entry_size)
+    print('cache node listening on {}'.format(server.url), file=sys.stderr, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
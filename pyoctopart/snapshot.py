@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Memory-mapped part snapshots.
+
+A snapshot is a single read-only file holding Part resources (with their
+offers) and a sorted uid index.  Opening a snapshot maps it in memory: any
+number of processes can share it through the page cache, a lookup is a
+binary search in the index followed by the decoding of one record, and
+OctopartPart objects are only built when asked for.
+
+File layout (all integers little endian):
+
+    header   magic (8 bytes), flags (u32), count (u64), index offset (u64)
+    records  compact JSON of each Part resource, zlib compressed if flagged
+    index    count entries of key (i64), record offset (u64), record size (u32),
+             sorted by key
+
+The key of a part is its uid when it is an integer, or a 64-bit hash of it.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import json
+import mmap
+import zlib
+import struct
+import hashlib
+
+from .octopart import OctopartPart
+
+magic = b'OPSNAP01'
+_header = struct.Struct('<8sIQQ')
+_entry = struct.Struct('<qQI')
+
+FLAG_COMPRESSED = 1
+
+
+def uid_key(uid):
+    """Returns the 64-bit index key of a part uid."""
+    if isinstance(uid, int) and -2**63 <= uid < 2**63:
+        return uid
+    digest = hashlib.blake2b(str(uid).encode(), digest_size=8).digest()
+    return struct.unpack('<q', digest)[0]
+
+def write_snapshot(path, parts, compress=False):
+    """Writes Part resource dictionaries to a snapshot.
+
+    The file is written next to path and renamed over it once complete, so
+    readers never see a partial snapshot.
+
+    param path: the snapshot file.
+    param parts: iterable of Part resource dictionaries; a later part with the
+        same uid replaces an earlier one.
+    param compress: zlib compress every record.
+    returns: the number of parts written.
+    """
+    tmp = path + '.tmp'
+    entries = {}
+    with open(tmp, 'wb') as f:
+        f.write(_header.pack(magic, 0, 0, 0))
+        for part in parts:
+            record = json.dumps(part, separators=(',', ':')).encode()
+            if compress:
+                record = zlib.compress(record)
+            entries[part['uid']] = (uid_key(part['uid']), f.tell(), len(record))
+            f.write(record)
+        index_offset = f.tell()
+        for entry in sorted(entries.values()):
+            f.write(_entry.pack(*entry))
+        f.seek(0)
+        f.write(_header.pack(magic, FLAG_COMPRESSED if compress else 0, len(entries), index_offset))
+    os.replace(tmp, path)
+    return len(entries)
+
+
+class OctopartSnapshot(object):
+
+    """A read-only, memory-mapped part snapshot.
+
+    >>> with OctopartSnapshot('parts.snap') as snapshot:
+    ...     part = snapshot.get(39619421)      # an OctopartPart, or None
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        header, self.flags, self.count, self._index = _header.unpack_from(self._map, 0)
+        if header != magic:
+            self.close()
+            raise ValueError('{} is not a part snapshot'.format(path))
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def _entry(self, i):
+        return _entry.unpack_from(self._map, self._index + i * _entry.size)
+
+    def _record(self, offset, size):
+        record = self._map[offset:offset + size]
+        if self.flags & FLAG_COMPRESSED:
+            record = zlib.decompress(record)
+        return json.loads(record.decode())
+
+    def get_dict(self, uid):
+        """Returns the Part resource dictionary of uid, or None."""
+        key = uid_key(uid)
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._entry(mid)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        # Different uids may share a hashed key: check the records
+        while lo < self.count:
+            entry_key, offset, size = self._entry(lo)
+            if entry_key != key:
+                break
+            part = self._record(offset, size)
+            if part['uid'] == uid:
+                return part
+            lo += 1
+        return None
+
+    def get(self, uid):
+        """Returns the OctopartPart of uid, built from its record, or None."""
+        part = self.get_dict(uid)
+        return OctopartPart.new_from_dict(part) if part is not None else None
+
+    def __contains__(self, uid):
+        return self.get_dict(uid) is not None
+
+    def __iter__(self):
+        """Yields every Part resource dictionary, in index order."""
+        for i in range(self.count):
+            key, offset, size = self._entry(i)
+            yield self._record(offset, size)
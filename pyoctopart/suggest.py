@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Offline MPN autocompletion.
+
+The index learns the manufacturer part numbers of the parts seen in API
+responses, and answers prefix queries from a sorted array.  The API's
+`parts_suggest_v2` is only called when the index has too few suggestions,
+and its answers are added to the index.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import threading
+
+from bisect import bisect_left
+
+from .octopart import iter_parts
+
+
+class OctopartSuggestIndex(object):
+
+    """A bounded prefix index of manufacturer part numbers.
+
+    MPNs are kept in a sorted array of upper cased keys, searched by
+    bisection.  New MPNs go to a small unsorted buffer, scanned on lookups and
+    merged into the array when it is full.  When the index holds more than
+    `max_entries` MPNs, the oldest tenth of them is dropped.
+
+    >>> index = OctopartSuggestIndex(max_entries=1000000)
+    >>> o.observers.append(index.observe)
+    >>> index.suggest('sn74ls', 10, api=o)
+    """
+
+    def __init__(self, max_entries=1000000, buffer_size=1024):
+        self.max_entries = max_entries
+        self.buffer_size = buffer_size
+        self._mpns = {}     # upper cased key -> MPN, in insertion order
+        self._sorted = []
+        self._buffer = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._mpns)
+
+    def __contains__(self, mpn):
+        return mpn.upper() in self._mpns
+
+    def add(self, mpn):
+        key = mpn.upper()
+        if key in self._mpns:
+            return
+        with self._lock:
+            if key in self._mpns:
+                return
+            self._mpns[key] = mpn
+            self._buffer.append(key)
+            if len(self._mpns) > self.max_entries:
+                self._evict()
+            elif len(self._buffer) >= self.buffer_size:
+                self._merge()
+
+    def update(self, mpns):
+        for mpn in mpns:
+            self.add(mpn)
+
+    def _merge(self):
+        # Lookups may run meanwhile: build a new array rather than sorting in place
+        self._sorted = sorted(self._sorted + self._buffer)
+        self._buffer = []
+
+    def _evict(self):
+        count = max(len(self._mpns) - self.max_entries, self.max_entries // 10)
+        for key in list(self._mpns)[:count]:
+            del self._mpns[key]
+        self._sorted = sorted(self._mpns)
+        self._buffer = []
+
+    def observe(self, method, json_obj):
+        """Adds the MPNs of the parts of a response, to be used as an Octopart observer."""
+        for part in iter_parts(json_obj):
+            mpn = part.get('mpn')
+            if mpn:
+                self.add(mpn)
+
+    def lookup(self, prefix, limit=25):
+        """Returns up to limit indexed MPNs starting with prefix, in order."""
+        prefix = prefix.upper()
+        sorted_keys, buffer = self._sorted, self._buffer
+        keys = []
+        i = bisect_left(sorted_keys, prefix)
+        while i < len(sorted_keys) and len(keys) < limit and sorted_keys[i].startswith(prefix):
+            keys.append(sorted_keys[i])
+            i += 1
+        keys.extend(k for k in buffer if k.startswith(prefix))
+        keys = sorted(set(keys))[:limit]
+        return [self._mpns.get(k, k) for k in keys]
+
+    def suggest(self, q, limit=25, api=None):
+        """Suggests MPNs starting with q.
+
+        param q: the prefix typed so far.
+        param limit: maximum number of suggestions.
+        param api: an Octopart instance, used through parts_suggest_v2 when the
+            index has fewer than limit suggestions.
+        returns: a list of MPNs.
+        """
+        suggestions = self.lookup(q, limit)
+        if len(suggestions) < limit and api is not None and len(q) >= 2:
+            result = api.parts_suggest_v2(q, limit=min(limit, 25))
+            if result is not None:
+                mpns = [mpn for mpn in result[1] if isinstance(mpn, str)]
+                self.update(mpns)
+                known = set(m.upper() for m in suggestions)
+                suggestions.extend(m for m in mpns if m.upper() not in known)
+                suggestions = suggestions[:limit]
+        return suggestions
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Supplier index of cached offers.
+
+An inverted index from supplier id to the offers of every cached part, kept
+up to date as parts are added or refreshed, so that supplier-filtered stock
+and price queries only look at that supplier's offers.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import threading
+
+from .octopart import OctopartBrand
+from .octopart import iter_parts
+
+
+def offer_supplier_id(offer):
+    """Returns the supplier id of an offer (API v2 `supplier` or v3 `seller`)."""
+    supplier = offer.get('supplier') or offer.get('seller')
+    if isinstance(supplier, OctopartBrand):
+        return supplier.id
+    if isinstance(supplier, dict):
+        return supplier.get('id', supplier.get('uid'))
+    return None
+
+def offer_avail(offer):
+    """Returns the quantity in stock of an offer, 0 if unknown."""
+    avail = offer.get('avail', offer.get('in_stock_quantity'))
+    return avail if isinstance(avail, int) and avail > 0 else 0
+
+def offer_price(offer, quantity=1, currency='USD'):
+    """Returns the unit price of an offer for quantity, or None.
+
+    Handles API v2 price lists ([[quantity, price, currency], ...]) and API v3
+    price dictionaries ({currency: [[quantity, price], ...]}).
+    """
+    prices = offer.get('prices') or []
+    if isinstance(prices, dict):
+        breaks = [(b[0], b[1]) for b in prices.get(currency, [])]
+    else:
+        breaks = [(b[0], b[1]) for b in prices if len(b) < 3 or b[2] == currency]
+    price = None
+    for break_quantity, break_price in sorted(breaks, key=lambda b: b[0]):
+        if break_quantity > quantity:
+            break
+        price = float(break_price)
+    return price
+
+
+class OctopartSupplierIndex(object):
+
+    """An inverted index from supplier id to (part uid, offer).
+
+    >>> index = OctopartSupplierIndex()
+    >>> o.observers.append(index.observe)
+    >>> index.offers(459, min_avail=1000)      # Digi-Key offers with 1000+ in stock
+    >>> index.cheapest(459, quantity=100)
+    """
+
+    def __init__(self):
+        self._offers = {}       # supplier id -> part uid -> list of offers
+        self._suppliers = {}    # part uid -> set of supplier ids
+        self._lock = threading.Lock()
+
+    def __contains__(self, uid):
+        return uid in self._suppliers
+
+    def __len__(self):
+        return len(self._suppliers)
+
+    def add(self, part):
+        """Indexes (or refreshes) the offers of an OctopartPart or a Part resource dictionary."""
+        if isinstance(part, dict):
+            uid, offers = part['uid'], part.get('offers') or []
+        else:
+            uid, offers = part.uid, part.offers
+        by_supplier = {}
+        for offer in offers:
+            supplier_id = offer_supplier_id(offer)
+            if supplier_id is not None:
+                by_supplier.setdefault(supplier_id, []).append(offer)
+        with self._lock:
+            self._remove(uid)
+            for supplier_id, supplier_offers in by_supplier.items():
+                self._offers.setdefault(supplier_id, {})[uid] = supplier_offers
+            self._suppliers[uid] = set(by_supplier)
+
+    def update(self, parts):
+        for part in parts:
+            self.add(part)
+
+    def remove(self, uid):
+        with self._lock:
+            self._remove(uid)
+
+    def _remove(self, uid):
+        for supplier_id in self._suppliers.pop(uid, ()):
+            parts = self._offers[supplier_id]
+            del parts[uid]
+            if not parts:
+                del self._offers[supplier_id]
+
+    def observe(self, method, json_obj):
+        """Indexes the offers of the parts of a response, to be used as an Octopart observer."""
+        for part in iter_parts(json_obj):
+            if 'uid' in part and 'offers' in part:
+                self.add(part)
+
+    def suppliers(self):
+        return list(self._offers)
+
+    def parts(self, supplier_id):
+        """Returns the uids of the parts offered by a supplier."""
+        return list(self._offers.get(supplier_id, {}))
+
+    def offers(self, supplier_id, min_avail=None):
+        """Returns the (part uid, offer) pairs of a supplier.
+
+        param min_avail: when given, only offers with at least that many in stock.
+        """
+        pairs = []
+        for uid, offers in list(self._offers.get(supplier_id, {}).items()):
+            for offer in offers:
+                if min_avail is None or offer_avail(offer) >= min_avail:
+                    pairs.append((uid, offer))
+        return pairs
+
+    def priced_offers(self, supplier_id, quantity=1, currency='USD', max_price=None, min_avail=None):
+        """Returns (unit price, part uid, offer) for the offers of a supplier
+        with a price for quantity, cheapest first.
+
+        param max_price: when given, only offers at most that unit price.
+        param min_avail: when given, only offers with at least that many in stock.
+        """
+        priced = []
+        for uid, offer in self.offers(supplier_id, min_avail):
+            price = offer_price(offer, quantity, currency)
+            if price is not None and (max_price is None or price <= max_price):
+                priced.append((price, uid, offer))
+        priced.sort(key=lambda p: p[0])
+        return priced
+
+    def cheapest(self, supplier_id, quantity=1, currency='USD', min_avail=None):
+        """Returns the cheapest (unit price, part uid, offer) of a supplier, or None."""
+        priced = self.priced_offers(supplier_id, quantity, currency, min_avail=min_avail)
+        return priced[0] if priced else None
+
+    def stock(self, supplier_id, uid):
+        """Returns the total quantity of a part in stock at a supplier."""
+        return sum(offer_avail(o) for o in self._offers.get(supplier_id, {}).get(uid, []))
@@ -21,6 +21,12 @@ setup(name='pyoctopart',
       license='GPLv3',
       packages=['pyoctopart'],
       zip_safe=False,
+      entry_points={
+          'console_scripts': [
+              'pyoctopart-bom = pyoctopart.bulk:main',
+              'pyoctopart-cache-node = pyoctopart.sharding:main',
+          ],
+      },
       setup_requires=['setuptools-markdown'],
       install_requires=[
           'pyoctopart',
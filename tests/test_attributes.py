@@ -0,0 +1,86 @@
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from unittest import mock
+
+from pyoctopart.octopart import *
+from pyoctopart.attributes import *
+
+
+def attribute(fieldname):
+    return {'__class__': 'PartAttribute', 'fieldname': fieldname, 'displayname': fieldname.title(),
+            'type': 'number', 'metadata': {'datatype': 'decimal', 'unit': {'name': 'Farad', 'symbol': 'F'}}}
+
+def part(uid, fieldnames):
+    return {'__class__': 'Part', 'uid': uid, 'mpn': 'PART{}'.format(uid), 'manufacturer': None,
+            'detail_url': '', 'specs': [{'attribute': attribute(f), 'values': [1.0]} for f in fieldnames]}
+
+class AttributeRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.registry = OctopartAttributeRegistry(OctopartPartAttribute)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_parts_share_attributes(self):
+        a = OctopartPart.new_from_dict(part(1, ['capacitance', 'voltage_rating_dc']))
+        b = OctopartPart.new_from_dict(part(2, ['capacitance']))
+        assert a.specs[0]['attribute'] is b.specs[0]['attribute']
+        assert a.specs[0]['attribute'] is attribute_registry.get('capacitance')
+
+    def test_prefetch_only_missing(self):
+        self.registry.intern(attribute('capacitance'))
+        def get_multi(fieldnames):
+            return [attribute(f) for f in fieldnames], None
+        with mock.patch.object(Octopart, 'partattributes_get_multi', side_effect=get_multi) as get:
+            added = self.registry.prefetch(Octopart(apikey='92bdca1b'),
+                                           ['capacitance', 'resistance', 'resistance', 'tolerance'])
+        assert added == 2
+        get.assert_called_once_with(['resistance', 'tolerance'])
+
+    def test_prefetch_through_get(self):
+        def fake_get(url, params, headers, timeout):
+            # partattributes/get_multi answers a list, not a dictionary
+            r = mock.Mock()
+            r.status_code = 200
+            r.headers = {}
+            r.json.return_value = [attribute(f) for f in json.loads(params['fieldnames'])]
+            r.content = json.dumps(r.json.return_value).encode()
+            return r
+        with mock.patch('pyoctopart.octopart.requests.Session.get', side_effect=fake_get) as get:
+            added = self.registry.prefetch(Octopart(apikey='92bdca1b'), ['resistance', 'tolerance'])
+        assert added == 2
+        assert get.call_count == 1
+        assert self.registry.get('tolerance').displayname == 'Tolerance'
+
+    def test_save_and_load(self):
+        path = os.path.join(self.tmpdir, 'attributes.json')
+        self.registry.intern(attribute('capacitance'))
+        self.registry.save(path)
+        registry = OctopartAttributeRegistry(OctopartPartAttribute)
+        assert registry.load(path) == 1
+        assert registry.get('capacitance') == self.registry.get('capacitance')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+import json
+import time
+import unittest
+import requests
+
+from unittest import mock
+
+from pyoctopart.octopart import *
+from pyoctopart.cache import OctopartMemoryCache
+from pyoctopart.breaker import *
+
+
+def response(status_code, json_obj=None):
+    r = mock.Mock()
+    r.status_code = status_code
+    r.headers = {}
+    r.content = json.dumps(json_obj).encode() if json_obj is not None else b''
+    r.json.return_value = json_obj
+    return r
+
+class CircuitBreakerTest(unittest.TestCase):
+
+    def test_states(self):
+        breaker = OctopartCircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+        assert breaker.allow('parts/match')
+        breaker.failure('parts/match')
+        assert breaker.state('parts/match') == CLOSED
+        breaker.failure('parts/match')
+        assert breaker.state('parts/match') == OPEN
+        assert not breaker.allow('parts/match')
+        assert breaker.allow('bom/match')
+        time.sleep(0.06)
+        # a single probe at a time
+        assert breaker.allow('parts/match')
+        assert not breaker.allow('parts/match')
+        breaker.failure('parts/match')
+        assert breaker.state('parts/match') == OPEN
+        time.sleep(0.06)
+        assert breaker.allow('parts/match')
+        breaker.success('parts/match')
+        assert breaker.state('parts/match') == CLOSED
+        assert breaker.allow('parts/match')
+
+    def test_slow_answers_count_as_failures(self):
+        breaker = OctopartCircuitBreaker(failure_threshold=1, latency_threshold=2.0)
+        breaker.success('parts/match', latency=1.0)
+        assert breaker.state('parts/match') == CLOSED
+        breaker.success('parts/match', latency=3.0)
+        assert breaker.state('parts/match') == OPEN
+
+    def test_fail_fast_and_serve_stale(self):
+        o = Octopart(apikey='92bdca1b', cache=OctopartMemoryCache(),
+                     breaker=OctopartCircuitBreaker(failure_threshold=2, reset_timeout=60))
+        body = {'results': [{'items': []}]}
+        answers = [response(200, body), response(503), requests.ConnectionError('reset')]
+        with mock.patch('pyoctopart.octopart.requests.Session.get', side_effect=answers) as get:
+            json_obj, results = o.parts_match([{'mpn': 'SN74LS240'}])
+            assert not getattr(json_obj, 'stale', False)
+            self.assertRaises(Octopart503Error, o.parts_match, [{'mpn': 'SN74LS240'}])
+            self.assertRaises(requests.ConnectionError, o.parts_match, [{'mpn': 'SN74LS240'}])
+            # open: cached calls are served stale, others fail fast
+            json_obj, results = o.parts_match([{'mpn': 'SN74LS240'}])
+            self.assertRaises(OctopartCircuitOpenError, o.parts_match, [{'mpn': 'SN74S74'}])
+        assert get.call_count == 3
+        assert json_obj.stale
+        assert json_obj == body
+        assert results == [{'items': []}]
+        stats = o.breaker.stats()['parts/match']
+        assert stats['state'] == OPEN
+        assert stats['rejected'] == 2
+        assert stats['stale'] == 1
+
+    def test_probe_closes_the_circuit(self):
+        o = Octopart(apikey='92bdca1b', breaker=OctopartCircuitBreaker(failure_threshold=1, reset_timeout=0.05))
+        answers = [response(503), response(200, {'results': []})]
+        with mock.patch('pyoctopart.octopart.requests.Session.get', side_effect=answers):
+            self.assertRaises(Octopart503Error, o.parts_match, [{'mpn': 'SN74LS240'}])
+            self.assertRaises(OctopartCircuitOpenError, o.parts_match, [{'mpn': 'SN74LS240'}])
+            time.sleep(0.06)
+            json_obj, results = o.parts_match([{'mpn': 'SN74LS240'}])
+        assert o.breaker.state('parts/match') == CLOSED
+
+    def test_serve_stale_list(self):
+        o = Octopart(apikey='92bdca1b', cache=OctopartMemoryCache(),
+                     breaker=OctopartCircuitBreaker(failure_threshold=1, reset_timeout=60))
+        body = [{'__class__': 'PartAttribute', 'fieldname': 'capacitance', 'displayname': 'Capacitance',
+                 'type': 'number', 'metadata': {'unit': {'name': 'farads', 'symbol': 'F'}}}]
+        answers = [response(200, body), response(503)]
+        with mock.patch('pyoctopart.octopart.requests.Session.get', side_effect=answers):
+            o.partattributes_get_multi(['capacitance'])
+            self.assertRaises(Octopart503Error, o.partattributes_get_multi, ['capacitance'])
+            json_obj, attributes = o.partattributes_get_multi(['capacitance'])
+        assert json_obj.stale
+        assert json_obj == body
+        assert attributes[0].fieldname == 'capacitance'
+
+    def test_server_errors_count_as_failures(self):
+        o = Octopart(apikey='92bdca1b', breaker=OctopartCircuitBreaker(failure_threshold=2, reset_timeout=60))
+        with mock.patch('pyoctopart.octopart.requests.Session.get', side_effect=[response(502), response(429)]):
+            for i in range(2):
+                try:
+                    o.parts_match([{'mpn': 'SN74LS240'}])
+                except Exception:
+                    pass
+        assert o.breaker.state('parts/match') == OPEN
+        self.assertRaises(OctopartCircuitOpenError, o.parts_match, [{'mpn': 'SN74LS240'}])
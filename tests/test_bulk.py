@@ -0,0 +1,142 @@
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import io
+import os
+import json
+import shutil
+import tempfile
+import time
+import threading
+import unittest
+
+from unittest import mock
+
+from pyoctopart.octopart import Octopart
+from pyoctopart.breaker import OctopartCircuitBreaker
+from pyoctopart.bulk import *
+
+
+def fake_bom_match(method, req_url, payload, args):
+    lines = json.loads(payload['lines'])
+    return {'results': [{'items': [], 'reference': l.get('reference', ''), 'status': 'ok'} for l in lines]}
+
+class BulkPipelineTest(unittest.TestCase):
+
+    def test_normalize_line(self):
+        line = {' MPN ': ' SN74LS240N ', 'Manufacturer': 'Texas   Instruments', 'Qty': '3', 'limit': '5', 'sku': ''}
+        assert normalize_line(line) == {'mpn': 'SN74LS240N', 'manufacturer': 'Texas Instruments', 'limit': 5}
+
+    def test_read_lines(self):
+        tsv = io.StringIO('mpn\tmanufacturer\nSN74LS240N\tTexas Instruments\n')
+        assert list(read_lines(tsv, 'tsv')) == [{'mpn': 'SN74LS240N', 'manufacturer': 'Texas Instruments'}]
+        jsonl = io.StringIO('{"mpn": "SN74LS240N"}\n\n{"mpn": "SN74S74N"}\n')
+        assert [l['mpn'] for l in read_lines(jsonl, 'jsonl')] == ['SN74LS240N', 'SN74S74N']
+        assert guess_format('bom.TSV') == 'tsv'
+
+    def test_results_keep_input_order(self):
+        lines = ({'mpn': 'PART{}'.format(i), 'reference': 'R{}'.format(i)} for i in range(95))
+        pipeline = OctopartBomPipeline(Octopart(apikey='92bdca1b'), chunk_size=7, workers=3)
+        with mock.patch.object(Octopart, '_fetch', side_effect=fake_bom_match) as fetch:
+            out = io.StringIO()
+            count = write_results(pipeline.run(lines), out)
+        assert count == 95
+        assert fetch.call_count == 14
+        rows = [json.loads(row) for row in out.getvalue().splitlines()]
+        assert [r['result']['reference'] for r in rows] == ['R{}'.format(i) for i in range(95)]
+
+    def test_backpressure(self):
+        consumed = []
+        def lines():
+            for i in range(100):
+                consumed.append(i)
+                yield {'mpn': 'PART{}'.format(i)}
+        pipeline = OctopartBomPipeline(Octopart(apikey='92bdca1b'), chunk_size=10, workers=2, max_pending=2)
+        with mock.patch.object(Octopart, '_fetch', side_effect=fake_bom_match):
+            results = pipeline.run(lines())
+            next(results)
+            assert len(consumed) <= 30
+
+    def test_dedupe_lines(self):
+        lines = [normalize_line(l) for l in (
+            {'mpn': 'sn74ls240n', 'manufacturer': 'Texas Instruments', 'reference': 'U1'},
+            {'mpn': ' SN74LS240N', 'manufacturer': 'texas  instruments', 'reference': 'U2'},
+            {'mpn': 'RB-220-07A R', 'reference': 'SW1'},
+        )]
+        queries, positions = dedupe_lines(lines)
+        assert queries == [{'mpn': 'SN74LS240N', 'manufacturer': 'Texas Instruments'}, {'mpn': 'RB-220-07A R'}]
+        assert positions == [0, 0, 1]
+
+    def test_dedupe_fans_results_out(self):
+        lines = [{'mpn': 'PART{}'.format(i % 10), 'reference': 'R{}'.format(i)} for i in range(100)]
+        pipeline = OctopartBomPipeline(Octopart(apikey='92bdca1b'), dedupe=True, window=50)
+        with mock.patch.object(Octopart, '_fetch', side_effect=fake_bom_match) as fetch:
+            results = list(pipeline.run(lines))
+        assert fetch.call_count == 2
+        assert [r['reference'] for l, r in results] == ['R{}'.format(i) for i in range(100)]
+        assert pipeline.stats['queries'] == 20
+        assert pipeline.stats['saved_lines'] == 80
+        assert pipeline.stats['saved_requests'] == 4
+
+    def test_dedupe_window_keeps_max_pending(self):
+        lock = threading.Lock()
+        running = [0, 0]        # current, highest
+        def slow_bom_match(method, req_url, payload, args):
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+            return fake_bom_match(method, req_url, payload, args)
+        lines = [{'mpn': 'PART{}'.format(i), 'reference': 'R{}'.format(i)} for i in range(400)]
+        pipeline = OctopartBomPipeline(Octopart(apikey='92bdca1b'), workers=16, max_pending=4, dedupe=True)
+        with mock.patch.object(Octopart, '_fetch', side_effect=slow_bom_match) as fetch:
+            results = list(pipeline.run(lines))
+        assert fetch.call_count == 20
+        assert running[1] <= 4
+        assert [r['reference'] for l, r in results] == ['R{}'.format(i) for i in range(400)]
+
+    def test_main_reads_csv_with_bom(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            bom, out = os.path.join(tmpdir, 'bom.csv'), os.path.join(tmpdir, 'out.jsonl')
+            with open(bom, 'w', encoding='utf-8-sig') as f:
+                f.write('mpn,reference\nSN74LS240N,U1\n')
+            with mock.patch.object(Octopart, '_fetch', side_effect=fake_bom_match) as fetch:
+                assert main([bom, out, '--apikey', '92bdca1b']) == 0
+            assert json.loads(fetch.call_args[0][2]['lines']) == [{'mpn': 'SN74LS240N', 'reference': 'U1'}]
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_open_circuit_marks_batches_missing(self):
+        def unavailable(url, params=None, headers=None, timeout=None):
+            return mock.Mock(status_code=503, headers={}, content=b'')
+        api = Octopart(apikey='92bdca1b', breaker=OctopartCircuitBreaker(failure_threshold=1, reset_timeout=60))
+        lines = [{'mpn': 'PART{}'.format(i)} for i in range(30)]
+        pipeline = OctopartBomPipeline(api, chunk_size=10, workers=1, retries=0)
+        with mock.patch('pyoctopart.octopart.requests.Session.get', side_effect=unavailable):
+            results = pipeline.run(lines)
+            self.assertRaises(Exception, next, results)
+            # batches sent once the circuit is open are missing, the run goes on
+            results = list(pipeline.run(lines))
+        assert len(results) == 30
+        assert all(result is None for line, result in results)
+        assert pipeline.missing == [0, 1, 2]
+        assert not pipeline.expired
+
+if __name__ == '__main__':
+    unittest.main()
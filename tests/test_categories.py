@@ -0,0 +1,105 @@
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from unittest import mock
+
+from pyoctopart.octopart import Octopart
+from pyoctopart.octopart import OctopartCategory
+from pyoctopart.categories import *
+
+
+def category(id, parent_id, children_ids, ancestor_ids):
+    return {'__class__': 'Category', 'id': id, 'parent_id': parent_id, 'nodename': 'Node {}'.format(id),
+            'images': [], 'children_ids': children_ids, 'ancestor_ids': ancestor_ids, 'num_parts': 0}
+
+# 1 ─┬─ 2 ─┬─ 4
+#    │     └─ 5 ── 7
+#    └─ 3 ── 6
+taxonomy = {
+    1: category(1, None, [2, 3], []),
+    2: category(2, 1, [4, 5], [1]),
+    3: category(3, 1, [6], [1]),
+    4: category(4, 2, [], [2, 1]),
+    5: category(5, 2, [7], [2, 1]),
+    6: category(6, 3, [], [3, 1]),
+    7: category(7, 5, [], [5, 2, 1]),
+}
+
+def fake_categories_get_multi(ids):
+    return [taxonomy[id] for id in ids], None
+
+def fake_get(url, params, headers, timeout):
+    # categories/get_multi answers a list, not a dictionary
+    r = mock.Mock()
+    r.status_code = 200
+    r.headers = {}
+    r.json.return_value = [taxonomy[id] for id in json.loads(params['ids'])]
+    r.content = json.dumps(r.json.return_value).encode()
+    return r
+
+class CategoryTreeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.api = Octopart(apikey='92bdca1b')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_load_and_query(self):
+        with mock.patch.object(Octopart, 'categories_get_multi', side_effect=fake_categories_get_multi) as get:
+            tree = OctopartCategoryTree.from_api(self.api, [1])
+        assert get.call_count == 4
+        assert len(tree) == 7
+        assert tree.parent_id(7) == 5
+        assert tree.parent_id(1) is None
+        assert tree.children_ids(2) == [4, 5]
+        assert tree.ancestor_ids(7) == [5, 2, 1]
+        assert tree.descendant_ids(2) == [4, 5, 7]
+        assert tree.descendant_ids(1) == [2, 4, 5, 7, 3, 6]
+        assert tree.is_under(7, 2)
+        assert tree.is_under(7, 1)
+        assert not tree.is_under(6, 2)
+        assert not tree.is_under(2, 2)
+        assert isinstance(tree.category(7), OctopartCategory)
+        assert tree.category(7) is tree.children(5)[0]
+
+    def test_get_multi(self):
+        with mock.patch('pyoctopart.octopart.requests.Session.get', side_effect=fake_get) as get:
+            json_obj, categories = self.api.categories_get_multi([2, 3])
+            tree = OctopartCategoryTree.from_api(self.api, [1])
+        assert json_obj == [taxonomy[2], taxonomy[3]]
+        assert [c.nodename for c in categories] == ['Node 2', 'Node 3']
+        assert get.call_count == 5
+        assert tree.descendant_ids(1) == [2, 4, 5, 7, 3, 6]
+
+    def test_disk_cache(self):
+        path = os.path.join(self.tmpdir, 'categories.json')
+        with mock.patch.object(Octopart, 'categories_get_multi', side_effect=fake_categories_get_multi) as get:
+            OctopartCategoryTree.cached(self.api, path, [1])
+            tree = OctopartCategoryTree.cached(self.api, path, [1])
+        assert get.call_count == 4
+        assert tree.descendant_ids(3) == [6]
+        assert tree.category(4).nodename == 'Node 4'
+
+if __name__ == '__main__':
+    unittest.main()
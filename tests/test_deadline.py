@@ -0,0 +1,174 @@
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+import os
+import json
+import time
+import shutil
+import tempfile
+import unittest
+import requests
+
+from unittest import mock
+
+from pyoctopart.octopart import Octopart
+from pyoctopart.exceptions import Octopart503Error
+from pyoctopart.exceptions import OctopartDeadlineExceededError
+from pyoctopart.jobs import OctopartJob
+from pyoctopart.jobs import call_with_retry
+from pyoctopart.bulk import OctopartBomPipeline
+from pyoctopart.breaker import OctopartCircuitBreaker
+from pyoctopart.breaker import CLOSED
+from pyoctopart.scheduler import OctopartScheduler
+from pyoctopart.deadline import *
+
+
+def slow_response(delay):
+    """Answers bom/match and search requests after delay seconds."""
+    def get(url, params=None, headers=None, timeout=None):
+        time.sleep(delay)
+        if 'lines' in params:
+            body = {'results': [{'items': [], 'reference': l.get('reference', ''), 'status': 'ok'}
+                                for l in json.loads(params['lines'])]}
+        else:
+            body = {'results': [{'item': {'uid': params['start'] + i}} for i in range(int(params['limit']))]}
+        r = mock.Mock(status_code=200, headers={}, content=json.dumps(body).encode())
+        r.json.return_value = body
+        return r
+    return get
+
+class DeadlineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.api = Octopart(apikey='92bdca1b')
+        self.lines = [{'mpn': 'PART{}'.format(i), 'reference': 'R{}'.format(i)} for i in range(100)]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_nested_deadlines_only_shorten(self):
+        assert current_deadline() is None
+        assert remaining(5.0) == 5.0
+        with deadline(1.0) as outer:
+            with deadline(10.0) as inner:
+                assert inner is outer
+            with deadline(0.5):
+                assert remaining(5.0) <= 0.5
+            assert 0.5 < remaining() <= 1.0
+        assert current_deadline() is None
+
+    def test_requests_get_the_time_left(self):
+        o = Octopart(apikey='92bdca1b', timeout=30.0)
+        with mock.patch('pyoctopart.octopart.requests.Session.get', side_effect=slow_response(0)) as get:
+            o.bom_match([{'mpn': 'SN74LS240'}])
+            assert get.call_args[1]['timeout'] == 30.0
+            with deadline(2.0):
+                o.bom_match([{'mpn': 'SN74LS240'}])
+            assert get.call_args[1]['timeout'] <= 2.0
+            with deadline(0.0):
+                self.assertRaises(OctopartDeadlineExceededError, o.bom_match, [{'mpn': 'SN74LS240'}])
+        assert get.call_count == 2
+
+    def test_timeout_past_the_deadline(self):
+        def get(url, params=None, headers=None, timeout=None):
+            time.sleep(timeout)
+            raise requests.Timeout()
+        with mock.patch('pyoctopart.octopart.requests.Session.get', side_effect=get):
+            with deadline(0.05):
+                self.assertRaises(OctopartDeadlineExceededError, self.api.bom_match, [{'mpn': 'SN74LS240'}])
+            self.api.timeout = 0.01
+            self.assertRaises(requests.Timeout, self.api.bom_match, [{'mpn': 'SN74LS240'}])
+
+    def test_deadlines_are_no_breaker_failures(self):
+        o = Octopart(apikey='92bdca1b', breaker=OctopartCircuitBreaker(failure_threshold=2))
+        with mock.patch('pyoctopart.octopart.requests.Session.get', side_effect=slow_response(0)) as get:
+            for i in range(3):
+                with deadline(0.0):
+                    self.assertRaises(OctopartDeadlineExceededError, o.bom_match, [{'mpn': 'SN74LS240'}])
+            assert o.breaker.state('bom/match') == CLOSED
+            o.bom_match([{'mpn': 'SN74LS240'}])
+        assert get.call_count == 1
+
+    def test_probe_released_on_scheduler_deadline(self):
+        breaker = OctopartCircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+        o = Octopart(apikey='92bdca1b', breaker=breaker, scheduler=OctopartScheduler(rate=0.5))
+        breaker.failure('bom/match')
+        with mock.patch('pyoctopart.octopart.requests.Session.get', side_effect=slow_response(0)) as get:
+            # The first request takes the burst, the probe then waits past its deadline
+            o.bom_match([{'mpn': 'SN74LS240'}])
+            breaker.failure('bom/match')
+            with deadline(0.05):
+                self.assertRaises(OctopartDeadlineExceededError, o.bom_match, [{'mpn': 'SN74LS240'}])
+            o.scheduler.rate = None
+            o.bom_match([{'mpn': 'SN74LS240'}])
+        assert breaker.state('bom/match') == CLOSED
+        assert get.call_count == 2
+
+    def test_no_request_without_time_left(self):
+        o = Octopart(apikey='92bdca1b')
+        with mock.patch('pyoctopart.octopart.requests.Session.get', side_effect=slow_response(0)) as get, \
+                mock.patch('pyoctopart.octopart.remaining', return_value=0.0):
+            with deadline(10.0):
+                self.assertRaises(OctopartDeadlineExceededError, o.bom_match, [{'mpn': 'SN74LS240'}])
+        assert get.call_count == 0
+
+    def test_no_retry_past_the_deadline(self):
+        fun = mock.Mock(side_effect=Octopart503Error([], [], []))
+        with deadline(0.5):
+            self.assertRaises(Octopart503Error, call_with_retry, fun, retries=3, backoff=1.0)
+        assert fun.call_count == 1
+
+    def test_job_returns_partial_results(self):
+        job = OctopartJob(self.api, 'bom_match', self.lines, os.path.join(self.tmpdir, 'bom.journal'),
+                          workers=1, retries=0)
+        with mock.patch('pyoctopart.octopart.requests.Session.get', side_effect=slow_response(0.05)) as get:
+            results = job.run(timeout=0.12)
+        assert job.expired
+        assert len(results) == 100
+        assert not results.complete
+        assert 0 < len(results.missing) < 5
+        assert results.missing == job.failed
+        assert get.call_count < 5
+        done = [i for i in range(5) if i not in results.missing]
+        assert [r['reference'] for r in results[:20 * len(done)]] == ['R{}'.format(i) for i in range(20 * len(done))]
+        assert results[-1] is None
+
+    def test_pipeline_stops_reading(self):
+        pipeline = OctopartBomPipeline(self.api, chunk_size=10, workers=1, max_pending=1)
+        read = []
+        def lines():
+            for line in self.lines:
+                read.append(line)
+                yield line
+        with mock.patch('pyoctopart.octopart.requests.Session.get', side_effect=slow_response(0.05)):
+            pairs = list(pipeline.run(lines(), timeout=0.12))
+        assert pipeline.expired
+        assert pipeline.missing
+        assert len(read) < 100
+        assert len(pairs) == len(read)
+        assert sum(1 for line, result in pairs if result is None) == 10 * len(pipeline.missing)
+
+    def test_search_pages(self):
+        with mock.patch('pyoctopart.octopart.requests.Session.get', side_effect=slow_response(0.05)):
+            results = self.api.parts_search_pages('resistor', max_results=250, page_size=100)
+            assert results.complete
+            assert [r['item']['uid'] for r in results] == list(range(250))
+            results = self.api.parts_search_pages('resistor', max_results=500, page_size=100, timeout=0.12)
+        assert results.missing
+        assert results.missing == [start for start in range(0, 500, 100)][-len(results.missing):]
+        assert len(results) == 500 - 100 * len(results.missing)
@@ -0,0 +1,88 @@
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+import time
+import threading
+import unittest
+
+from unittest import mock
+
+from pyoctopart.octopart import Octopart
+from pyoctopart.hedging import *
+
+
+class HedgerTest(unittest.TestCase):
+
+    def test_delay_is_a_percentile(self):
+        hedger = OctopartHedger(percentile=90, min_delay=0.01, min_samples=10, initial_delay=2.0)
+        assert hedger.delay('parts/match') == 2.0
+        for i in range(100):
+            hedger._record('parts/match', (i + 1) / 1000)
+        assert hedger.delay('parts/match') == 0.091
+        assert hedger.delay('parts/{uid}') == 2.0
+
+    def test_first_answer_wins(self):
+        hedger = OctopartHedger(initial_delay=0.05, max_rate=1.0)
+        calls = []
+        def fun():
+            calls.append(threading.get_ident())
+            if len(calls) == 1:
+                time.sleep(1.0)
+                return 'slow'
+            return 'fast'
+        start = time.monotonic()
+        assert hedger.call('parts/match', fun) == 'fast'
+        assert time.monotonic() - start < 0.5
+        assert len(calls) == 2
+        assert hedger.stats == {'requests': 1, 'hedges': 1, 'hedge_wins': 1}
+
+    def test_failed_hedge_waits_for_the_primary(self):
+        hedger = OctopartHedger(initial_delay=0.01, max_rate=1.0)
+        calls = []
+        def fun():
+            calls.append(1)
+            if len(calls) == 1:
+                time.sleep(0.1)
+                return 'primary'
+            raise IOError('reset')
+        assert hedger.call('parts/match', fun) == 'primary'
+
+    def test_hedge_rate_is_capped(self):
+        hedger = OctopartHedger(initial_delay=0.001, min_delay=0.001, max_rate=0.25, min_samples=1000)
+        def fun():
+            time.sleep(0.01)
+            return 'ok'
+        for i in range(20):
+            hedger.call('parts/match', fun)
+        assert hedger.stats['hedges'] == 5
+        assert hedger.hedge_rate() == 0.25
+
+    def test_other_methods_are_not_hedged(self):
+        hedger = OctopartHedger(initial_delay=0.001, max_rate=1.0)
+        fun = mock.Mock(return_value='ok')
+        assert hedger.call('bom/match', fun) == 'ok'
+        assert hedger.stats['requests'] == 0
+
+    def test_client(self):
+        hedger = OctopartHedger(initial_delay=0.001, max_rate=1.0)
+        o = Octopart(apikey='92bdca1b', hedger=hedger)
+        response = mock.Mock(status_code=200, headers={}, content=b'{"results": []}')
+        response.json.return_value = {'results': []}
+        with mock.patch('pyoctopart.octopart.requests.Session.get', return_value=response):
+            json_obj, results = o.parts_match([{'mpn': 'SN74LS240'}])
+        assert results == []
+        assert hedger.stats['requests'] == 1
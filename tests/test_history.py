@@ -0,0 +1,103 @@
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+import os
+import shutil
+import datetime
+import tempfile
+import unittest
+
+from pyoctopart.octopart import OctopartPart
+from pyoctopart.history import *
+
+digikey = {'__class__': 'Brand', 'id': 459, 'displayname': 'Digi-Key', 'homepage_url': 'http://www.digikey.com'}
+
+def part(avail, price, update_ts):
+    return {'__class__': 'Part', 'uid': 1, 'mpn': 'PART1', 'manufacturer': digikey,
+            'detail_url': 'http://octopart.com/1',
+            'offers': [{'supplier': digikey, 'sku': 'DK1', 'avail': avail, 'update_ts': update_ts,
+                        'prices': [[1, price, 'USD'], [100, price / 2, 'USD']]}]}
+
+class HistoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.history = OctopartHistory()
+        # A price cut at 300, the stock running out at 600
+        for ts in range(0, 1000, 10):
+            self.history.append(('u', 1, 'sku'), ts, 0 if ts >= 600 else 100, [[1, 0.5 if ts >= 300 else 1.0]])
+        self.series = self.history.series('u', 1, 'sku')
+
+    def test_run_length(self):
+        assert len(self.series) == 3
+        assert list(self.series.times) == [0, 300, 600]
+        assert self.history.stats() == {'series': 1, 'runs': 3, 'polls': 100}
+        assert len(self.series.price_lists) == 2
+        assert self.history.append(('u', 1, 'sku'), 1000, 0, [[1, 0.5]]) is False
+        with self.assertRaises(ValueError):
+            self.history.append(('u', 1, 'sku'), 500, 0, [[1, 0.5]])
+
+    def test_range(self):
+        assert self.series.at(450) == (300, 100, (('USD', 1, 0.5),))
+        assert self.series.at(-1) is None
+        assert [run[0] for run in self.series.range(450, 700)] == [300, 600]
+        assert [run[0] for run in self.series.range(None, 299)] == [0]
+        assert [run[0] for run in self.series.range(601)] == [600]
+
+    def test_downsample(self):
+        assert self.series.downsample(0, 1000, 250) == [(0, 100), (250, 100), (500, 0), (750, 0)]
+        assert self.series.downsample(0, 1000, 500, field='price', how='max') == [(0, 1.0), (500, 0.5)]
+        assert self.series.downsample(0, 1000, 500, field='price', how='min') == [(0, 0.5), (500, 0.5)]
+        assert self.series.downsample(0, 1000, 500, how='mean') == [(0, 100.0), (500, 20.0)]
+        assert self.series.downsample(-100, 0, 100) == [(-100, None)]
+
+    def test_record(self):
+        history = OctopartHistory()
+        assert history.record(part(10, 1.0, '2017-01-01T00:00:00Z')) == 1
+        assert history.record(part(10, 1.0, '2017-01-01T01:00:00Z')) == 0
+        assert history.record(OctopartPart.new_from_dict(part(5, 1.0, '2017-01-02T00:00:00Z'))) == 1
+        # Older data is ignored
+        assert history.record(part(7, 1.0, '2016-12-31T00:00:00Z')) == 0
+        assert history.keys() == [(1, 459, 'DK1')]
+        series = history.series(1, 459, 'DK1')
+        day = int((datetime.datetime(2017, 1, 1) - datetime.datetime(1970, 1, 1)).total_seconds())
+        assert [(ts - day, avail) for ts, avail, breaks in series.range()] == [(0, 10), (86400, 5)]
+        assert unit_price(series.at(day)[2], 150) == 0.5
+
+    def test_price_breaks(self):
+        assert price_breaks({'USD': [[10, '0.8'], [1, '1.0']], 'EUR': [[1, '0.9']]}) == \
+            (('EUR', 1, 0.9), ('USD', 1, 1.0), ('USD', 10, 0.8))
+        assert price_breaks([[1, 1.0, 'USD']]) == (('USD', 1, 1.0),)
+        assert unit_price((('USD', 1, 1.0), ('USD', 10, 0.8)), 5) == 1.0
+        assert unit_price((('USD', 1, 1.0),), currency='EUR') is None
+
+    def test_save_load(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'history')
+            self.history.append((2, None, 'X'), 5, None, [])
+            self.history.save(path)
+            history = OctopartHistory.load(path)
+            assert history.stats() == self.history.stats()
+            series = history.series('u', 1, 'sku')
+            assert series.range() == self.series.range()
+            assert series.last_seen == 990
+            assert history.series(2, None, 'X').at(5) == (5, None, ())
+        finally:
+            shutil.rmtree(tmpdir)
+
+if __name__ == '__main__':
+    unittest.main()
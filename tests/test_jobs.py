@@ -0,0 +1,108 @@
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from unittest import mock
+
+from pyoctopart.octopart import Octopart
+from pyoctopart.exceptions import Octopart503Error
+from pyoctopart.breaker import OctopartCircuitBreaker
+from pyoctopart.jobs import *
+
+
+class ResumableJobTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'bom.journal')
+        self.api = Octopart(apikey='92bdca1b')
+        self.lines = [{'mpn': 'PART{}'.format(i), 'reference': 'R{}'.format(i)} for i in range(50)]
+        self.issued = []
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def fake_fetch(self, fail=()):
+        def fetch(method, req_url, payload, args):
+            lines = json.loads(payload['lines'])
+            self.issued.append(lines[0]['reference'])
+            if lines[0]['reference'] in fail:
+                raise Octopart503Error(args, [], [])
+            return {'results': [{'items': [], 'reference': l['reference'], 'status': 'ok'} for l in lines]}
+        return fetch
+
+    def test_only_failed_chunks_are_retried(self):
+        job = OctopartJob(self.api, 'bom_match', self.lines, self.path, retries=1, backoff=0)
+        with mock.patch.object(Octopart, '_fetch', side_effect=self.fake_fetch(fail=('R20',))):
+            results = job.run()
+        assert job.failed == [1]
+        assert self.issued.count('R20') == 2
+        assert results[20:40] == [None] * 20
+        assert results[0]['reference'] == 'R0'
+
+        self.issued = []
+        with mock.patch.object(Octopart, '_fetch', side_effect=self.fake_fetch()):
+            results = job.run()
+        assert job.failed == []
+        assert self.issued == ['R20']
+        assert [r['reference'] for r in results] == ['R{}'.format(i) for i in range(50)]
+
+    def test_open_circuit_fails_chunks(self):
+        def unavailable(url, params=None, headers=None, timeout=None):
+            return mock.Mock(status_code=503, headers={}, content=b'')
+        api = Octopart(apikey='92bdca1b', breaker=OctopartCircuitBreaker(failure_threshold=1, reset_timeout=60))
+        job = OctopartJob(api, 'bom_match', self.lines, self.path, workers=1, retries=0)
+        with mock.patch('pyoctopart.octopart.requests.Session.get', side_effect=unavailable) as get:
+            results = job.run()
+        assert get.call_count == 1
+        assert job.failed == [0, 1, 2]
+        assert results.missing == [0, 1, 2]
+        assert results == [None] * 50
+
+    def test_resume_after_restart(self):
+        job = OctopartJob(self.api, 'bom_match', self.lines, self.path, retries=0)
+        with mock.patch.object(Octopart, '_fetch', side_effect=self.fake_fetch(fail=('R40',))):
+            job.run()
+        job.journal.close()
+        # simulate a crash in the middle of writing a record
+        with open(self.path, 'ab') as f:
+            f.write(b'{"chunk": 2, "dig')
+
+        self.issued = []
+        job = OctopartJob(self.api, 'bom_match', self.lines, self.path)
+        with mock.patch.object(Octopart, '_fetch', side_effect=self.fake_fetch()):
+            results = job.run()
+        assert self.issued == ['R40']
+        assert [r['reference'] for r in results] == ['R{}'.format(i) for i in range(50)]
+
+    def test_changed_input_is_not_reused(self):
+        job = OctopartJob(self.api, 'bom_match', self.lines, self.path)
+        with mock.patch.object(Octopart, '_fetch', side_effect=self.fake_fetch()):
+            job.run()
+        self.lines[0]['mpn'] = 'OTHER'
+        self.issued = []
+        job = OctopartJob(self.api, 'bom_match', self.lines, job.journal)
+        with mock.patch.object(Octopart, '_fetch', side_effect=self.fake_fetch()):
+            job.run()
+        assert self.issued == ['R0']
+
+if __name__ == '__main__':
+    unittest.main()
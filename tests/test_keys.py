@@ -0,0 +1,92 @@
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+import os
+import time
+import shutil
+import tempfile
+import unittest
+import multiprocessing
+
+from unittest import mock
+
+from pyoctopart.octopart import Octopart
+from pyoctopart.keys import *
+from pyoctopart.exceptions import OctopartRateLimitError
+
+
+def take_all(path, count, queue):
+    pool = OctopartKeyPool(['key1', 'key2'], rate=0.001, burst=5, store=OctopartRateStore(path))
+    queue.put(sum(1 for i in range(count) if pool.try_acquire() is not None))
+
+class KeyPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'rate.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_state_file_is_private(self):
+        assert str(os.getuid()) in os.path.basename(default_path)
+        store = OctopartRateStore(self.path)
+        store.take({'k': (1.0, 1.0)})
+        assert os.stat(self.path).st_mode & 0o777 == 0o600
+        link = os.path.join(self.dir, 'link.json')
+        os.symlink(self.path, link)
+        self.assertRaises(OSError, OctopartRateStore(link).take, {'k': (1.0, 1.0)})
+
+    def test_rotates_on_remaining_budget(self):
+        pool = OctopartKeyPool({'key1': (0.001, 4), 'key2': (0.001, 2)}, store=OctopartRateStore(self.path))
+        keys = [pool.try_acquire() for i in range(7)]
+        assert keys.count('key1') == 4
+        assert keys.count('key2') == 2
+        assert keys[6] is None
+        assert pool.stats == {'key1': 4, 'key2': 2}
+        # keys are not written in the clear
+        with open(self.path) as f:
+            assert 'key1' not in f.read()
+
+    def test_acquire_waits_for_budget(self):
+        pool = OctopartKeyPool(['key1'], rate=20.0, burst=1, store=OctopartRateStore(self.path), max_wait=1.0)
+        start = time.monotonic()
+        for i in range(3):
+            assert pool.acquire() == 'key1'
+        assert time.monotonic() - start >= 0.09
+        pool.max_wait = 0.0
+        self.assertRaises(OctopartRateLimitError, pool.acquire)
+
+    def test_budget_is_shared_between_processes(self):
+        queue = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=take_all, args=(self.path, 10, queue)) for i in range(4)]
+        for p in processes:
+            p.start()
+        taken = sum(queue.get(timeout=10) for p in processes)
+        for p in processes:
+            p.join()
+        assert taken == 10
+
+    def test_client(self):
+        pool = OctopartKeyPool(['key1', 'key2'], rate=0.001, burst=1, store=OctopartRateStore(self.path))
+        o = Octopart(key_pool=pool)
+        response = mock.Mock(status_code=200, headers={}, content=b'{"results": []}')
+        response.json.return_value = {'results': []}
+        with mock.patch('pyoctopart.octopart.requests.Session.get', return_value=response) as get:
+            o.parts_match([{'mpn': 'SN74LS240'}])
+            o.parts_match([{'mpn': 'SN74S74'}])
+        assert sorted(c[1]['params']['apikey'] for c in get.call_args_list) == ['key1', 'key2']
@@ -0,0 +1,73 @@
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+import unittest
+
+from unittest import mock
+
+from pyoctopart.octopart import *
+from pyoctopart.parallel import *
+
+digikey = {'__class__': 'Brand', 'id': 459, 'displayname': 'Digi-Key', 'homepage_url': 'http://www.digikey.com'}
+ti = {'__class__': 'Brand', 'id': 370, 'displayname': 'Texas Instruments', 'homepage_url': 'http://www.ti.com'}
+
+def part_dict(uid):
+    return {'__class__': 'Part', 'uid': uid, 'mpn': 'PART{}'.format(uid), 'manufacturer': ti,
+            'detail_url': 'http://octopart.com/{}'.format(uid), 'avg_price': [0.5, 'USD', 10],
+            'offers': [{'supplier': digikey, 'sku': 'DK{}'.format(uid), 'avail': 10,
+                        'prices': [[1, 0.5, 'USD']], 'is_authorized': True,
+                        'update_ts': '2012-04-02T18:20:02Z'}],
+            'specs': []}
+
+def bom_response(line_sizes):
+    uid = iter(range(sum(line_sizes)))
+    return {'results': [{'items': [part_dict(next(uid)) for i in range(size)],
+                         'reference': 'R{}'.format(n), 'status': 'ok'}
+                        for n, size in enumerate(line_sizes)]}
+
+class ModelPoolTest(unittest.TestCase):
+
+    def test_slices(self):
+        item_lists = [[1] * n for n in (3, 0, 5, 1, 1, 2)]
+        parts = slices(item_lists, 3)
+        assert len(parts) <= 3
+        assert [items for part in parts for items in part] == item_lists
+
+    def test_pool_matches_serial(self):
+        results = bom_response([3, 0, 7, 1, 4, 2, 5])['results']
+        with OctopartModelPool(workers=2, threshold=0) as pool:
+            built = pool.build_bom_results(results)
+        assert built == build_bom_results(results)
+        assert [r['reference'] for r in built] == ['R{}'.format(n) for n in range(7)]
+        assert [p.uid for r in built for p in r['items']] == list(range(22))
+
+    def test_small_responses_stay_serial(self):
+        executor = mock.Mock()
+        pool = OctopartModelPool(workers=4, threshold=100, executor=executor)
+        results = bom_response([2, 3])['results']
+        assert pool.build_bom_results(results) == build_bom_results(results)
+        assert not executor.map.called
+
+    def test_bom_match(self):
+        response = bom_response([4, 4, 4])
+        with OctopartModelPool(workers=2, threshold=0) as pool:
+            o = Octopart(apikey='92bdca1b', model_pool=pool)
+            with mock.patch.object(Octopart, '_fetch', return_value=response):
+                json_obj, results = o.bom_match([{'mpn': 'PART{}'.format(i)} for i in range(3)])
+        assert json_obj is response
+        assert [len(r['items']) for r in results] == [4, 4, 4]
+        assert results[2]['items'][3] == OctopartPart.new_from_dict(part_dict(11))
@@ -0,0 +1,73 @@
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import unittest
+
+from pyoctopart.octopart import OctopartPart
+from pyoctopart.parametric import *
+
+
+def attribute(fieldname, kind='number', symbol=None):
+    metadata = {'datatype': 'decimal', 'unit': {'name': fieldname, 'symbol': symbol}} if kind == 'number' else {}
+    return {'__class__': 'PartAttribute', 'fieldname': fieldname, 'displayname': fieldname,
+            'type': kind, 'metadata': metadata}
+
+def capacitor(uid, capacitance, voltage, case):
+    return {'__class__': 'Part', 'uid': uid, 'mpn': 'C{}'.format(uid), 'manufacturer': None, 'detail_url': '',
+            'specs': [
+                {'attribute': attribute('capacitance', symbol='F'), 'values': [capacitance]},
+                {'attribute': attribute('voltage_rating_dc', symbol='V'), 'values': [voltage]},
+                {'attribute': attribute('case_package', 'text'), 'values': [case]},
+            ]}
+
+class ParametricIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = OctopartParametricIndex()
+        self.index.update([
+            capacitor(1, 10e-6, 16, '0805'),
+            capacitor(2, '10uF', '25V', '0805'),
+            capacitor(3, '22 µF', 50, '1206'),
+            OctopartPart.new_from_dict(capacitor(4, 4.7e-6, 50, '0805')),
+            capacitor(5, '100nF', 50, '0402'),
+        ])
+
+    def test_parse_value(self):
+        assert parse_value('10uF', 'F') == 10 * 1e-6
+        assert parse_value('4.7k') == 4700.0
+        assert parse_value('25V', 'V') == 25.0
+        assert parse_value('n/a') is None
+
+    def test_range_queries(self):
+        assert self.index.range('capacitance', '10uF', '22uF') == {1, 2, 3}
+        assert self.index.range('voltage_rating_dc', 25) == {2, 3, 4, 5}
+        assert self.index.equals('case_package', '0805') == {1, 2, 4}
+        assert self.index.query(capacitance=('10uF', '22uF'), voltage_rating_dc=('25V', None)) == {2, 3}
+        assert self.index.query(capacitance=(None, 5e-6), case_package='0805') == {4}
+        assert self.index.query(resistance=(0, None)) == set()
+
+    def test_refresh(self):
+        self.index.add(capacitor(2, '47uF', 6.3, '1210'))
+        assert self.index.range('capacitance', '10uF', '22uF') == {1, 3}
+        assert self.index.range('capacitance', '47uF', '47uF') == {2}
+        assert 2 not in self.index.equals('case_package', '0805')
+        for i in range(3000):
+            self.index.add(capacitor(2, i * 1e-9, 6.3, '1210'))
+        assert len(self.index) == 5
+        assert self.index.range('capacitance', 0, '3uF') == {2, 5}
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+import json
+import unittest
+
+from unittest import mock
+
+from pyoctopart.octopart import *
+from pyoctopart.cache import OctopartMemoryCache
+from pyoctopart.attributes import OctopartAttributeRegistry
+from pyoctopart.prefetch import *
+
+ti = {'__class__': 'Brand', 'id': 370, 'displayname': 'Texas Instruments', 'homepage_url': 'http://www.ti.com'}
+capacitance = {'__class__': 'PartAttribute', 'fieldname': 'capacitance', 'displayname': 'Capacitance',
+               'type': 'number', 'metadata': {}}
+
+def part(uid):
+    return {'__class__': 'Part', 'uid': uid, 'mpn': 'PART{}'.format(uid), 'manufacturer': ti,
+            'detail_url': 'http://octopart.com/{}'.format(uid), 'category_ids': [4174],
+            'specs': [{'attribute': capacitance, 'values': [1e-06]}]}
+
+bom_response = {'results': [{'items': [part(1), part(2)], 'reference': 'C1', 'status': 'ok'},
+                            {'items': [part(2)], 'reference': 'C2', 'status': 'ok'}]}
+
+def api_get(url, params=None, headers=None, timeout=None):
+    if 'partattributes' in url:
+        body = [dict(capacitance, fieldname=f) for f in json.loads(params['fieldnames'])]
+    elif 'categories' in url:
+        body = {'id': params['id'], 'parent_id': None, 'nodename': 'Capacitors', 'images': [],
+                'children_ids': [], 'ancestor_ids': [], 'num_parts': 2}
+    else:
+        body = {'results': [part(int(url.rsplit('/', 1)[1]))]}
+    r = mock.Mock(status_code=200, headers={}, content=json.dumps(body).encode())
+    r.json.return_value = body
+    return r
+
+class PrefetcherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.api = Octopart(apikey='92bdca1b', cache=OctopartMemoryCache(ttl=60))
+        self.registry = OctopartAttributeRegistry(OctopartPartAttribute)
+
+    def test_needs_a_cache(self):
+        self.assertRaises(ValueError, OctopartPrefetcher, Octopart(apikey='92bdca1b'))
+
+    def test_plan(self):
+        prefetcher = OctopartPrefetcher(self.api, registry=self.registry)
+        assert prefetcher.plan(bom_response) == {'parts': [1, 2], 'attributes': ['capacitance'],
+                                                 'categories': [4174]}
+        results = build_bom_results(bom_response['results'])
+        assert prefetcher.plan(results)['parts'] == [1, 2]
+
+    def test_budget(self):
+        prefetcher = OctopartPrefetcher(self.api, max_requests=2, registry=self.registry)
+        assert prefetcher.plan(bom_response) == {'parts': [1, 2], 'attributes': [], 'categories': []}
+        assert prefetcher.report()['skipped'] == 2
+
+    def test_prefetch_and_report(self):
+        prefetcher = OctopartPrefetcher(self.api, registry=self.registry)
+        with mock.patch('pyoctopart.octopart.requests.Session.get', side_effect=api_get) as get:
+            assert prefetcher.prefetch(bom_response) == 4
+            assert get.call_count == 4
+            assert 'capacitance' in self.registry
+            # the follow-up calls are served from the cache
+            json_obj, results = self.api.parts_get(1)
+            json_obj, results = self.api.parts_get(1)
+            assert self.api.categories_get(4174) is not None
+            assert get.call_count == 4
+        report = prefetcher.report()
+        assert report['requests'] == 4
+        assert report['prefetched'] == 3
+        assert report['used'] == 2
+        assert report['hit_rate'] == 2 / 3
+        prefetcher.close()
+        assert self.api.cache.watchers == []
+
+    def test_stale_entries_are_not_used(self):
+        api = Octopart(apikey='92bdca1b', cache=OctopartMemoryCache(ttl=0))
+        with self.assertWarns(UserWarning):
+            prefetcher = OctopartPrefetcher(api, registry=self.registry)
+        with mock.patch('pyoctopart.octopart.requests.Session.get', side_effect=api_get) as get:
+            prefetcher.prefetch(bom_response)
+            api.parts_get(1)
+            assert get.call_count == 5
+        assert prefetcher.report()['used'] == 0
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+import time
+import threading
+import unittest
+
+from unittest import mock
+
+from concurrent.futures import ThreadPoolExecutor
+
+from pyoctopart.octopart import Octopart
+from pyoctopart.deadline import submit
+from pyoctopart.scheduler import *
+
+
+class SchedulerTest(unittest.TestCase):
+
+    def test_classify(self):
+        scheduler = OctopartScheduler()
+        assert scheduler.classify('parts/suggest') == 'interactive'
+        assert scheduler.classify('bom/match') == 'batch'
+        with scheduler.priority('interactive'):
+            assert scheduler.classify('bom/match') == 'interactive'
+        assert scheduler.classify('bom/match') == 'batch'
+        self.assertRaises(ValueError, scheduler.priority('urgent').__enter__)
+
+    def test_priority_carried_to_workers(self):
+        scheduler = OctopartScheduler()
+        other = OctopartScheduler()
+        with ThreadPoolExecutor(2) as executor:
+            with scheduler.priority('interactive'):
+                future = submit(executor, scheduler.classify, 'bom/match')
+                assert other.classify('bom/match') == 'batch'
+            assert future.result() == 'interactive'
+            assert submit(executor, scheduler.classify, 'bom/match').result() == 'batch'
+
+    def test_interactive_requests_overtake_batch_ones(self):
+        scheduler = OctopartScheduler(rate=40.0, burst=1)
+        with scheduler.slot('bom/match'):
+            pass
+        order = []
+        def request(method):
+            with scheduler.slot(method):
+                order.append(method)
+        threads = [threading.Thread(target=request, args=('bom/match',)) for i in range(8)]
+        for t in threads:
+            t.start()
+        time.sleep(0.01)
+        interactive = [threading.Thread(target=request, args=('parts/suggest',)) for i in range(4)]
+        for t in interactive:
+            t.start()
+        for t in threads + interactive:
+            t.join()
+        positions = [i for i, method in enumerate(order) if method == 'parts/suggest']
+        assert len(order) == 12
+        assert max(positions) < 6
+        stats = scheduler.stats()
+        assert stats['batch']['requests'] == 9
+        assert stats['interactive']['requests'] == 4
+        assert stats['batch']['queue_time_max'] > stats['interactive']['queue_time_max']
+
+    def test_rate_budget(self):
+        scheduler = OctopartScheduler(rate=50.0, burst=1)
+        start = time.monotonic()
+        for i in range(6):
+            with scheduler.slot('bom/match'):
+                pass
+        assert time.monotonic() - start >= 0.09
+
+    def test_concurrency_limit(self):
+        scheduler = OctopartScheduler(classes={'interactive': (8, 8), 'batch': (1, 2)})
+        running, peak, lock = [0], [0], threading.Lock()
+        def request():
+            with scheduler.slot('bom/match'):
+                with lock:
+                    running[0] += 1
+                    peak[0] = max(peak[0], running[0])
+                time.sleep(0.02)
+                with lock:
+                    running[0] -= 1
+        threads = [threading.Thread(target=request) for i in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert peak[0] == 2
+
+    def test_client(self):
+        scheduler = OctopartScheduler()
+        o = Octopart(apikey='92bdca1b', scheduler=scheduler)
+        response = mock.Mock(status_code=200, headers={}, content=b'{"results": []}')
+        response.json.return_value = {'results': []}
+        with mock.patch('pyoctopart.octopart.requests.Session.get', return_value=response):
+            o.bom_match([{'mpn': 'SN74LS240'}])
+        stats = scheduler.stats()
+        assert stats['batch']['requests'] == 1
+        assert stats['batch']['running'] == 0
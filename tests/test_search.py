@@ -0,0 +1,100 @@
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+import unittest
+
+from unittest import mock
+
+from pyoctopart.octopart import Octopart
+from pyoctopart.exceptions import *
+from pyoctopart.search import *
+
+response = {
+    'hits': 2393,
+    'results': [],
+    'facet_results': {
+        'fields': {
+            'brand.name': {'facets': [{'value': 'Murata', 'count': 1520}, {'value': 'TDK', 'count': 873}],
+                           'missing': 0, 'spec_drilldown_rank': 10000},
+            'specs.case_package.value': {'facets': [{'value': '0603', 'count': 1012}], 'missing': 3,
+                                         'spec_drilldown_rank': 2},
+        },
+        'queries': {'avg_avail:[1 TO *]': 2011},
+    },
+    'stats_results': {
+        'specs.capacitance.value': {'min': 1e-06, 'max': 1e-05, 'mean': 4.2e-06, 'stddev': 2.1e-06,
+                                    'count': 2390, 'missing': 3, 'spec_drilldown_rank': 1},
+    },
+}
+
+class SearchQueryTest(unittest.TestCase):
+
+    def test_params(self):
+        query = (OctopartSearchQuery()
+                 .filter('brand.name', 'Murata', 'TDK')
+                 .filter_range('specs.capacitance.value', 1e-06, None)
+                 .filter_query('avg_avail:[1 TO *]')
+                 .facet('brand.name', limit=20, exclude_filter=True)
+                 .facet_query('avg_avail:[1000 TO *]')
+                 .stats('specs.capacitance.value')
+                 .spec_drilldown(limit=5))
+        assert query.params() == {
+            'filter[fields][brand.name][]': ['Murata', 'TDK'],
+            'filter[fields][specs.capacitance.value][]': ['[1e-06 TO *]'],
+            'filter[queries][]': ['avg_avail:[1 TO *]'],
+            'facet[fields][brand.name][include]': 'true',
+            'facet[fields][brand.name][start]': 0,
+            'facet[fields][brand.name][limit]': 20,
+            'facet[fields][brand.name][exclude_filter]': 'true',
+            'facet[queries][]': ['avg_avail:[1000 TO *]'],
+            'stats[specs.capacitance.value][include]': 'true',
+            'spec_drilldown[include]': 'true',
+            'spec_drilldown[limit]': 5,
+        }
+
+    def test_checks(self):
+        query = OctopartSearchQuery()
+        self.assertRaises(OctopartTypeArgumentError, query.filter, 'brand.name', ['Murata'])
+        self.assertRaises(OctopartTypeArgumentError, query.filter, '', 'Murata')
+        self.assertRaises(OctopartTypeArgumentError, query.filter_range, 'specs.capacitance.value', True)
+        self.assertRaises(OctopartRangeArgumentError, query.facet, 'brand.name', limit=500)
+        self.assertRaises(OctopartTypeArgumentError, Octopart().parts_search, 'capacitor', query={'brand.name': 'TDK'})
+
+    def test_parts_search(self):
+        query = OctopartSearchQuery().filter('brand.name', 'TDK').facet('brand.name')
+        o = Octopart(apikey='92bdca1b')
+        with mock.patch.object(Octopart, '_fetch', return_value=response) as fetch:
+            json_obj, results = o.parts_search('capacitor', limit=0, sortby='avg_price asc', query=query)
+            o.parts_search('capacitor')
+        payload = fetch.call_args_list[0][0][2]
+        assert payload['q'] == 'capacitor'
+        assert payload['limit'] == 0
+        assert payload['sortby'] == 'avg_price asc'
+        assert payload['filter[fields][brand.name][]'] == ['TDK']
+        assert payload['facet[fields][brand.name][include]'] == 'true'
+        assert 'sortby' not in fetch.call_args_list[1][0][2]
+
+    def test_parse(self):
+        assert parse_facets(response) == {'brand.name': [('Murata', 1520), ('TDK', 873)],
+                                          'specs.case_package.value': [('0603', 1012)]}
+        assert parse_facet_queries(response) == {'avg_avail:[1 TO *]': 2011}
+        stats = parse_stats(response)['specs.capacitance.value']
+        assert stats == OctopartStats(1e-06, 1e-05, 4.2e-06, 2.1e-06, 2390, 3)
+        assert parse_spec_drilldown(response) == ['specs.capacitance.value', 'specs.case_package.value',
+                                                  'brand.name']
+        assert parse_facets({'results': []}) == {}
+        assert parse_stats(None) == {}
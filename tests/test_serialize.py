@@ -0,0 +1,74 @@
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import pickle
+import unittest
+
+from pyoctopart.octopart import *
+from pyoctopart import serialize
+
+digikey = {'__class__': 'Brand', 'id': 459, 'displayname': 'Digi-Key', 'homepage_url': 'http://www.digikey.com'}
+ti = {'__class__': 'Brand', 'id': 370, 'displayname': 'Texas Instruments', 'homepage_url': 'http://www.ti.com'}
+capacitance = {'__class__': 'PartAttribute', 'fieldname': 'capacitance', 'displayname': 'Capacitance',
+               'type': 'number', 'metadata': {'datatype': 'decimal', 'unit': {'name': 'Farad', 'symbol': 'F'}}}
+
+def part(uid):
+    return OctopartPart.new_from_dict({
+        '__class__': 'Part', 'uid': uid, 'mpn': 'PART{}'.format(uid), 'manufacturer': ti,
+        'detail_url': 'http://octopart.com/{}'.format(uid), 'avg_price': [0.5, 'USD', 10],
+        'offers': [{'supplier': digikey, 'sku': 'DK{}-{}'.format(uid, i), 'avail': i,
+                    'prices': [[1, 0.5, 'USD']], 'is_authorized': True,
+                    'update_ts': '2012-04-02T18:20:02Z'} for i in range(3)],
+        'specs': [{'attribute': capacitance, 'values': [1e-6]}],
+    })
+
+class SerializeTest(unittest.TestCase):
+
+    def test_roundtrip(self):
+        parts = [part(uid) for uid in range(10)]
+        category = OctopartCategory(4174, 4161, 'Capacitors', [], [], [4161],
+                                    [OctopartCategory(4161, None, 'Root', [], [4174], [], [], 0)], 12)
+        brand = OctopartBrand(459, 'Digi-Key', 'http://www.digikey.com')
+        objs = serialize.loads(serialize.dumps(parts + [category, brand]))
+        assert objs[:10] == parts
+        assert objs[10] == category
+        assert objs[10].ancestors[0].nodename == 'Root'
+        assert objs[11] == brand
+        # suppliers and attributes are shared
+        assert objs[0].offers[0]['supplier'] is objs[9].offers[2]['supplier']
+        assert objs[0].offers[0]['supplier'] is objs[11]
+        assert objs[0].specs[0]['attribute'] is attribute_registry.get('capacitance')
+
+    def test_pickle(self):
+        p = part(1)
+        q = pickle.loads(pickle.dumps(p))
+        assert q == p
+        assert q.offers[0]['supplier'] is q.offers[1]['supplier']
+        assert q.offers[0]['update_ts'] == p.offers[0]['update_ts']
+        attribute = pickle.loads(pickle.dumps(p.specs[0]['attribute']))
+        assert attribute is attribute_registry.get('capacitance')
+        brand = OctopartBrand(459, 'Digi-Key', 'http://www.digikey.com')
+        assert pickle.loads(pickle.dumps(brand)) == brand
+
+    def test_compact(self):
+        parts = [part(uid) for uid in range(100)]
+        # what pickling parts used to produce, before OctopartPart.__reduce__
+        plain = pickle.dumps([p.__dict__ for p in parts], protocol=pickle.HIGHEST_PROTOCOL)
+        assert len(serialize.dumps(parts)) < len(plain)
+        assert len(pickle.dumps(parts, protocol=pickle.HIGHEST_PROTOCOL)) < len(plain)
+
+if __name__ == '__main__':
+    unittest.main()
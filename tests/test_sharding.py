@@ -0,0 +1,214 @@
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+import os
+import sys
+import json
+import time
+import socket
+import unittest
+import subprocess
+import http.client
+
+from unittest import mock
+from urllib.parse import urlsplit
+
+from pyoctopart.cache import new_entry
+from pyoctopart.sharding import *
+
+def entry(i):
+    return new_entry({'results': [i]}, 10)
+
+class HashRingTest(unittest.TestCase):
+
+    def test_lookup(self):
+        ring = OctopartHashRing(['a', 'b', 'c'])
+        owners = ring.lookup('key', 2)
+        assert len(owners) == 2 and len(set(owners)) == 2
+        assert ring.lookup('key', 5) == ring.lookup('key', 3)
+        assert OctopartHashRing().lookup('key') == []
+
+    def test_balance_and_movement(self):
+        ring = OctopartHashRing(['a', 'b', 'c', 'd'])
+        keys = ['parts/match?q={}'.format(i) for i in range(4000)]
+        before = {key: ring.lookup(key)[0] for key in keys}
+        counts = [list(before.values()).count(node) for node in 'abcd']
+        assert min(counts) > 600, counts
+        ring.add('e')
+        after = {key: ring.lookup(key)[0] for key in keys}
+        moved = [key for key in keys if before[key] != after[key]]
+        # Only keys moving to the new node move, about a fifth of them
+        assert all(after[key] == 'e' for key in moved)
+        assert 400 < len(moved) < 1400, len(moved)
+        ring.remove('e')
+        assert {key: ring.lookup(key)[0] for key in keys} == before
+
+class ShardedCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.servers = [OctopartCacheServer().start() for i in range(3)]
+        self.cache = OctopartShardedCache([s.url for s in self.servers], replicas=2)
+
+    def tearDown(self):
+        self.cache.close()
+        for server in self.servers:
+            server.close()
+
+    def test_sharding(self):
+        for i in range(60):
+            self.cache.set('key{}'.format(i), entry(i))
+        assert self.cache.get('key7')['json'] == {'results': [7]}
+        assert self.cache.get('nokey') is None
+        assert (self.cache.hits, self.cache.misses) == (1, 1)
+        # Every entry is stored twice, spread over the nodes
+        counts = [len(server.cache) for server in self.servers]
+        assert sum(counts) == 120 and max(counts) < 60, counts
+        for server in self.servers:
+            for key in server.cache.keys():
+                assert server.url in [node.url for node in self.cache.owners(key)]
+        self.cache.delete('key7')
+        assert self.cache.get('key7') is None
+
+    def test_node_failure_and_read_repair(self):
+        self.cache.set('key', entry(1))
+        first, second = self.cache.owners('key')
+        server = [s for s in self.servers if s.url == first.url][0]
+        server.cache.delete('key')
+        assert self.cache.get('key')['json'] == {'results': [1]}
+        assert server.cache.get('key') is not None
+        server.close()
+        assert self.cache.get('key')['json'] == {'results': [1]}
+        assert self.cache.errors >= 1
+        self.servers.remove(server)
+
+    def test_unresponsive_node_backoff(self):
+        # A node accepting connections but never answering
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(16)
+        url = 'http://127.0.0.1:{}'.format(listener.getsockname()[1])
+        cache = OctopartShardedCache([url, self.servers[0].url], replicas=2, timeout=0.2,
+                                     failure_threshold=2, backoff=60)
+        try:
+            # A key read from the unresponsive node first
+            key = [k for k in ('key{}'.format(i) for i in range(100)) if cache.owners(k)[0].url == url][0]
+            dead = cache.owners(key)[0]
+            cache.set(key, entry(1))
+            started = time.monotonic()
+            for i in range(10):
+                assert cache.get(key)['json'] == {'results': [1]}
+            # Two timeouts, then the node is skipped
+            assert cache.errors == 2 and cache.skipped >= 9
+            assert not cache.available(dead)
+            assert time.monotonic() - started < 1.5
+            # Once the backoff is over, the node is tried again
+            with mock.patch('pyoctopart.sharding.time.monotonic', return_value=time.monotonic() + 61):
+                assert cache.available(dead)
+                cache.get(key)
+            assert cache.errors == 3
+        finally:
+            cache.close()
+            listener.close()
+
+    def test_join_and_leave(self):
+        for i in range(100):
+            self.cache.set('key{}'.format(i), entry(i))
+        server = OctopartCacheServer().start()
+        self.servers.append(server)
+        stats = self.cache.add_node(server.url)
+        assert stats['keys'] == 100 and stats['copied'] > 0 and stats['deleted'] == stats['copied']
+        assert len(server.cache) == stats['copied']
+        assert sum(self.cache.stats().values()) == 200
+        for i in range(100):
+            assert self.cache.get('key{}'.format(i))['json'] == {'results': [i]}
+        held = len(self.servers[0].cache)
+        stats = self.cache.remove_node(self.servers[0].url)
+        assert stats['deleted'] == held and len(self.servers[0].cache) == 0
+        assert self.servers[0].url not in self.cache.stats()
+        assert sum(self.cache.stats().values()) == 200
+        for i in range(100):
+            assert self.cache.get('key{}'.format(i))['json'] == {'results': [i]}
+
+    def test_cache_process(self):
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+        process = subprocess.Popen([sys.executable, '-m', 'pyoctopart.sharding', '--port', '0'],
+                                   stderr=subprocess.PIPE, env=env)
+        try:
+            url = process.stderr.readline().decode().split()[-1]
+            cache = OctopartShardedCache([url, self.servers[0].url], replicas=1)
+            for i in range(20):
+                cache.set('key{}'.format(i), entry(i))
+            assert all(cache.stats().values())
+            assert cache.get('key3')['json'] == {'results': [3]}
+            cache.close()
+        finally:
+            process.terminate()
+            process.wait()
+
+class CacheNodeSecurityTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = OctopartCacheServer(secret='s3cr3t', max_entry_size=1024).start()
+
+    def tearDown(self):
+        self.server.close()
+
+    def put(self, body, headers):
+        connection = http.client.HTTPConnection(urlsplit(self.server.url).netloc, timeout=5)
+        try:
+            connection.request('PUT', '/entries?key=key', body, headers)
+            return connection.getresponse().status
+        finally:
+            connection.close()
+
+    def test_shared_secret(self):
+        cache = OctopartShardedCache([self.server.url], replicas=1, secret='s3cr3t')
+        cache.set('key', entry(1))
+        assert cache.get('key')['json'] == {'results': [1]}
+        cache.close()
+        for secret in (None, 'wrong'):
+            cache = OctopartShardedCache([self.server.url], replicas=1, secret=secret)
+            cache.set('key', entry(2))
+            assert cache.get('key') is None
+            assert cache.errors == 2
+            cache.close()
+        assert self.server.cache.get('key')['json'] == {'results': [1]}
+        # Clients refuse answers of nodes without the secret
+        server = OctopartCacheServer().start()
+        node = OctopartCacheNode(server.url, secret='s3cr3t')
+        with self.assertRaises(OctopartCacheNodeError):
+            node.keys()
+        node.close()
+        server.close()
+
+    def test_invalid_entries(self):
+        headers = {'X-Pyoctopart-Cache-Secret': 's3cr3t', 'Content-Type': 'application/json'}
+        assert self.put(b'x' * 2048, headers) == 413
+        assert self.put(b'{"json": ', headers) == 400
+        assert self.put(b'[1, 2]', headers) == 400
+        assert self.put(b'{}', {'Content-Type': 'application/json'}) == 401
+        assert len(self.server.cache) == 0
+        assert self.put(json.dumps(entry(1)).encode(), headers) == 204
+        assert len(self.server.cache) == 1
+
+    def test_public_node_needs_secret(self):
+        with mock.patch.dict(os.environ, clear=True), mock.patch('sys.stderr'):
+            with self.assertRaises(SystemExit):
+                main(['--host', '0.0.0.0', '--port', '0'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from unittest import mock
+
+from pyoctopart.octopart import OctopartPart
+from pyoctopart.snapshot import *
+
+digikey = {'__class__': 'Brand', 'id': 459, 'displayname': 'Digi-Key', 'homepage_url': 'http://www.digikey.com'}
+
+def part(uid):
+    return {'__class__': 'Part', 'uid': uid, 'mpn': 'PART{}'.format(uid), 'manufacturer': digikey,
+            'detail_url': 'http://octopart.com/{}'.format(uid),
+            'offers': [{'supplier': digikey, 'sku': 'DK{}'.format(uid), 'avail': uid,
+                        'prices': [[1, 0.5, 'USD']], 'is_authorized': True}]}
+
+class SnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'parts.snap')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_lookup(self):
+        for compress in (False, True):
+            assert write_snapshot(self.path, (part(uid) for uid in range(1000, 0, -3)), compress) == 334
+            with OctopartSnapshot(self.path) as snapshot:
+                assert len(snapshot) == 334
+                assert snapshot.get_dict(1000) == part(1000)
+                assert 999 not in snapshot
+                p = snapshot.get(997)
+                assert isinstance(p, OctopartPart)
+                assert p.offers[0]['sku'] == 'DK997'
+                assert snapshot.get(2000) is None
+
+    def test_lazy_materialization(self):
+        write_snapshot(self.path, [part(1), part(2), part(3)])
+        with OctopartSnapshot(self.path) as snapshot:
+            with mock.patch.object(OctopartPart, 'new_from_dict', wraps=OctopartPart.new_from_dict) as new:
+                snapshot.get(2)
+            assert new.call_count == 1
+
+    def test_string_uids(self):
+        write_snapshot(self.path, [part('8e5d2b8f7a'), part('0d4cbbaf14'), part(12)])
+        with OctopartSnapshot(self.path) as snapshot:
+            assert snapshot.get_dict('0d4cbbaf14')['mpn'] == 'PART0d4cbbaf14'
+            assert snapshot.get_dict(12)['mpn'] == 'PART12'
+            assert sorted(str(p['uid']) for p in snapshot) == ['0d4cbbaf14', '12', '8e5d2b8f7a']
+
+if __name__ == '__main__':
+    unittest.main()
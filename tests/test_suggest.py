@@ -0,0 +1,57 @@
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import unittest
+
+from unittest import mock
+
+from pyoctopart.octopart import Octopart
+from pyoctopart.suggest import *
+
+
+class SuggestIndexTest(unittest.TestCase):
+
+    def test_learns_from_responses(self):
+        api = Octopart(apikey='92bdca1b')
+        index = OctopartSuggestIndex(buffer_size=2)
+        api.observers.append(index.observe)
+        response = {'results': [{'items': [{'__class__': 'Part', 'mpn': mpn}]}
+                                for mpn in ('SN74LS240N', 'SN74LS244N', 'SN74S74N', 'LM358')]}
+        with mock.patch.object(Octopart, '_get', return_value=response):
+            api.parts_match([{'mpn': 'SN74'}])
+        assert index.lookup('sn74ls') == ['SN74LS240N', 'SN74LS244N']
+        assert index.lookup('SN74', limit=2) == ['SN74LS240N', 'SN74LS244N']
+        assert index.lookup('LM') == ['LM358']
+
+    def test_falls_back_to_the_api(self):
+        api = Octopart(apikey='92bdca1b')
+        index = OctopartSuggestIndex()
+        index.update(['SN74LS240N'])
+        with mock.patch.object(Octopart, 'parts_suggest_v2', return_value=({}, ['SN74LS240N', 'SN74LS241N'])) as suggest:
+            assert index.suggest('SN74LS24', limit=1, api=api) == ['SN74LS240N']
+            assert suggest.call_count == 0
+            assert index.suggest('SN74LS24', limit=5, api=api) == ['SN74LS240N', 'SN74LS241N']
+        assert 'sn74ls241n' in index
+
+    def test_bounded(self):
+        index = OctopartSuggestIndex(max_entries=100, buffer_size=16)
+        index.update('PART{:04d}'.format(i) for i in range(1000))
+        assert len(index) <= 100
+        assert index.lookup('PART0999') == ['PART0999']
+        assert index.lookup('PART0000') == []
+
+if __name__ == '__main__':
+    unittest.main()
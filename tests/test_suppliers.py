@@ -0,0 +1,66 @@
+"""
+pyoctopart: A simple Python client library to the Octopart public REST API.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import unittest
+
+from pyoctopart.octopart import OctopartPart
+from pyoctopart.suppliers import *
+
+digikey = {'__class__': 'Brand', 'id': 459, 'displayname': 'Digi-Key', 'homepage_url': 'http://www.digikey.com'}
+mouser = {'__class__': 'Brand', 'id': 2401, 'displayname': 'Mouser', 'homepage_url': 'http://www.mouser.com'}
+
+def offer(supplier, sku, avail, prices):
+    return {'supplier': supplier, 'sku': sku, 'avail': avail, 'prices': prices, 'is_authorized': True}
+
+def part(uid, offers):
+    return {'__class__': 'Part', 'uid': uid, 'mpn': 'PART{}'.format(uid), 'manufacturer': None,
+            'detail_url': '', 'offers': offers}
+
+class SupplierIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = OctopartSupplierIndex()
+        self.index.update([
+            part(1, [offer(digikey, 'DK1', 5000, [[1, 0.50, 'USD'], [100, 0.30, 'USD']]),
+                     offer(mouser, 'MO1', 10, [[1, 0.45, 'USD']])]),
+            part(2, [offer(digikey, 'DK2', 0, [[1, 0.10, 'USD']])]),
+            OctopartPart.new_from_dict(part(3, [offer(digikey, 'DK3', 200, [[1, 0.20, 'USD']])])),
+        ])
+
+    def test_supplier_queries(self):
+        assert sorted(self.index.parts(459)) == [1, 2, 3]
+        assert self.index.parts(2401) == [1]
+        assert [(uid, o['sku']) for uid, o in self.index.offers(459, min_avail=100)] == [(1, 'DK1'), (3, 'DK3')]
+        assert self.index.cheapest(459)[1] == 2
+        assert self.index.cheapest(459, min_avail=1)[1] == 3
+        assert self.index.cheapest(459, quantity=100, min_avail=1000)[0] == 0.30
+        assert [p[1] for p in self.index.priced_offers(459, max_price=0.25)] == [2, 3]
+        assert self.index.stock(459, 1) == 5000
+
+    def test_refresh(self):
+        self.index.add(part(1, [offer(mouser, 'MO1', 20, [[1, 0.45, 'USD']])]))
+        assert sorted(self.index.parts(459)) == [2, 3]
+        assert self.index.stock(2401, 1) == 20
+        self.index.remove(1)
+        assert self.index.parts(2401) == []
+        assert 2401 not in self.index.suppliers()
+
+    def test_v3_prices(self):
+        assert offer_price({'prices': {'USD': [[1, '0.5'], [10, '0.4']]}}, 25) == 0.4
+        assert offer_price({'prices': {'EUR': [[1, '0.5']]}}, 1) is None
+
+if __name__ == '__main__':
+    unittest.main()
@@ -20,9 +20,13 @@ NOTE: Running this unit test generates 24 API requests.
 """
 
 import os
+import time
 import unittest
 import requests
 import json
+import threading
+
+from unittest import mock
 
 import logging
 log = logging.getLogger('test_pyoctopart')
@@ -37,6 +41,7 @@ from nose.tools import raises
 
 import pyoctopart.octopart
 from pyoctopart.octopart import *
+from pyoctopart.cache import *
 
 class DataEquivalenceTest(unittest.TestCase):
 
@@ -165,6 +170,166 @@ class DataEquivalenceTest(unittest.TestCase):
     def test_brand(self):
         brand = OctopartBrand(459, "Digi-Key", "http://www.digikey.com")
 
+class PreparedQueryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.api = Octopart(apikey='92bdca1b')
+
+    def test_static_payload_is_encoded_once(self):
+        match = self.api.prepare('parts_match', exact_only=True, include_specs=True, show_mpn=True)
+        assert match.payload['apikey'] == '92bdca1b'
+        assert match.payload['exact_only'] == 1
+        assert match.payload['include[]'] == ['specs']
+        assert match.payload['show[]'] == ['mpn']
+        with mock.patch.object(Octopart, '_fetch', return_value={'results': []}) as fetch:
+            match(queries=[{'mpn': 'SN74LS240'}])
+            match(queries=[{'mpn': 'SN74S74N'}])
+        urls = [c[0][1] for c in fetch.call_args_list]
+        payloads = [c[0][2] for c in fetch.call_args_list]
+        assert urls == ['http://octopart.com/api/v3/parts/match'] * 2
+        assert payloads[0]['queries'] == json.dumps([{'mpn': 'SN74LS240'}])
+        assert payloads[1]['queries'] == json.dumps([{'mpn': 'SN74S74N'}])
+        assert 'queries' not in match.payload
+
+    def test_path_variables(self):
+        get = self.api.prepare('parts_get')
+        with mock.patch.object(Octopart, '_fetch', return_value={'results': {}}) as fetch:
+            get(uid=39619421)
+        assert fetch.call_args[0][1] == 'http://octopart.com/api/v3/parts/39619421'
+        assert 'uid' not in fetch.call_args[0][2]
+
+    def test_invalid_arguments(self):
+        assert_raises(OctopartArgumentInvalidError, self.api.prepare, 'parts_frobnicate')
+        search = self.api.prepare('parts_search', limit=20)
+        assert_raises(OctopartArgumentMissingError, search)
+        assert_raises(OctopartArgumentInvalidError, search, q='resistor', sortby='mpn')
+        assert_raises(OctopartRangeArgumentError, search, q='r')
+        assert_raises(OctopartRangeArgumentError, self.api.prepare, 'parts_search', limit=200)
+
+def fake_response(status_code, json_obj=None, headers={}):
+    r = mock.Mock()
+    r.status_code = status_code
+    r.headers = headers
+    r.content = json.dumps(json_obj).encode() if json_obj is not None else b''
+    r.json.return_value = json_obj
+    return r
+
+class RevalidationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.api = Octopart(apikey='92bdca1b', cache=OctopartMemoryCache())
+
+    def test_not_modified_is_served_from_cache(self):
+        body = {'results': [{'items': [], 'hits': 0}]}
+        first = fake_response(200, body, {'ETag': '"abc"', 'Content-Encoding': 'gzip', 'Content-Length': '10'})
+        second = fake_response(304)
+        with mock.patch('pyoctopart.octopart.requests.Session.get', side_effect=[first, second]) as get:
+            json_obj, results = self.api.parts_match([{'mpn': 'SN74LS240'}])
+            json_obj2, results2 = self.api.parts_match([{'mpn': 'SN74LS240'}])
+        assert json_obj2 is json_obj
+        assert get.call_args_list[0][1]['headers']['Accept-Encoding'] == 'gzip, deflate'
+        assert 'If-None-Match' not in get.call_args_list[0][1]['headers']
+        assert get.call_args_list[1][1]['headers']['If-None-Match'] == '"abc"'
+        assert second.json.call_count == 0
+        stats = self.api.transfer_stats['parts/match']
+        size = len(json.dumps(body))
+        assert stats['requests'] == 2
+        assert stats['not_modified'] == 1
+        assert stats['wire_bytes'] == 10
+        assert stats['saved_bytes'] == (size - 10) + size
+
+    def test_fresh_entries_skip_the_network(self):
+        self.api.cache.ttl = 60
+        with mock.patch('pyoctopart.octopart.requests.Session.get', return_value=fake_response(200, {'results': []})) as get:
+            self.api.parts_search('resistor')
+            self.api.parts_search('resistor')
+        assert get.call_count == 1
+        assert self.api.cache.hits == 1
+
+    def test_error_answers_are_not_cached(self):
+        self.api.cache.ttl = 3600
+        body = {'results': [{'items': [], 'hits': 0}]}
+        for error in (fake_response(429, {'message': 'Too many requests'}), fake_response(500, {'message': 'Error'})):
+            with mock.patch('pyoctopart.octopart.requests.Session.get', side_effect=[error, fake_response(200, body)]) as get:
+                try:
+                    self.api.parts_match([{'mpn': 'SN74LS240'}])
+                except KeyError:
+                    # the error body has no results
+                    pass
+                json_obj, results = self.api.parts_match([{'mpn': 'SN74LS240'}])
+                assert json_obj == body
+                assert get.call_count == 2
+            self.api.cache.delete(next(iter(self.api.cache.keys())))
+
+    def test_cache_key_ignores_apikey(self):
+        key = request_key('http://octopart.com/api/v3/parts/match', {'apikey': 'a', 'queries': '[]', 'exact_only': 0})
+        assert key == request_key('http://octopart.com/api/v3/parts/match', {'exact_only': 0, 'queries': '[]', 'apikey': 'b'})
+
+def echo_response(session, url, params=None, headers=None, timeout=None):
+    """Answers every request with its own parameters, after a pause letting other threads run."""
+    time.sleep(0.001)
+    body = {'params': params, 'session': id(session), 'thread': threading.get_ident(), 'results': []}
+    if 'lines' in params:
+        body['results'] = [{'items': [], 'reference': l['reference'], 'status': 'ok'} for l in json.loads(params['lines'])]
+    return fake_response(200, body)
+
+class ConcurrencyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.api = Octopart(apikey='92bdca1b')
+
+    def test_get_data_does_not_keep_parameters(self):
+        with mock.patch('pyoctopart.octopart.requests.Session.get', autospec=True, side_effect=echo_response):
+            self.api._get_data('categories/get', {'id': 4174})
+            json_obj = self.api._get_data('categories/search', {'q': 'resistor'})
+        assert json_obj['params'] == {'apikey': '92bdca1b', 'q': 'resistor'}
+
+    def test_parameters_never_cross_threads(self):
+        errors = []
+        barrier = threading.Barrier(8)
+        def worker(n):
+            barrier.wait()
+            try:
+                for i in range(25):
+                    ref = 'T{}-{}'.format(n, i)
+                    json_obj, results = self.api.parts_match([{'mpn': ref}], exact_only=bool(n % 2))
+                    assert json.loads(json_obj['params']['queries']) == [{'mpn': ref}]
+                    assert json_obj['params']['exact_only'] == n % 2
+                    assert json_obj['thread'] == threading.get_ident()
+                    json_obj, results = self.api.bom_match([{'mpn': ref, 'reference': ref}])
+                    assert [r['reference'] for r in results] == [ref]
+                    assert 'queries' not in json_obj['params']
+            except Exception as e:
+                errors.append(e)
+        with mock.patch('pyoctopart.octopart.requests.Session.get', autospec=True, side_effect=echo_response):
+            threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        assert errors == []
+        stats = self.api.transfer_stats
+        assert stats['parts/match']['requests'] == 200
+        assert stats['bom/match']['requests'] == 200
+        # the sessions of the threads are closed as they end
+        assert len(self.api._sessions) == 0
+
+    def test_sessions_do_not_accumulate(self):
+        def worker():
+            self.api.parts_match([{'mpn': 'SN74LS240'}])
+        with mock.patch('pyoctopart.octopart.requests.Session.get', autospec=True, side_effect=echo_response), \
+                mock.patch('pyoctopart.octopart.requests.Session.close', autospec=True) as close:
+            for i in range(50):
+                t = threading.Thread(target=worker)
+                t.start()
+                t.join()
+            assert len(self.api._sessions) == 0
+            assert close.call_count == 50
+            self.api.parts_match([{'mpn': 'SN74LS240'}])
+            assert len(self.api._sessions) == 1
+            self.api.close()
+            assert len(self.api._sessions) == 0
+
 if __name__ == '__main__':
     unittest.main()
 